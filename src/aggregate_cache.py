@@ -0,0 +1,289 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from atomic_io import atomic_write_json
+from money import format_cents_array, group_sums
+
+# --------------------------------------------------------------------
+# Paths / Files
+# --------------------------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+AGGREGATE_CACHE_DIR = os.path.join(DATA_DIR, "aggregate_cache")
+
+# Bump when the layout of a month entry changes; older caches are discarded.
+CACHE_VERSION = 3
+
+HASH_COLUMNS = ("date", "cents", "category", "description")
+
+# Resolution pandas parses dates to (ns before pandas 3, us since); the
+# assembled frames use it like the rest of the chart data
+DATE_DTYPE = pd.to_datetime(["2000-01-01"]).dtype
+
+
+def _plain(value):
+    """NumPy scalar → plain Python number (for JSON)."""
+    return value.item() if hasattr(value, "item") else value
+
+
+def _sum_by(df, keys, column):
+    """
+    Exact int64 sums of `column` per distinct combination of `keys`, in
+    sorted key order (rows with a missing key are left out, as in
+    groupby). Returns (list of key tuples, sums).
+    """
+    combined = np.zeros(len(df), dtype=np.int64)
+    valid = np.ones(len(df), dtype=bool)
+    levels = []
+    for key in keys:
+        codes, uniques = pd.factorize(df[key], sort=True)
+        valid &= codes >= 0
+        combined = combined * len(uniques) + codes
+        levels.append(np.asarray(uniques, dtype=object))
+    groups, inverse = np.unique(combined[valid], return_inverse=True)
+    sums = group_sums(inverse, df[column].to_numpy()[valid], len(groups))
+
+    parts = []
+    for uniques in reversed(levels):
+        groups, part = np.divmod(groups, len(uniques))
+        parts.append(uniques[part])
+    return list(zip(*reversed(parts))), sums
+
+
+def month_hashes(df):
+    """
+    Content hash per month of a prepared chart frame (needs "year_month").
+    Row hashes are combined with a wrapping sum, so the result does not
+    depend on row order; the row count is part of the hash as well.
+    """
+    cols = [c for c in HASH_COLUMNS if c in df.columns]
+    row_hash = pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+    codes, months = pd.factorize(df["year_month"])
+    acc = np.zeros(len(months), dtype=np.uint64)
+    np.add.at(acc, codes, row_hash)
+    counts = np.bincount(codes, minlength=len(months))
+    return {
+        str(m): f"{h:016x}-{n}"
+        for m, h, n in zip(months, acc.tolist(), counts.tolist())
+    }
+
+
+class AggregateCache:
+    """
+    Persisted per-month aggregates of the chart data, keyed by a content
+    hash of each month's transactions. Only months whose transactions
+    changed are re-aggregated from the raw rows; settled months are
+    served from one small JSON file per month in data/aggregate_cache/,
+    named after the month and its hash, so a render rewrites only the
+    files of changed months (path=None keeps the cache in memory only,
+    e.g. for filtered subsets of the data). Each month's columns are
+    built once per entry, and the result is concatenated from them.
+
+    All amounts are integer cents, so cached totals are exact.
+    Each month entry holds:
+      - "sums": per-category totals of the absolute amounts,
+      - "days": per (category, day) expense totals plus the tooltip lines
+                of that day's transactions (all non-income categories),
+      - "net":  per-day signed totals for the balance line.
+    """
+
+    def __init__(self, path=AGGREGATE_CACHE_DIR):
+        self.path = path
+        self.months = {}   # month → entry (with its "hash"), read on first use
+        self._files = {}   # month → hash of its file in `path`
+        self._stale = []   # files of other cache versions, removed on the next save
+        self._frames = {}  # month → (hash, column arrays of its entry)
+        self._load()
+
+    def _file(self, month, digest):
+        return os.path.join(self.path, f"{month}.{digest}.v{CACHE_VERSION}.json")
+
+    def _load(self):
+        """List the month files; their entries are read when first needed."""
+        if not self.path or not os.path.isdir(self.path):
+            return
+        for name in os.listdir(self.path):
+            parts = name.split(".")
+            if len(parts) == 4 and parts[2:] == [f"v{CACHE_VERSION}", "json"]:
+                self._files[parts[0]] = parts[1]
+            elif name.endswith(".json"):
+                self._stale.append(name)
+
+    def _read(self, month):
+        """Entry of a month from its file, or None if it cannot be read."""
+        try:
+            with open(self._file(month, self._files[month]), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except Exception:
+            print(f"⚠ Could not load the aggregate cache of {month}. Rebuilding it.")
+            del self._files[month]
+            return None
+        entry["hash"] = self._files[month]
+        self.months[month] = entry
+        return entry
+
+    def _save(self, changed, removed):
+        """Write the files of the changed months and remove the outdated ones."""
+        if not self.path:
+            return
+        try:
+            for m in changed:
+                entry = self.months[m]
+                atomic_write_json(self._file(m, entry["hash"]),
+                                  {k: v for k, v in entry.items() if k != "hash"})
+                old = self._files.get(m)
+                self._files[m] = entry["hash"]
+                if old is not None and old != entry["hash"]:
+                    self._remove(self._file(m, old))
+            for m in removed:
+                old = self._files.pop(m, None)
+                if old is not None:
+                    self._remove(self._file(m, old))
+            for name in self._stale:
+                self._remove(os.path.join(self.path, name))
+            self._stale = []
+        except Exception:
+            print("⚠ Could not save aggregate cache to file.")
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _cached_hash(self, month):
+        entry = self.months.get(month)
+        return entry["hash"] if entry is not None else self._files.get(month)
+
+    # ----------------------------------------------------------------
+    # Public API
+    # ----------------------------------------------------------------
+    def get_aggregates(self, df, complete=True):
+        """
+        Return (month_sum_df, day_df, daily_net) for a prepared chart frame
+        with columns date, cents, cents_abs (int64), category, description
+        and year_month:
+          - month_sum_df: year_month, category, month_sum
+          - day_df:       category, date, expense_val, tx_lines
+          - daily_net:    Series of signed per-day totals indexed by date
+        month_sum, expense_val and daily_net are int64 cents.
+
+        complete=False marks `df` as whole months of a date range: cached
+        months outside it are kept instead of dropped as removed.
+        """
+        hashes = month_hashes(df)
+        changed = [
+            m for m, h in hashes.items()
+            if self._cached_hash(m) != h or (m not in self.months and self._read(m) is None)
+        ]
+        removed = [m for m in set(self.months) | set(self._files) if m not in hashes] if complete else []
+
+        if changed:
+            print(f"ℹ Aggregating {len(changed)} changed month(s), "
+                  f"{len(hashes) - len(changed)} served from cache.")
+            month_keys = df["year_month"].astype(str)
+            fresh = self._aggregate(df[month_keys.isin(changed)])
+            for m in changed:
+                entry = fresh.get(m, {"sums": [], "days": [], "net": []})
+                entry["hash"] = hashes[m]
+                self.months[m] = entry
+        for m in removed:
+            self.months.pop(m, None)
+            self._frames.pop(m, None)
+        if changed or removed or self._stale:
+            self._save(changed, removed)
+
+        return self._assemble(sorted(hashes))
+
+    # ----------------------------------------------------------------
+    # Aggregation / Assembly
+    # ----------------------------------------------------------------
+    @staticmethod
+    def _aggregate(df):
+        """Aggregate the raw rows of some months into cache entries."""
+        entries = {}
+        if df.empty:
+            return entries
+        df = df.assign(month=df["year_month"].astype(str), day=df["date"].dt.strftime("%Y-%m-%d"))
+
+        def entry(m):
+            return entries.setdefault(m, {"sums": [], "days": [], "net": []})
+
+        keys, totals = _sum_by(df, ["month", "category"], "cents_abs")
+        for (m, cat), total in zip(keys, totals.tolist()):
+            entry(m)["sums"].append([cat, total])
+
+        expenses = df[df["category"] != "Income"].sort_values(["category", "date"], kind="stable")
+        # (object dtype: joining plain str objects per group is much faster
+        # than iterating a pandas string array)
+        expenses = expenses.assign(tx_line=(
+            format_cents_array(expenses["cents_abs"])
+            + " € – " + expenses["description"].astype(str)
+        ).astype(object))
+        days = expenses.groupby(["month", "category", "day"]).agg(
+            expense_val=("cents_abs", "sum"),
+            tx_lines=("tx_line", "<br>".join),
+        )
+        for (m, cat, day), row in zip(days.index, days.itertuples(index=False)):
+            entry(m)["days"].append([cat, day, _plain(row.expense_val), row.tx_lines])
+
+        keys, totals = _sum_by(df, ["month", "day"], "cents")
+        for (m, day), total in zip(keys, totals.tolist()):
+            entry(m)["net"].append([day, total])
+        return entries
+
+    def _month_columns(self, month):
+        """
+        Column arrays of one month's entry (category sums, day rows, net
+        per day), built once per entry and concatenated by _assemble().
+        """
+        entry = self.months[month]
+        cached = self._frames.get(month)
+        if cached is not None and cached[0] == entry["hash"]:
+            return cached[1]
+        sums, days, net = entry["sums"], entry["days"], entry["net"]
+        columns = {
+            "year_month": np.full(len(sums), pd.Period(month, freq="M").ordinal, dtype=np.int64),
+            "category": np.array([c for c, _ in sums], dtype=object),
+            "month_sum": np.array([t for _, t in sums], dtype=np.int64),
+            "day_category": np.array([d[0] for d in days], dtype=object),
+            "day_date": np.array([d[1] for d in days], dtype="datetime64[D]"),
+            "expense_val": np.array([d[2] for d in days], dtype=np.int64),
+            "tx_lines": np.array([d[3] for d in days], dtype=object),
+            "net_date": np.array([d for d, _ in net], dtype="datetime64[D]"),
+            "net": np.array([c for _, c in net], dtype=np.int64),
+        }
+        self._frames[month] = (entry["hash"], columns)
+        return columns
+
+    def _assemble(self, months):
+        parts = [self._month_columns(m) for m in months]
+
+        def column(name, dtype):
+            arrays = [p[name] for p in parts]
+            return np.concatenate(arrays) if arrays else np.array([], dtype=dtype)
+
+        month_sum_df = pd.DataFrame({
+            "year_month": pd.PeriodIndex.from_ordinals(column("year_month", np.int64), freq="M"),
+            "category": column("category", object),
+            "month_sum": column("month_sum", np.int64),
+        })
+        month_sum_df["category"] = month_sum_df["category"].astype(str)
+
+        day_df = pd.DataFrame({
+            "category": column("day_category", object),
+            "date": column("day_date", "datetime64[D]").astype(DATE_DTYPE),
+            "expense_val": column("expense_val", np.int64),
+            "tx_lines": column("tx_lines", object),
+        })
+
+        daily_net = pd.Series(
+            column("net", np.int64),
+            index=pd.DatetimeIndex(column("net_date", "datetime64[D]").astype(DATE_DTYPE), name="date"),
+        )
+        return month_sum_df, day_df, daily_net
@@ -0,0 +1,44 @@
+import json
+import os
+import tempfile
+
+
+def atomic_write_text(path, text, encoding="utf-8"):
+    """
+    Write `text` to `path` atomically: the data goes to a temp file in the
+    same directory, is fsynced and then renamed over the target. A crash
+    mid-write leaves either the old or the new file, never a truncated one.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding=encoding) as f:
+            # mkstemp creates 0600 files; keep the target's (or the default) mode
+            os.chmod(tmp_path, _file_mode(path))
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _file_mode(path):
+    try:
+        return os.stat(path).st_mode & 0o777
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+
+def atomic_write_json(path, data, **dump_kwargs):
+    """json.dump() `data` to `path` atomically (see atomic_write_text)."""
+    atomic_write_text(path, json.dumps(data, **dump_kwargs))
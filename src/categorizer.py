@@ -1,41 +1,467 @@
+import copy
 import json
 import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from atomic_io import atomic_write_json
+from classifier import MODEL_FILE, MODEL_THRESHOLD, CategoryModel
+from money import to_amount, to_cents
+from normalizer import DescriptionNormalizer
+from rules import RULES_FILE, RuleSet
+from suggestions import AUTO_ASSIGN_THRESHOLD, SuggestionIndex
 
 CATEGORIES_FILE = "data/categories.json"
 
+# Groups of uncategorized descriptions for offline completion
+REVIEW_FILE = "data/category_review.json"
+
+# Distinct descriptions kept per uncategorized group (see GroupSummary)
+GROUP_SAMPLE = 5
+
+# Parallel lookups (see Categorizer.lookup_many)
+PARALLEL_THRESHOLD = 5000   # fewer lookups run serially
+CHUNK_SIZE = 2000           # transactions per worker task
+LOOKUP_FIELDS = ("description", "amount", "counterparty_iban")
+
+# The matcher shipped to each pool worker once at startup
+_worker_matcher = None
+
+
+def _init_worker(matcher):
+    global _worker_matcher
+    _worker_matcher = matcher
+
+
+def _lookup_chunk(chunk):
+    return [_worker_matcher.lookup(tx) for tx in chunk]
+
+
+class GroupSummary:
+    """
+    Row count, total and up to GROUP_SAMPLE distinct descriptions of one
+    uncategorized group, so a long import keeps one small record per
+    group instead of every open row.
+    """
+
+    __slots__ = ("count", "cents", "descriptions")
 
-class Categorizer:
     def __init__(self):
-        """Load existing categories from a file or create a new one if it doesn't exist."""
+        self.count = 0
+        self.cents = 0
+        self.descriptions = set()
+
+    def add(self, transactions):
+        for tx in transactions:
+            self.count += 1
+            self.cents += to_cents(tx["amount"])
+            if len(self.descriptions) < GROUP_SAMPLE:
+                self.descriptions.add(tx["description"])
+        return self
+
+
+def summarize_groups(groups, summaries=None):
+    """
+    Add the groups returned by Categorizer.categorize_batch
+    ({key: [transactions]}) to `summaries` ({key: GroupSummary}, a new
+    dict by default) and return it.
+    """
+    summaries = {} if summaries is None else summaries
+    for key, group in groups.items():
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = GroupSummary()
+        summary.add(group)
+    return summaries
+
+
+class Categorizer:
+    def __init__(self, rules=None, normalizer=None,
+                 auto_assign_threshold=AUTO_ASSIGN_THRESHOLD,
+                 model=None, model_threshold=MODEL_THRESHOLD, workers=None):
+        """
+        Load existing categories from a file or create a new one if it doesn't exist.
+        `rules` (a rules.RuleSet) defaults to the rules in data/category_rules.json,
+        `normalizer` to a normalizer.DescriptionNormalizer with the configured
+        token blacklist. Unknown descriptions at least `auto_assign_threshold`
+        similar to a known one get its category without asking.
+
+        `model` (a classifier.CategoryModel) defaults to the one saved in
+        data/category_model.npz, if any; batch categorization assigns its
+        predictions of at least `model_threshold` probability.
+
+        Batch lookups of PARALLEL_THRESHOLD or more transactions are spread
+        over a pool of `workers` processes (default: one per CPU); call
+        close() when done.
+        """
         if os.path.exists(CATEGORIES_FILE):
             with open(CATEGORIES_FILE, "r", encoding="utf-8") as file:
                 self.categories = json.load(file)
         else:
             self.categories = {}
+        self.rules = rules if rules is not None else RuleSet.load(RULES_FILE)
+        self.normalizer = normalizer or DescriptionNormalizer()
+        self.auto_assign_threshold = auto_assign_threshold
+        self.model = model if model is not None else CategoryModel.load(MODEL_FILE, self.normalizer)
+        self.model_threshold = model_threshold
+        self._categories_dirty = False
+        self._model_dirty = False
+        # Normalized description → category, so variants of a known
+        # description (store numbers, references, casing) are recognized
+        self._normalized = {self.normalize(d): c for d, c in self.categories.items()}
+        # Fuzzy index over the normalized descriptions, built on first use
+        self._suggestions = None
+        # Groups skipped in this run's prompts (not asked again)
+        self._skipped = set()
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = None
+        self._version = 0        # bumped by every new mapping
+        self._pool_version = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def close(self):
+        """Shut down the worker pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    @property
+    def dirty(self):
+        """True if mappings or the model have unsaved changes."""
+        return self._categories_dirty or self._model_dirty
+
+    def normalize(self, description):
+        return self.normalizer.normalize(description)
 
-    def categorize_transaction(self, transaction):
+    def ensure_model(self, transactions):
+        """Train the model on the labelled `transactions` if none was saved yet."""
+        if self.model is None and any(t.get("category") for t in transactions):
+            print("🧠 Training the category model on the labelled history…")
+            self.model = CategoryModel.train(transactions, self.normalizer)
+            self._model_dirty = True
+
+    def lookup(self, transaction):
         """
-        Ask the user to categorize a transaction if it is not already categorized.
+        Known mapping, first matching rule or a confident suggestion for a
+        transaction, else None.
         """
         description = transaction["description"]
 
         # If we've seen this description before, return its category
         if description in self.categories:
             return self.categories[description]
+        key = self.normalize(description)
+        category = self._normalized.get(key)
+        if category is not None:
+            return category
+
+        # Then the first matching rule (prefix, substring, regex, IBAN, amount)
+        category = self.rules.match(transaction)
+        if category:
+            return category
+
+        # Finally the most similar known description, if close enough
+        suggestion = self.suggest(key)
+        if suggestion and suggestion[1] >= self.auto_assign_threshold:
+            return suggestion[0]
+        return None
+
+    def suggest(self, key):
+        """(category, similarity, known description) closest to a normalized description."""
+        suggestions = self._suggestion_index().suggest(key)
+        return suggestions[0] if suggestions else None
+
+    def _suggestion_index(self):
+        if self._suggestions is None:
+            self._suggestions = SuggestionIndex()
+            for known, category in self._normalized.items():
+                if category:
+                    self._suggestions.add(known, category)
+        return self._suggestions
+
+    def lookup_many(self, transactions):
+        """
+        lookup() for many transactions, in order. Large batches are split
+        into CHUNK_SIZE shards and matched by the worker pool; each worker
+        received the compiled matcher (mappings, rules, normalizer and
+        suggestion index) once when the pool was started. The pool is
+        restarted when mappings were added since.
+        """
+        if self.workers <= 1 or len(transactions) < PARALLEL_THRESHOLD:
+            return [self.lookup(tx) for tx in transactions]
+
+        if self._pool is not None and self._pool_version != self._version:
+            self.close()
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, initializer=_init_worker, initargs=(self._matcher(),)
+            )
+            self._pool_version = self._version
+
+        rows = [{field: tx.get(field) for field in LOOKUP_FIELDS} for tx in transactions]
+        chunks = [rows[i:i + CHUNK_SIZE] for i in range(0, len(rows), CHUNK_SIZE)]
+        return [category for chunk in self._pool.map(_lookup_chunk, chunks) for category in chunk]
+
+    def _matcher(self):
+        """Copy of this categorizer with only what lookup() needs (for workers)."""
+        self._suggestion_index()
+        matcher = copy.copy(self)
+        matcher.model = None
+        matcher.normalizer = DescriptionNormalizer(sorted(self.normalizer.blacklist))
+        matcher._pool = None
+        matcher._skipped = set()
+        return matcher
+
+    def categorize_transaction(self, transaction, save=True):
+        """
+        Ask the user to categorize a transaction if it is not already categorized.
+        With save=False the new mapping is only kept in memory (see
+        save_categories()).
+        """
+        category = self.lookup(transaction)
+        if category is not None:
+            return category
 
         # Otherwise prompt the user for a category
+        description = transaction["description"]
         print(f"New transaction detected: {description} ({transaction['amount']}€)")
         category = input("Enter category for this transaction: ").strip()
 
         # Save the mapping for next time
-        self.categories[description] = category
-        self.save_categories()
+        self.assign([description], category)
+        self.learn([transaction], category)
+        if save:
+            self.save_categories()
 
         return category
 
+    # ----------------------------------------------------------------
+    # Batch mode
+    # ----------------------------------------------------------------
+    def categorize_batch(self, transactions, interactive=True):
+        """
+        Categorize all transactions without a category in one go:
+        known descriptions and rules first, then the rest grouped by
+        normalized description, asking once per group (most frequent
+        first; an empty answer skips the group). With interactive=False
+        nothing is asked.
+
+        New mappings are only kept in memory; call save_categories() once
+        at the end. Returns the groups still uncategorized
+        ({normalized description: [transactions]}).
+        """
+        open_transactions = [tx for tx in transactions if not tx.get("category")]
+        groups = {}
+        for tx, category in zip(open_transactions, self.lookup_many(open_transactions)):
+            if category is not None:
+                tx["category"] = category
+            else:
+                groups.setdefault(self.normalize(tx["description"]), []).append(tx)
+        groups, model_hints = self._apply_model(groups)
+
+        to_ask = sorted(
+            ((key, group) for key, group in groups.items() if key not in self._skipped),
+            key=lambda kv: -len(kv[1])
+        )
+        if not interactive or not to_ask:
+            return groups
+
+        print(f"🏷 {sum(len(group) for _, group in to_ask)} transactions in {len(to_ask)} "
+              f"description group(s) need a category (Enter = skip, + = accept suggestion).")
+        for key, group in to_ask:
+            examples = sorted({tx["description"] for tx in group})
+            total = sum(float(tx["amount"]) for tx in group)
+            print(f"New description: {examples[0]}"
+                  + (f" (+{len(examples) - 1} variant(s))" if len(examples) > 1 else "")
+                  + f" – {len(group)} transaction(s), {total:.2f}€")
+            suggestion = self.suggest(key)
+            hint = model_hints.get(key)
+            if hint and (not suggestion or hint[1] > suggestion[1]):
+                suggestion = hint
+                print(f"  Suggestion: {hint[0]} (model, {hint[1]:.0%} confident)")
+            elif suggestion:
+                print(f"  Suggestion: {suggestion[0]} "
+                      f"({suggestion[1]:.0%} similar to \"{suggestion[2]}\")")
+            category = input("Enter category for this group: ").strip()
+            if category == "+" and suggestion:
+                category = suggestion[0]
+            if not category or category == "+":
+                self._skipped.add(key)
+                continue
+            # One representative is enough: variants share the normalized key
+            self.assign(examples[:1], category)
+            self.learn(group, category)
+            for tx in group:
+                tx["category"] = category
+        return {key: group for key, group in groups.items() if not group[0].get("category")}
+
+    def _apply_model(self, groups):
+        """
+        Predict all grouped transactions in one vectorized call and assign
+        the confident predictions. Returns the remaining groups and the best
+        prediction per group ({key: (category, probability)}) as a hint.
+        """
+        if self.model is None or not groups:
+            return groups, {}
+        pending = [tx for group in groups.values() for tx in group]
+        predictions = iter(zip(*self.model.predict(pending)))
+
+        hints, remaining, assigned = {}, {}, 0
+        for key, group in groups.items():
+            left = []
+            for tx in group:
+                category, probability = next(predictions)
+                if (probability >= self.model_threshold
+                        and self.model.has_word_evidence(tx, category)):
+                    tx["category"] = category
+                    assigned += 1
+                else:
+                    left.append(tx)
+                if key not in hints or probability > hints[key][1]:
+                    hints[key] = (category, float(probability))
+            if left:
+                remaining[key] = left
+        if assigned:
+            print(f"🧠 {assigned} transaction(s) categorized by the model.")
+        return remaining, hints
+
+    def learn(self, transactions, category):
+        """Add answered transactions to the model (saved with save_categories())."""
+        if not category:
+            return
+        if self.model is None:
+            self.model = CategoryModel(self.normalizer)
+        self.model.update(transactions, [category] * len(transactions))
+        self._model_dirty = True
+
+    def assign(self, descriptions, category):
+        """Map descriptions to a category (in memory until save_categories())."""
+        for description in descriptions:
+            self.categories[description] = category
+            key = self.normalize(description)
+            self._normalized[key] = category
+            if self._suggestions is not None and category:
+                self._suggestions.add(key, category)
+        self._categories_dirty = True
+        self._version += 1
+
+    # ----------------------------------------------------------------
+    # Review file
+    # ----------------------------------------------------------------
+    def export_review(self, groups, path=REVIEW_FILE, merge=False):
+        """
+        Write uncategorized groups ({key: GroupSummary}, see
+        summarize_groups) to a JSON review file. Fill in each "category"
+        offline, then load it with import_review().
+
+        With merge=True the groups are merged into an existing review
+        file: categories filled in there are kept, as are groups this call
+        does not mention. Returns the number of groups in the file.
+        """
+        entries = {}
+        if merge and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as file:
+                    entries = {entry["key"]: entry for entry in json.load(file) if "key" in entry}
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"⚠ Could not read {path} ({e}); it is replaced.")
+        for key, summary in groups.items():
+            previous = entries.get(key, {})
+            descriptions = summary.descriptions | set(previous.get("descriptions", []))
+            entries[key] = {
+                "key": key,
+                "category": previous.get("category", ""),
+                "count": summary.count,
+                "total": to_amount(summary.cents),
+                "descriptions": sorted(descriptions)[:GROUP_SAMPLE],
+                "suggestion": (self.suggest(key) or [None])[0],
+            }
+        review = sorted(entries.values(), key=lambda entry: -entry.get("count", 0))
+        atomic_write_json(path, review, indent=4, ensure_ascii=False)
+        print(f"📝 {len(groups)} description group(s) written to {path} for review"
+              + (f" ({len(review)} in the file)." if len(review) != len(groups) else "."))
+        return len(review)
+
+    def import_review(self, path=REVIEW_FILE):
+        """
+        Add the mappings of all groups with a filled-in category from a
+        review file. Returns the number of groups imported.
+        """
+        with open(path, "r", encoding="utf-8") as file:
+            review = json.load(file)
+        imported = 0
+        for entry in review:
+            category = (entry.get("category") or "").strip()
+            if category:
+                self.assign(entry.get("descriptions", [])[:1], category)
+                imported += 1
+        print(f"✅ {imported} of {len(review)} reviewed group(s) imported.")
+        return imported
+
     def save_categories(self):
-        """Save the updated categories to the categories.json file."""
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(CATEGORIES_FILE), exist_ok=True)
-        with open(CATEGORIES_FILE, "w", encoding="utf-8") as file:
-            json.dump(self.categories, file, indent=4, ensure_ascii=False)
+        """
+        Save the updated categories to the categories.json file (atomically),
+        and the model, each if it changed.
+        """
+        if self._categories_dirty:
+            atomic_write_json(CATEGORIES_FILE, self.categories, indent=4, ensure_ascii=False)
+            self._categories_dirty = False
+        if self.model is not None and self._model_dirty:
+            self.model.save(MODEL_FILE)
+            self._model_dirty = False
+
+
+# --------------------------------------------------------------------
+# Benchmark
+# --------------------------------------------------------------------
+def benchmark(n_transactions=200_000, n_rules=2_000, n_known=500, worker_counts=(1, 2, 4, 8), seed=0):
+    """
+    Time lookup_many() on `n_transactions` random transactions against
+    `n_rules` random rules (see rules.benchmark) and `n_known` known
+    descriptions with 1, 2, 4 and 8 workers (1 runs serially), check that
+    every run returns the serial results in order, and print the
+    throughput. The pool is started before the timed call; its startup
+    time is printed separately.
+    """
+    from rules import _random_rules, _random_transactions
+
+    rng = random.Random(seed)
+    rules = RuleSet(_random_rules(rng, n_rules))
+    transactions = _random_transactions(rng, n_transactions, n_rules)
+    known = [tx["description"] for tx in rng.sample(transactions, n_known)]
+    print(f"⏱ lookup_many() of {n_transactions:,} transactions, {n_rules:,} rules, "
+          f"{n_known} known descriptions ({os.cpu_count()} CPU(s)):")
+
+    expected = None
+    for workers in worker_counts:
+        with Categorizer(rules=rules, workers=workers) as categorizer:
+            categorizer.assign(known, "Known")
+            t0 = time.perf_counter()
+            categorizer.lookup_many(transactions[:PARALLEL_THRESHOLD])
+            startup = time.perf_counter() - t0
+            t0 = time.perf_counter()
+            result = categorizer.lookup_many(transactions)
+            elapsed = time.perf_counter() - t0
+        if expected is None:
+            expected = result
+        elif result != expected:
+            raise AssertionError(f"{workers} workers returned different results than 1 worker")
+        print(f"  • {workers} worker(s): {n_transactions / elapsed:,.0f} transactions/s ({elapsed:.2f}s"
+              + (f"; pool start with the first {PARALLEL_THRESHOLD:,}: {startup:.2f}s)" if workers > 1 else ")"))
+
+
+if __name__ == "__main__":
+    # python categorizer.py bench [transactions]
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 200_000)
+    else:
+        print("Unknown arguments. Usage:")
+        print("  python categorizer.py bench [transactions]")
@@ -4,6 +4,9 @@ import os
 import tkinter as tk
 import sys
 
+from dataset import TransactionDataset, get_dataset
+from money import format_cents
+
 # --------------------------------------------------------------------
 # Paths / Files
 # --------------------------------------------------------------------
@@ -13,6 +16,9 @@ DATA_DIR = os.path.join(BASE_DIR, "data")
 ORDER_FILE = os.path.join(DATA_DIR, "category_order.json")
 TRANSACTIONS_FILE = os.path.join(DATA_DIR, "transactions.json")
 
+# Income-like categories are not sorted into the lists
+UNMANAGED_CATEGORIES = {"Income"}
+
 # --------------------------------------------------------------------
 # Helpers to load / save category order
 # --------------------------------------------------------------------
@@ -44,38 +50,91 @@ def save_category_order(fixed, variable, unassigned):
         json.dump(data, f, indent=4, ensure_ascii=False)
 
 
-def discover_categories_from_transactions():
+def discover_categories_from_transactions(source=None):
     """
-    Scan transactions.json and return a set of all categories present.
+    Return a set of all categories present in the transactions.
+
+    `source` may be an already-loaded TransactionDataset, a pandas
+    DataFrame or a list of transaction dicts. Without it, the shared
+    dataset for transactions.json is used (parsed at most once per run).
     """
-    if not os.path.exists(TRANSACTIONS_FILE):
-        # The transactions file doesn't exist → no categories can be discovered.
-        # Return an empty *set* (not None) so callers can safely do set operations
-        # (|, -, membership checks, etc.) without extra None-checks.
-        return set()
+    if source is None:
+        if not os.path.exists(TRANSACTIONS_FILE):
+            # The transactions file doesn't exist → no categories can be discovered.
+            # Return an empty *set* (not None) so callers can safely do set operations
+            # (|, -, membership checks, etc.) without extra None-checks.
+            return set()
+        source = get_dataset(TRANSACTIONS_FILE)
     try:
-        with open(TRANSACTIONS_FILE, "r", encoding="utf-8") as f:
-            tx = json.load(f)
-        cats = {t.get("category") for t in tx if t.get("category")}
+        if hasattr(source, "columns"):
+            # pandas DataFrame
+            if "category" not in source.columns:
+                return set()
+            cats = {c for c in source["category"].dropna().unique() if c}
+        elif hasattr(source, "categories"):
+            # TransactionDataset
+            cats = source.categories()
+        else:
+            cats = {t.get("category") for t in source if t.get("category")}
         # Filter out income-like categories if they should not be user-managed
-        return {c for c in cats if c not in {"Income"}}
+        return {c for c in cats if c not in UNMANAGED_CATEGORIES}
     except Exception:
         return set()
 
 
+def category_stats(source=None):
+    """
+    Return {category: (transaction count, cent total)} of the transactions.
+
+    `source` is accepted as in discover_categories_from_transactions. The
+    numbers come from the TransactionIndex over the chart frame (for the
+    shared dataset: its columnar cache), not from a rescan of the rows.
+    """
+    from transaction_index import TransactionIndex
+
+    if source is None:
+        if not os.path.exists(TRANSACTIONS_FILE):
+            return {}
+        source = get_dataset(TRANSACTIONS_FILE, load=False)
+    try:
+        if isinstance(source, TransactionDataset):
+            return source.index().category_stats()
+        if hasattr(source, "columns"):
+            # pandas DataFrame
+            if "category" not in source.columns or source.empty:
+                return {}
+            return TransactionIndex(source).category_stats()
+        from frame_cache import build_frame
+
+        source = list(source)
+        return TransactionIndex(build_frame(source)).category_stats() if source else {}
+    except Exception:
+        return {}
+
+
 # --------------------------------------------------------------------
 # GUI Class
 # --------------------------------------------------------------------
+LISTS = ("fixed", "variable", "unassigned")
+LIST_TITLES = {"fixed": "Fixed Costs", "variable": "Variable Costs", "unassigned": "Unassigned"}
+
+
 class CategoryManager(tk.Tk):
     """
     Three-list category manager:
       - Fixed Costs
       - Variable Costs
       - Unassigned (new / not yet classified)
-    User can reorder within a list and move categories between lists.
+    User can reorder within a list and move categories between lists,
+    several at a time (Shift/Ctrl-click selects ranges / single entries).
+
+    The three Python lists in self.lists are the model; each Listbox
+    shows its list filtered by the type-ahead field, one entry per
+    category with its transaction count and total (see category_stats).
+    Listboxes are always refilled with a single insert call.
     """
 
-    def __init__(self):
+    def __init__(self, dataset=None):
         super().__init__()
         self.title("Category Manager")
         self.geometry("900x800")
@@ -83,51 +142,65 @@ class CategoryManager(tk.Tk):
         fixed, variable, unassigned = load_category_order()
 
         # Merge in new categories from transactions
+        self.stats = category_stats(dataset)
         existing_all = set(fixed) | set(variable) | set(unassigned)
-        discovered = discover_categories_from_transactions()
+        discovered = {c for c in self.stats if c and c not in UNMANAGED_CATEGORIES}
         missing = [c for c in sorted(discovered) if c not in existing_all]
 
         # Add missing categories into unassigned
         unassigned.extend(missing)
 
-        self._build_ui(fixed, variable, unassigned)
+        self.lists = {"fixed": fixed, "variable": variable, "unassigned": unassigned}
+        self.visible = {name: list(items) for name, items in self.lists.items()}
+        self._labels = {}
+        self._keys = {}
+        for items in self.lists.values():
+            for c in items:
+                count, cents = self.stats.get(c, (0, 0))
+                self._labels[c] = f"{c}  ({count} tx, {format_cents(cents)} €)"
+                self._keys[c] = c.lower()
+        self._filter_text = ""
+
+        self._build_ui()
 
     # ----------------------------------------------------------------
     # UI Construction
     # ----------------------------------------------------------------
-    def _build_ui(self, fixed, variable, unassigned):
+    def _build_ui(self):
+        # Type-ahead filter for all three lists
+        filter_frame = tk.Frame(self)
+        filter_frame.pack(fill="x", padx=10, pady=(10, 0))
+        tk.Label(filter_frame, text="Filter:").pack(side="left")
+        self.filter_var = tk.StringVar(self)
+        tk.Entry(filter_frame, textvariable=self.filter_var).pack(side="left", fill="x", expand=True, padx=5)
+        self.filter_var.trace_add("write", lambda *_: self._apply_filter())
+
         top_frame = tk.Frame(self)
         top_frame.pack(fill="both", expand=True, padx=10, pady=10)
 
-        # Frames for each category group
-        fixed_frame = tk.LabelFrame(top_frame, text="Fixed Costs")
-        variable_frame = tk.LabelFrame(top_frame, text="Variable Costs")
-        unassigned_frame = tk.LabelFrame(top_frame, text="Unassigned")
-
-        fixed_frame.pack(side="left", fill="both", expand=True, padx=5)
-        variable_frame.pack(side="left", fill="both", expand=True, padx=5)
-        unassigned_frame.pack(side="left", fill="both", expand=True, padx=5)
-
-        # Listboxes
-        self.fixed_lb = tk.Listbox(fixed_frame, activestyle="none")
-        self.variable_lb = tk.Listbox(variable_frame, activestyle="none")
-        self.unassigned_lb = tk.Listbox(unassigned_frame, activestyle="none")
-
-        self.fixed_lb.pack(fill="both", expand=True)
-        self.variable_lb.pack(fill="both", expand=True)
-        self.unassigned_lb.pack(fill="both", expand=True)
-
-        for c in fixed:
-            self.fixed_lb.insert("end", c)
-        for c in variable:
-            self.variable_lb.insert("end", c)
-        for c in unassigned:
-            self.unassigned_lb.insert("end", c)
-
-        # Reorder buttons under each list
-        self._add_reorder_controls(fixed_frame, self.fixed_lb)
-        self._add_reorder_controls(variable_frame, self.variable_lb)
-        self._add_reorder_controls(unassigned_frame, self.unassigned_lb)
+        self.listboxes = {}
+        for name in LISTS:
+            # Frames for each category group
+            frame = tk.LabelFrame(top_frame, text=LIST_TITLES[name])
+            frame.pack(side="left", fill="both", expand=True, padx=5)
+
+            # Reorder buttons under each list
+            self._add_reorder_controls(frame, name)
+
+            body = tk.Frame(frame)
+            body.pack(fill="both", expand=True)
+            scrollbar = tk.Scrollbar(body, orient="vertical")
+            lb = tk.Listbox(body, activestyle="none", selectmode=tk.EXTENDED,
+                            exportselection=False, yscrollcommand=scrollbar.set)
+            scrollbar.config(command=lb.yview)
+            scrollbar.pack(side="right", fill="y")
+            lb.pack(side="left", fill="both", expand=True)
+            self.listboxes[name] = lb
+            self._render(name)
+
+        self.fixed_lb = self.listboxes["fixed"]
+        self.variable_lb = self.listboxes["variable"]
+        self.unassigned_lb = self.listboxes["unassigned"]
 
         # Transfer controls
         transfer_frame = tk.Frame(self)
@@ -135,26 +208,17 @@ class CategoryManager(tk.Tk):
 
         tk.Label(transfer_frame, text="Move selection between lists:").pack(anchor="w")
 
-        move_row1 = tk.Frame(transfer_frame)
-        move_row1.pack(fill="x", pady=2)
-        tk.Button(move_row1, text="Unassigned → Fixed",
-                  command=lambda: self._move_between(self.unassigned_lb, self.fixed_lb)).pack(side="left", padx=4)
-        tk.Button(move_row1, text="Unassigned → Variable",
-                  command=lambda: self._move_between(self.unassigned_lb, self.variable_lb)).pack(side="left", padx=4)
-
-        move_row2 = tk.Frame(transfer_frame)
-        move_row2.pack(fill="x", pady=2)
-        tk.Button(move_row2, text="Fixed → Variable",
-                  command=lambda: self._move_between(self.fixed_lb, self.variable_lb)).pack(side="left", padx=4)
-        tk.Button(move_row2, text="Variable → Fixed",
-                  command=lambda: self._move_between(self.variable_lb, self.fixed_lb)).pack(side="left", padx=4)
-
-        move_row3 = tk.Frame(transfer_frame)
-        move_row3.pack(fill="x", pady=2)
-        tk.Button(move_row3, text="Fixed → Unassigned",
-                  command=lambda: self._move_between(self.fixed_lb, self.unassigned_lb)).pack(side="left", padx=4)
-        tk.Button(move_row3, text="Variable → Unassigned",
-                  command=lambda: self._move_between(self.variable_lb, self.unassigned_lb)).pack(side="left", padx=4)
+        moves = [
+            (("unassigned", "fixed"), ("unassigned", "variable")),
+            (("fixed", "variable"), ("variable", "fixed")),
+            (("fixed", "unassigned"), ("variable", "unassigned")),
+        ]
+        for row in moves:
+            move_row = tk.Frame(transfer_frame)
+            move_row.pack(fill="x", pady=2)
+            for src, dst in row:
+                tk.Button(move_row, text=f"{LIST_TITLES[src].split()[0]} → {LIST_TITLES[dst].split()[0]}",
+                          command=lambda s=src, d=dst: self._move_between(s, d)).pack(side="left", padx=4)
 
         # Save / Cancel
         bottom = tk.Frame(self)
@@ -162,66 +226,115 @@ class CategoryManager(tk.Tk):
         tk.Button(bottom, text="Save & Exit", command=self._on_save, width=15).pack(side="right", padx=5)
         tk.Button(bottom, text="Cancel", command=self.destroy, width=10).pack(side="right")
 
-    def _add_reorder_controls(self, parent, listbox):
+    def _add_reorder_controls(self, parent, name):
         btns = tk.Frame(parent)
-        btns.pack(fill="x", pady=4)
-        tk.Button(btns, text="Up", command=lambda lb=listbox: self._move_up(lb), width=6).pack(side="left", padx=3)
-        tk.Button(btns, text="Down", command=lambda lb=listbox: self._move_down(lb), width=6).pack(side="left", padx=3)
+        btns.pack(side="bottom", fill="x", pady=4)
+        tk.Button(btns, text="Up", command=lambda: self._move_up(name), width=6).pack(side="left", padx=3)
+        tk.Button(btns, text="Down", command=lambda: self._move_down(name), width=6).pack(side="left", padx=3)
+
+    # ----------------------------------------------------------------
+    # View: filtering / rendering / selection
+    # ----------------------------------------------------------------
+    def _render(self, name):
+        lb = self.listboxes[name]
+        lb.delete(0, "end")
+        if self.visible[name]:
+            lb.insert("end", *[self._labels[c] for c in self.visible[name]])
+
+    def _filtered(self, items, text):
+        return [c for c in items if text in self._keys[c]] if text else list(items)
+
+    def _apply_filter(self):
+        """
+        Show the categories containing the filter text. Typing on narrows
+        the lists that are shown already instead of filtering from scratch.
+        """
+        text = self.filter_var.get().strip().lower()
+        narrowing = text.startswith(self._filter_text)
+        for name in LISTS:
+            source = self.visible[name] if narrowing else self.lists[name]
+            self.visible[name] = self._filtered(source, text)
+            self._render(name)
+        self._filter_text = text
+
+    def _selected(self, name):
+        return [self.visible[name][i] for i in self.listboxes[name].curselection()]
+
+    def _select(self, name, items):
+        """Select `items` in the listbox, one select_set call per run of rows."""
+        lb = self.listboxes[name]
+        lb.select_clear(0, "end")
+        rows = [i for i, c in enumerate(self.visible[name]) if c in items]
+        run_start = None
+        for k, i in enumerate(rows):
+            if run_start is None:
+                run_start = i
+            if k + 1 == len(rows) or rows[k + 1] != i + 1:
+                lb.select_set(run_start, i)
+                run_start = None
+        if rows:
+            lb.see(rows[0])
 
     # ----------------------------------------------------------------
     # Movement & Reordering
     # ----------------------------------------------------------------
-    def _move_between(self, src: tk.Listbox, dst: tk.Listbox):
-        sel = src.curselection()
-        if not sel:
-            return
-        idx = sel[0]
-        item = src.get(idx)
-        src.delete(idx)
-        dst.insert("end", item)
-        dst.select_clear(0, "end")
-        dst.select_set("end")
-
-    def _move_up(self, lb: tk.Listbox):
-        sel = lb.curselection()
-        if not sel:
-            return
-        idx = sel[0]
-        if idx == 0:
-            return
-        val = lb.get(idx)
-        lb.delete(idx)
-        lb.insert(idx - 1, val)
-        lb.select_set(idx - 1)
-
-    def _move_down(self, lb: tk.Listbox):
-        sel = lb.curselection()
-        if not sel:
+    def _move_between(self, src, dst):
+        moved = self._selected(src)
+        if not moved:
             return
-        idx = sel[0]
-        if idx >= lb.size() - 1:
+        moving = set(moved)
+        self.lists[src] = [c for c in self.lists[src] if c not in moving]
+        self.lists[dst].extend(moved)
+        for name in (src, dst):
+            self.visible[name] = self._filtered(self.lists[name], self._filter_text)
+            self._render(name)
+        self._select(dst, moving)
+
+    def _move_up(self, name):
+        self._shift(name, -1)
+
+    def _move_down(self, name):
+        self._shift(name, 1)
+
+    def _shift(self, name, step):
+        """
+        Move the selected categories one row up (step=-1) or down (step=1)
+        as a block; a selected row at the edge stops the rows behind it.
+        With a filter active, they move past the previous / next shown row.
+        """
+        selected = set(self._selected(name))
+        if not selected:
             return
-        val = lb.get(idx)
-        lb.delete(idx)
-        lb.insert(idx + 1, val)
-        lb.select_set(idx + 1)
+        visible = self.visible[name]
+        order = range(len(visible)) if step < 0 else range(len(visible) - 1, -1, -1)
+        for k in order:
+            j = k + step
+            if visible[k] in selected and 0 <= j < len(visible) and visible[j] not in selected:
+                visible[j], visible[k] = visible[k], visible[j]
+
+        # Write the new order back into the slots of the shown categories
+        items = self.lists[name]
+        shown = set(visible)
+        slots = [i for i, c in enumerate(items) if c in shown]
+        for i, c in zip(slots, visible):
+            items[i] = c
+        self._render(name)
+        self._select(name, selected)
 
     # ----------------------------------------------------------------
     # Save
     # ----------------------------------------------------------------
     def _on_save(self):
-        fixed = list(self.fixed_lb.get(0, "end"))
-        variable = list(self.variable_lb.get(0, "end"))
-        unassigned = list(self.unassigned_lb.get(0, "end"))
-        save_category_order(fixed, variable, unassigned)
+        # The model, not the listboxes: a filter may hide categories
+        save_category_order(self.lists["fixed"], self.lists["variable"], self.lists["unassigned"])
         self.destroy()
 
 
 # --------------------------------------------------------------------
 # CLI Entry
 # --------------------------------------------------------------------
-def run_category_manager():
-    app = CategoryManager()
+def run_category_manager(dataset=None):
+    app = CategoryManager(dataset)
     app.mainloop()
 
 
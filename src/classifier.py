@@ -0,0 +1,297 @@
+import os
+import zlib
+
+import numpy as np
+
+from normalizer import DescriptionNormalizer
+
+# Stored next to categorizer.CATEGORIES_FILE
+MODEL_FILE = "data/category_model.npz"
+
+N_FEATURES = 1 << 16     # hashed feature space
+ALPHA = 0.1              # additive (Laplace/Lidstone) smoothing
+MAGNITUDES = 8           # amount buckets: 0–9, 10–99, … ≥ 10^7 €
+MODEL_VERSION = 2        # sparse counts; older (dense) model files are retrained
+PREDICT_CELLS = 1 << 23  # (row, feature, category) cells per prediction chunk
+
+_CLASS_MASK = (1 << 32) - 1
+
+# Predictions at or above this probability are assigned without asking
+MODEL_THRESHOLD = 0.9
+
+
+def _hash(feature):
+    return zlib.crc32(feature.encode("utf-8")) % N_FEATURES
+
+
+def description_features(key):
+    """Hashed word and character-trigram features of a normalized description."""
+    padded = f" {key} "
+    features = {f"w:{word}" for word in key.split()}
+    features.update(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return sorted({_hash(f) for f in features})
+
+
+# Amount sign/magnitude and weekday features, indexed by their bucket
+_SIGN_IDS = np.array([_hash("sign:-"), _hash("sign:+")])
+_AMOUNT_IDS = np.array([[_hash(f"amt:{s}{m}") for m in range(MAGNITUDES)] for s in "-+"])
+_WEEKDAY_IDS = np.array([_hash(f"wd:{d}") for d in range(7)])
+
+
+def _ranges(starts, lengths):
+    """Concatenation of arange(start, start + length) for each pair."""
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + offsets
+
+
+class CategoryModel:
+    """
+    Multinomial naive Bayes over hashed features, implemented with NumPy:
+    word and character-trigram features of the normalized description,
+    the amount's sign and order of magnitude, and the weekday.
+
+    The model is its sufficient statistics (feature counts per category),
+    so answers can be added incrementally with update() and the counts are
+    persisted as data/category_model.npz. Description features are computed
+    once per distinct description, so training and prediction run as a few
+    array operations over all rows.
+
+    The counts are sparse: only the (feature, category) cells that occurred
+    are kept, as sorted int64 keys (feature << 32 | class) with their
+    counts, so memory grows with the training data instead of with
+    categories × N_FEATURES. Updates are buffered and merged into the
+    sorted arrays on the next read.
+    """
+
+    def __init__(self, normalizer=None):
+        self.normalizer = normalizer or DescriptionNormalizer()
+        self.classes = []
+        self.class_counts = np.zeros(0)
+        self.totals = np.zeros(0)          # sum of all feature counts per class
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._values = np.zeros(0)
+        self._feature_ptr = None           # per feature: its range of _keys
+        self._pending = []                 # (keys, values) not merged yet
+        self._class_ids = {}
+
+    def __len__(self):
+        return int(self.class_counts.sum())
+
+    # ----------------------------------------------------------------
+    # Persistence
+    # ----------------------------------------------------------------
+    @classmethod
+    def load(cls, path=MODEL_FILE, normalizer=None):
+        """
+        Load a saved model, or return None if there is none (or it was
+        saved in an older format, so it is retrained).
+        """
+        if not os.path.exists(path):
+            return None
+        model = cls(normalizer)
+        with np.load(path) as data:
+            if "version" not in data or int(data["version"]) != MODEL_VERSION:
+                return None
+            model.classes = data["classes"].tolist()
+            model.class_counts = data["class_counts"].astype(float)
+            model._keys = data["keys"].astype(np.int64)
+            model._values = data["values"].astype(float)
+        model._class_ids = {c: i for i, c in enumerate(model.classes)}
+        model.totals = np.bincount(model._keys & _CLASS_MASK, weights=model._values,
+                                   minlength=len(model.classes))
+        return model
+
+    def save(self, path=MODEL_FILE):
+        self._merge()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            version=MODEL_VERSION,
+            classes=np.array(self.classes, dtype=str),
+            class_counts=self.class_counts,
+            keys=self._keys,
+            values=self._values.astype(np.float32),
+        )
+        os.replace(tmp_path, path)
+
+    # ----------------------------------------------------------------
+    # Training
+    # ----------------------------------------------------------------
+    @classmethod
+    def train(cls, transactions, normalizer=None):
+        """Train a new model on all transactions that have a category."""
+        model = cls(normalizer)
+        labelled = [t for t in transactions if t.get("category")]
+        model.update(labelled, [t["category"] for t in labelled])
+        return model
+
+    def update(self, transactions, categories):
+        """Add labelled transactions to the counts (incremental training)."""
+        if not transactions:
+            return
+        for category in categories:
+            if category not in self._class_ids:
+                self._class_ids[category] = len(self.classes)
+                self.classes.append(category)
+        n_classes = len(self.classes)
+        grow = n_classes - len(self.class_counts)
+        if grow:
+            self.class_counts = np.concatenate([self.class_counts, np.zeros(grow)])
+            self.totals = np.concatenate([self.totals, np.zeros(grow)])
+
+        y = np.fromiter((self._class_ids[c] for c in categories), dtype=np.int64,
+                        count=len(categories))
+        codes, indptr, indices, row_features = self._features(transactions)
+
+        # Description features: count each (class, description) pair once,
+        # then spread the pair counts over that description's features
+        n_desc = len(indptr) - 1
+        pairs, pair_counts = np.unique(y * n_desc + codes, return_counts=True)
+        pair_class, pair_desc = np.divmod(pairs, n_desc)
+        lengths = np.diff(indptr)[pair_desc]
+        classes = np.repeat(pair_class, lengths)
+        features = indices[_ranges(indptr[pair_desc], lengths)]
+        weights = np.repeat(pair_counts, lengths).astype(float)
+
+        # Amount and weekday features: one of each per row
+        classes = np.concatenate([classes] + [y] * len(row_features))
+        features = np.concatenate([features] + row_features)
+        weights = np.concatenate([weights] + [np.ones(len(y))] * len(row_features))
+
+        self._pending.append(((features << 32) | classes, weights))
+        self.totals += np.bincount(classes, weights=weights, minlength=n_classes)
+        self.class_counts += np.bincount(y, minlength=n_classes)
+
+    def _merge(self):
+        """Fold the buffered updates into the sorted key/count arrays."""
+        if self._pending:
+            keys = np.concatenate([self._keys] + [k for k, _ in self._pending])
+            values = np.concatenate([self._values] + [v for _, v in self._pending])
+            self._keys, inverse = np.unique(keys, return_inverse=True)
+            self._values = np.bincount(inverse, weights=values, minlength=len(self._keys))
+            self._pending = []
+            self._feature_ptr = None
+        if self._feature_ptr is None:
+            self._feature_ptr = np.searchsorted(self._keys >> 32, np.arange(N_FEATURES + 1))
+
+    def count(self, category, feature):
+        """Count of a hashed `feature` in `category`'s training data."""
+        row = self._class_ids.get(category)
+        if row is None:
+            return 0.0
+        self._merge()
+        key = (feature << 32) | row
+        i = np.searchsorted(self._keys, key)
+        return float(self._values[i]) if i < len(self._keys) and self._keys[i] == key else 0.0
+
+    # ----------------------------------------------------------------
+    # Prediction
+    # ----------------------------------------------------------------
+    def predict(self, transactions):
+        """
+        Return (categories, probabilities): the most likely category of each
+        transaction and its posterior probability.
+
+        Distinct descriptions are scored once (see _log_likelihoods), the
+        sign, amount and weekday features from a small table. Rows are
+        scored in chunks of about PREDICT_CELLS (row, feature, category)
+        cells, so memory stays bounded for any number of rows.
+        """
+        if not transactions or not self.classes:
+            return [None] * len(transactions), np.zeros(len(transactions))
+        self._merge()
+
+        codes, indptr, indices, row_features = self._features(transactions)
+        n_classes = len(self.classes)
+        log_prior = np.log(self.class_counts / self.class_counts.sum())
+        lengths = np.diff(indptr)
+
+        # All sign/amount/weekday features at once: one row per feature ID
+        table_ids, row_features = np.unique(np.stack(row_features), return_inverse=True)
+        table = self._log_likelihoods(np.arange(len(table_ids)), table_ids, len(table_ids))
+        row_features = row_features.reshape(-1, len(transactions))
+
+        categories, probabilities = [], []
+        cells_per_row = n_classes * (1 + lengths.mean() + len(row_features))
+        chunk = max(1, int(PREDICT_CELLS // cells_per_row))
+        for lo in range(0, len(transactions), chunk):
+            hi = min(lo + chunk, len(transactions))
+            chunk_codes, rows = np.unique(codes[lo:hi], return_inverse=True)
+            desc_lengths = lengths[chunk_codes]
+            features = indices[_ranges(indptr[chunk_codes], desc_lengths)]
+            owners = np.repeat(np.arange(len(chunk_codes)), desc_lengths)
+
+            scores = self._log_likelihoods(owners, features, len(chunk_codes))[rows] + log_prior
+            for f in row_features[:, lo:hi]:
+                scores += table[f]
+
+            best = scores.argmax(axis=1)
+            scores -= scores[np.arange(hi - lo), best][:, None]
+            probabilities.append(1.0 / np.exp(scores).sum(axis=1))
+            categories.extend(self.classes[i] for i in best)
+        return categories, np.concatenate(probabilities)
+
+    def _log_likelihoods(self, owners, features, n_owners):
+        """
+        Sum of the smoothed log-likelihoods of `features` per owner (e.g. a
+        description) and category, as an n_owners × categories array.
+
+        Split into the zero-count value of every feature plus a correction
+        for the (feature, category) cells that occurred, so only those are
+        read from the sparse counts.
+        """
+        n_classes = len(self.classes)
+        log_alpha = np.log(ALPHA)
+        log_unseen = log_alpha - np.log(self.totals + ALPHA * N_FEATURES)
+        scores = np.outer(np.bincount(owners, minlength=n_owners), log_unseen)
+
+        cell_lengths = self._feature_ptr[features + 1] - self._feature_ptr[features]
+        cells = _ranges(self._feature_ptr[features], cell_lengths)
+        scores += np.bincount(
+            np.repeat(owners, cell_lengths) * n_classes + (self._keys[cells] & _CLASS_MASK),
+            weights=np.log(self._values[cells] + ALPHA) - log_alpha,
+            minlength=n_owners * n_classes,
+        ).reshape(n_owners, n_classes)
+        return scores
+
+    def has_word_evidence(self, transaction, category):
+        """
+        True if a whole word of the transaction's normalized description
+        occurred in `category`'s training data. Naive Bayes is confident
+        even for unseen payees (trigram, amount and weekday features alone
+        add up), so auto-assignment additionally requires this.
+        """
+        key = self.normalizer.normalize(transaction["description"])
+        return any(self.count(category, _hash(f"w:{word}")) > 0 for word in key.split())
+
+    # ----------------------------------------------------------------
+    # Features
+    # ----------------------------------------------------------------
+    def _features(self, transactions):
+        """
+        Return (codes, indptr, indices, row_features): each transaction's
+        distinct-description code, the description features as CSR arrays
+        (indices[indptr[d]:indptr[d + 1]] for description d) and the hashed
+        sign, amount and weekday feature per row.
+        """
+        key_codes = {}
+        codes = np.fromiter(
+            (key_codes.setdefault(self.normalizer.normalize(t["description"]), len(key_codes))
+             for t in transactions),
+            dtype=np.int64, count=len(transactions),
+        )
+        features = [description_features(key) for key in key_codes]
+        indptr = np.zeros(len(features) + 1, dtype=np.int64)
+        np.cumsum([len(f) for f in features], out=indptr[1:])
+        indices = np.fromiter((i for f in features for i in f), dtype=np.int64, count=indptr[-1])
+
+        amounts = np.fromiter((float(t["amount"]) for t in transactions), dtype=float,
+                              count=len(transactions))
+        sign = (amounts >= 0).astype(np.int64)
+        magnitude = np.clip(np.floor(np.log10(np.abs(amounts) + 1)), 0, MAGNITUDES - 1).astype(np.int64)
+        days = np.array([t["date"] for t in transactions], dtype="datetime64[D]").astype(np.int64)
+        weekday = (days + 3) % 7  # 1970-01-01 was a Thursday
+        row_features = [_SIGN_IDS[sign], _AMOUNT_IDS[sign, magnitude], _WEEKDAY_IDS[weekday]]
+        return codes, indptr, indices, row_features
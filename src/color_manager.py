@@ -1,7 +1,11 @@
 import os
 import json
+import atexit
+import hashlib
 import random
 
+from atomic_io import atomic_write_json
+
 # Path to the JSON file that stores category colors
 COLORS_FILE = os.path.join(
     os.path.dirname(__file__),
@@ -10,6 +14,47 @@ COLORS_FILE = os.path.join(
     "category_colors.json"
 )
 
+# New colors not written yet, per colors file ({category: color} and the
+# set of those colors). Shared by all ColorManagers, so managers of one
+# file never pick the same new color, and each file is written once at
+# interpreter exit however many managers were created.
+_unsaved = {}
+_unsaved_used = {}
+
+
+def _read_colors(colors_file):
+    if not os.path.exists(colors_file):
+        return {}
+    with open(colors_file, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def flush_colors(colors_file=None):
+    """
+    Write the new colors of one colors file (all files if None), merged
+    into what the file holds now: colors another process saved meanwhile
+    are kept, also for the same category.
+    """
+    for path in [colors_file] if colors_file else list(_unsaved):
+        new_colors = _unsaved.pop(path, None)
+        _unsaved_used.pop(path, None)
+        if not new_colors:
+            continue
+        try:
+            try:
+                colors = _read_colors(path)
+            except ValueError:
+                colors = {}
+            for category, color in new_colors.items():
+                colors.setdefault(category, color)
+            atomic_write_json(path, colors, indent=2)
+        except Exception:
+            print("⚠ Could not save color_map to file.")
+
+
+atexit.register(flush_colors)
+
+
 class ColorManager:
     def __init__(self):
         """
@@ -18,6 +63,10 @@ class ColorManager:
         - Sets up an empty color_map.
         - Defines a default palette to draw from before falling back to random colors.
         - Loads any existing colors from disk.
+
+        New colors are kept in memory and written in one atomic flush() at
+        interpreter exit (or when flush() is called), not once per category;
+        managers of the same file share the colors not written yet.
         """
         self.colors_file = COLORS_FILE
         self.color_map = {}
@@ -29,60 +78,79 @@ class ColorManager:
             "#f39c12", "#2c3e50", "#16a085"
         ]
         self._load_colors()
+        # Maintained alongside color_map, so a new color is found without
+        # rebuilding the set of used colors
+        self._used_colors = set(self.color_map.values())
 
     def _load_colors(self):
-        """Attempt to load an existing color_map from the JSON file."""
-        if os.path.exists(self.colors_file):
-            try:
-                with open(self.colors_file, "r", encoding="utf-8") as f:
-                    self.color_map = json.load(f)
-            except Exception:
-                print("⚠ Could not load color map properly. Starting with an empty map.")
-                self.color_map = {}
-        else:
-            # No file yet—start with an empty mapping
-            self.color_map = {}
-
-    def _save_colors(self):
-        """Persist the current color_map to the JSON file."""
+        """
+        Attempt to load an existing color_map from the JSON file, plus the
+        colors other managers of this process assigned but did not write yet.
+        """
         try:
-            # Ensure the directory exists
-            os.makedirs(os.path.dirname(self.colors_file), exist_ok=True)
-            with open(self.colors_file, "w", encoding="utf-8") as f:
-                json.dump(self.color_map, f, indent=2)
+            self.color_map = _read_colors(self.colors_file)
         except Exception:
-            print("⚠ Could not save color_map to file.")
+            print("⚠ Could not load color map properly. Starting with an empty map.")
+            self.color_map = {}
+        for category, color in _unsaved.get(self.colors_file, {}).items():
+            self.color_map.setdefault(category, color)
+
+    def flush(self):
+        """Persist the new colors of this manager's file now (see flush_colors)."""
+        flush_colors(self.colors_file)
 
     def get_color_for_category(self, category: str) -> str:
         """
         Return the color for the given category. If it doesn’t yet exist,
-        pick a new color, save it, and return it.
+        pick a new color (saved with the next flush) and return it.
         """
         if category in self.color_map:
             # Already have a color, return it
             return self.color_map[category]
 
-        # New category—generate, save, and return a new color
-        new_color = self._get_new_color()
+        # New category—take the color another manager of this file gave it,
+        # or generate a new one; remember and return it
+        unsaved = _unsaved.setdefault(self.colors_file, {})
+        new_color = unsaved.get(category) or self._get_new_color(category)
         self.color_map[category] = new_color
-        self._save_colors()
+        self._used_colors.add(new_color)
+        unsaved[category] = new_color
+        _unsaved_used.setdefault(self.colors_file, set()).add(new_color)
         return new_color
 
-    def _get_new_color(self) -> str:
+    def assign_colors(self, categories) -> dict:
+        """
+        Return {category: color} for all `categories` (in order, so new
+        ones take the palette colors in that order).
+        """
+        return {cat: self.get_color_for_category(cat) for cat in dict.fromkeys(categories)}
+
+    def _get_new_color(self, category: str) -> str:
         """
         Look for an unused color in the default_palette first;
         if they’re all taken, generate a random hex color.
         """
-        used_colors = set(self.color_map.values())
-
         # 1) Try each color in the default palette
         for c in self.default_palette:
-            if c not in used_colors:
+            if not self._is_used(c):
                 return c
 
         # 2) Fallback: random hex color
-        return self._random_color_hex()
+        return self._random_color_hex(category)
+
+    def _random_color_hex(self, category: str) -> str:
+        """
+        Generate a random hex color string, e.g. '#A1B2C3', seeded with a
+        hash of the category, so the same category always gets the same
+        color (unless that one is taken already).
+        """
+        seed = hashlib.sha1(str(category).encode("utf-8")).digest()
+        rng = random.Random(seed)
+        while True:
+            color = "#" + "".join(rng.choice("0123456789ABCDEF") for _ in range(6))
+            if not self._is_used(color):
+                return color
 
-    def _random_color_hex(self) -> str:
-        """Generate a random hex color string, e.g. '#A1B2C3'."""
-        return "#" + "".join(random.choice("0123456789ABCDEF") for _ in range(6))
+    def _is_used(self, color: str) -> bool:
+        """True if this manager or another one of the same file assigned `color`."""
+        return color in self._used_colors or color in _unsaved_used.get(self.colors_file, ())
@@ -0,0 +1,355 @@
+import itertools
+import json
+import os
+
+from atomic_io import atomic_write_json
+from transaction_ids import ID_FIELD, assign_ids, content_id, reference_id
+from transaction_journal import (
+    COMPACT_THRESHOLD,
+    TransactionJournal,
+    journal_paths,
+    transaction_key,
+)
+from transaction_store import TransactionStore, store_path
+
+# --------------------------------------------------------------------
+# Paths / Files
+# --------------------------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+TRANSACTIONS_FILE = os.path.join(DATA_DIR, "transactions.json")
+
+
+class TransactionDataset:
+    """
+    In-process view of transactions.json that is parsed once and shared
+    between main, the Category Manager and the Visualizer.
+
+    The (mtime, size) signature of the file and its journal is remembered
+    after every load or save, so load() only re-parses them when they
+    changed on disk.
+
+    Saves are incremental by default: append() journals only new or
+    changed rows, and the journal is compacted back into transactions.json
+    once it holds COMPACT_THRESHOLD rows.
+
+    Rows are identified by their stable ID (see transaction_ids); data
+    written before IDs existed gets its IDs in memory on load and is
+    migrated on disk by the first save, so reading never rewrites the file.
+
+    If a SQLite store (see transaction_store) exists next to the file, the
+    rows are kept in it instead: load() reads the store, append() upserts
+    only the new or changed rows and save() replaces its content. `store`
+    overrides that choice (a TransactionStore, or False for the JSON file).
+    """
+
+    def __init__(self, path=TRANSACTIONS_FILE, compact_threshold=COMPACT_THRESHOLD, store=None):
+        self.path = path
+        if store is None and os.path.exists(store_path(path)):
+            store = TransactionStore(store_path(path))
+        self.store = store or None
+        self.journal = TransactionJournal(*journal_paths(path), base_file=path)
+        self.compact_threshold = compact_threshold
+        self.transactions = []
+        self._signature = None
+        self._frame = None
+        self._index = None
+        self._positions = None
+        self._unmigrated = False
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def __iter__(self):
+        return iter(self.transactions)
+
+    # ----------------------------------------------------------------
+    # Stat-based cache
+    # ----------------------------------------------------------------
+    def _stat_signature(self):
+        if self.store is not None:
+            try:
+                st = os.stat(self.store.path)
+            except OSError:
+                return None
+            return st.st_mtime_ns, st.st_size, None
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        try:
+            jst = os.stat(self.journal.journal_file)
+            journal_sig = (jst.st_mtime_ns, jst.st_size)
+        except OSError:
+            journal_sig = None
+        return st.st_mtime_ns, st.st_size, journal_sig
+
+    def is_stale(self):
+        """True if the file on disk differs from what was last loaded/saved."""
+        return self._signature is None or self._stat_signature() != self._signature
+
+    # ----------------------------------------------------------------
+    # Loading / Saving
+    # ----------------------------------------------------------------
+    def load(self, force=False):
+        """
+        Return the list of transactions, re-reading the file only if it
+        changed since the last load (or if force=True).
+        """
+        signature = self._stat_signature()
+        if not force and signature is not None and signature == self._signature:
+            return self.transactions
+
+        if signature is None:
+            print(f"⚠ File not found: {self.path}")
+            self._set(None, [])
+            return self.transactions
+
+        if self.store is not None:
+            print(f"🔄 Loading transactions from {self.store.path}…")
+            self._set(signature, self.store.all())
+            self._unmigrated = False
+            print(f"✅ Loaded {len(self.transactions)} transactions.")
+            return self.transactions
+
+        print(f"🔄 Loading transactions from {self.path}…")
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.journal.invalidate()
+            journaled = self.journal.read()
+            unmigrated = any(not t.get(ID_FIELD) for t in itertools.chain(data, journaled))
+            if journaled or unmigrated:
+                # Rows without an ID get their content ID, counted in file order
+                data = merge_transactions(data, journaled)
+            print(f"✅ Loaded {len(data)} transactions.")
+        except Exception as e:
+            print(f"❌ Could not load transactions: {e}")
+            data, unmigrated = [], False
+        self._set(signature, data)
+        self._unmigrated = unmigrated
+        return self.transactions
+
+    def migrate_ids(self):
+        """
+        Write the IDs that rows stored without one got on load:
+        transactions.json is rewritten, which also re-keys the index and
+        empties the journal. Called by the first append(); a no-op once
+        the file is migrated.
+        """
+        if not self._unmigrated:
+            return False
+        print(f"🔧 Migrating {len(self.transactions)} transactions to stable IDs…")
+        self.save(self.transactions)
+        return True
+
+    def save(self, transactions):
+        """
+        Atomically write the given transactions as the complete new
+        transactions.json (full rewrite) and make them the current dataset.
+        Rows without an ID get one.
+        """
+        assign_ids(transactions)
+        if self.store is not None:
+            self.store.replace_all(transactions)
+        else:
+            atomic_write_json(self.path, transactions, indent=4)
+            self.journal.reset(transactions)
+        self._set(self._stat_signature(), transactions)
+        self._unmigrated = False
+
+    def append(self, transactions, compact=True):
+        """
+        Incrementally merge `transactions` into the dataset (last write per
+        ID wins; rows without an ID get one, counted within this call).
+        Only rows that are new or changed are written, to the append-only
+        journal (or upserted into the store). Returns that delta.
+
+        compact=False defers the threshold compaction, e.g. while a long
+        import appends batch after batch (call compact_if_needed() after).
+        """
+        transactions = assign_ids(list(transactions))
+        if self.store is not None:
+            self.load()
+            self._adopt_content_ids(transactions)
+            delta = self._changed(transactions)
+            if delta:
+                self.store.upsert_many(delta)
+                self._apply(delta)
+                self._signature = self._stat_signature()
+            return delta
+
+        if not os.path.exists(self.path):
+            # Nothing to append to yet: the first save writes the base file
+            merged = merge_transactions([], transactions)
+            self.save(merged)
+            return merged
+
+        # The merged data is needed to adopt IDs and to rebuild a stale index
+        self.load()
+        self.migrate_ids()
+        self._adopt_content_ids(transactions)
+        delta = self.journal.append(transactions, self.transactions)
+        if delta:
+            self._apply(delta)
+            if not (compact and self.compact_if_needed()):
+                self._signature = self._stat_signature()
+        return delta
+
+    def compact_if_needed(self):
+        """Compact once the journal holds compact_threshold rows. True if it did."""
+        if self.journal.row_count < self.compact_threshold:
+            return False
+        self.compact()
+        return True
+
+    def compact(self):
+        """Fold the journal into transactions.json (atomic rewrite)."""
+        print(f"🗜 Compacting {self.journal.row_count} journaled rows into {self.path}…")
+        self.save(self.transactions)
+
+    def _adopt_content_ids(self, transactions):
+        """
+        A row with a bank-reference ID whose transaction is stored under
+        its content ID (migrated data, or fetched while the bank sent no
+        reference) takes over that ID instead of becoming a duplicate, also
+        on later fetches. Identical rows were stored as content ID
+        occurrences -0, -1, …; each referenced row takes the lowest one that
+        is not taken by another reference (in the store or in this batch).
+        """
+        positions = self._position_index()
+        adopted = set()
+        for t in transactions:
+            if t[ID_FIELD] in positions or reference_id(t) != t[ID_FIELD]:
+                continue
+            for occurrence in itertools.count():
+                legacy = content_id(t, occurrence)
+                pos = positions.get(legacy)
+                if pos is None:
+                    break
+                if legacy in adopted:
+                    continue
+                if reference_id(self.transactions[pos]) in (None, t[ID_FIELD]):
+                    t[ID_FIELD] = legacy
+                    adopted.add(legacy)
+                    break
+
+    def _changed(self, transactions):
+        """The rows of `transactions` that are new or differ from the stored ones (one per ID)."""
+        positions = self._position_index()
+        latest = {transaction_key(t): t for t in transactions}
+        return [
+            t for key, t in latest.items()
+            if key not in positions or self.transactions[positions[key]] != t
+        ]
+
+    def _position_index(self):
+        if self._positions is None:
+            self._positions = {transaction_key(t): i for i, t in enumerate(self.transactions)}
+        return self._positions
+
+    def _apply(self, delta):
+        self._position_index()
+        for t in delta:
+            key = transaction_key(t)
+            pos = self._positions.get(key)
+            if pos is None:
+                self._positions[key] = len(self.transactions)
+                self.transactions.append(t)
+            else:
+                self.transactions[pos] = t
+        self._frame = None
+        self._index = None
+
+    def _set(self, signature, transactions):
+        self._signature = signature
+        self.transactions = transactions
+        self._frame = None
+        self._index = None
+        self._positions = None
+
+    # ----------------------------------------------------------------
+    # Derived views
+    # ----------------------------------------------------------------
+    def categories(self):
+        """Return the set of all non-empty categories."""
+        return {t.get("category") for t in self.transactions if t.get("category")}
+
+    def to_dataframe(self):
+        """
+        Return the typed chart frame of the transactions (see
+        frame_cache.build_frame). It is built once per load and kept in a
+        columnar cache next to transactions.json; if that cache matches
+        the file on disk, the frame is read from it without parsing the
+        JSON at all. Callers get a copy they are free to modify.
+        """
+        # Copy-on-write: the copy shares (memory-mapped) data until modified
+        return self._chart_frame().copy(deep=False)
+
+    def index(self):
+        """The TransactionIndex over the chart frame, built once per load."""
+        from transaction_index import TransactionIndex
+
+        if self._index is None:
+            self._index = TransactionIndex(self._chart_frame())
+        return self._index
+
+    def query(self, start=None, end=None, categories=None):
+        """
+        The transactions from `start` to `end` (inclusive) in the given
+        `categories` as a date-sorted chart frame, found through the index
+        (see TransactionIndex.query) instead of a scan of the whole history.
+        With a store and no index built yet, the store's date / category
+        indexes answer it without loading the other rows.
+        """
+        if self.store is not None and self._index is None:
+            from frame_cache import build_frame
+
+            return build_frame(self.store.query(start, end, categories))
+        return self.index().query(start, end, categories)
+
+    def _chart_frame(self):
+        from frame_cache import FrameCache, build_frame, frame_cache_dir
+
+        if self._frame is None:
+            cache = FrameCache(frame_cache_dir(self.path))
+            signature = self._stat_signature()
+            if signature is not None and signature == (self._signature or signature):
+                self._frame = cache.load(signature)
+            if self._frame is None:
+                self.load()
+                self._frame = build_frame(self.transactions)
+                if self._signature is not None:
+                    cache.save(self._frame, self._signature)
+        return self._frame
+
+
+def merge_transactions(old, new):
+    """
+    Merge two transaction lists by ID (rows without one get it first, see
+    transaction_ids.assign_ids). A later row replaces an earlier one with
+    the same ID but keeps its position.
+    """
+    rows = assign_ids(list(old)) + assign_ids(list(new))
+    return list({transaction_key(t): t for t in rows}.values())
+
+
+# --------------------------------------------------------------------
+# Shared instances
+# --------------------------------------------------------------------
+_datasets = {}
+
+
+def get_dataset(path=TRANSACTIONS_FILE, load=True):
+    """
+    Return the process-wide dataset for `path`, loading it on first use.
+    load=False skips parsing the file, e.g. when only to_dataframe() is
+    needed (it may be served from the frame cache).
+    """
+    dataset = _datasets.get(path)
+    if dataset is None:
+        dataset = _datasets[path] = TransactionDataset(path)
+    if load:
+        dataset.load()
+    return dataset
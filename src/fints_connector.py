@@ -1,89 +1,433 @@
-from fints.client import FinTS3PinTanClient
 import os
-from dotenv import load_dotenv
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
-from fints.utils import minimal_interactive_cli_bootstrap  # Enable TAN support
 
-# Enable detailed logging for debugging
-logging.basicConfig(level=logging.DEBUG)
+from money import to_amount, to_cents
+from transaction_ids import IdAssigner, assign_ids
 
-# Load environment variables from the .env file
-load_dotenv()
+# Default FinTS endpoint and product ID (must be registered with DK); both
+# can be overridden in the .env file
+DEFAULT_SERVER = "https://fints2.atruvia.de/cgi-bin/hbciservlet"
+DEFAULT_PRODUCT_ID = "VR-NetWorld Software 8.0"
 
-# Load banking credentials from environment variables
-BANK_IDENTIFIER = os.getenv("BANK_CODE")  # Bank code (BLZ) of your bank
-USER_ID = os.getenv("USER_ID")            # Your FinTS user ID
-CUSTOMER_ID = os.getenv("CUSTOMER_ID")    # Often the same as USER_ID
-PIN = os.getenv("PIN")                    # Your FinTS PIN
-SERVER = os.getenv("FINTS_SERVER", "https://fints2.atruvia.de/cgi-bin/hbciservlet")
+# Concurrent statement fetching (opt-in via get_transactions(workers=N))
+ACCOUNT_TIMEOUT = 120  # seconds per statement request
+ACCOUNT_RETRIES = 2    # extra attempts after a failed/timed-out request
+
+# Only one thread may prompt for a TAN at a time
+_tan_lock = threading.Lock()
+
+
+def create_client(from_data=None):
+    """
+    Build a FinTS client from the .env credentials with TAN support.
+    `from_data` (from client.deconstruct()) resumes an existing client's
+    system ID and bank parameters, so extra clients avoid a full sync.
+    """
+    # Imported here so that offline use never loads fints or reads .env
+    from dotenv import load_dotenv
+    from fints.client import FinTS3PinTanClient
+    from fints.utils import minimal_interactive_cli_bootstrap  # Enable TAN support
+
+    # Load banking credentials from the .env file / environment variables
+    load_dotenv()
+    bank_identifier = os.getenv("BANK_CODE")  # Bank code (BLZ) of your bank
+    user_id = os.getenv("USER_ID")            # Your FinTS user ID
+    customer_id = os.getenv("CUSTOMER_ID")    # Often the same as USER_ID
+    pin = os.getenv("PIN")                    # Your FinTS PIN
+    if not all([bank_identifier, user_id, customer_id, pin]):
+        raise ValueError("❌ Missing banking credentials! Please set them in the .env file.")
+
+    client = FinTS3PinTanClient(
+        bank_identifier=bank_identifier,
+        user_id=user_id,
+        customer_id=customer_id,
+        pin=pin,
+        server=os.getenv("FINTS_SERVER", DEFAULT_SERVER),
+        product_id=os.getenv("PRODUCT_ID", DEFAULT_PRODUCT_ID),
+        from_data=from_data
+    )
+
+    # Enable TAN handling
+    minimal_interactive_cli_bootstrap(client)
+    return client
+
+
+def normalize_transaction(tx, account):
+    """
+    Turn one statement entry into the transactions.json format. The ID is
+    added per statement (see transaction_ids.IdAssigner).
+    """
+    return {
+        "date": tx.data["date"].strftime("%Y-%m-%d"),
+        # Exact cents, stored as a JSON number (Decimal is not JSON-serializable)
+        "amount": to_amount(to_cents(tx.data["amount"].amount)),
+        "description": tx.data["applicant_name"] or "Unknown",
+        "account": account.iban,
+        "counterparty_iban": tx.data.get("applicant_iban"),
+        "reference": tx.data.get("end_to_end_reference"),
+    }
+
+
+def _call_with_timeout(func, timeout):
+    """
+    Run func() in a helper thread and wait at most `timeout` seconds.
+    A bank call cannot be cancelled, so on timeout the thread is abandoned
+    (and with it the dialog it runs on, see FinTSSession).
+    """
+    result = {}
+
+    def target():
+        try:
+            result["value"] = func()
+        except BaseException as e:
+            result["error"] = e
+
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        raise TimeoutError(f"no response within {timeout}s")
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+class FinTSSession:
+    """
+    One open FinTS dialog on one client. The SEPA account list is fetched
+    once and cached, and statements and balances are served from the same
+    dialog, so a full sync needs a single dialog setup (and TAN check).
+
+    `round_trips` counts the bank requests issued through this session
+    (dialog init/end, TAN, account list, statements, balances); every
+    public call logs how many it used.
+
+    After a request timed out, its abandoned thread may still be talking
+    to the bank on this client, and FinTS clients and dialogs are not
+    thread-safe: the session is then `abandoned` and refuses any further
+    request (no retries, no dialog end). Retrying is left to a new client.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.round_trips = 0
+        self.abandoned = False
+        self.failed_attempts = 0  # failed statement requests (see get_statement)
+        self._accounts = None
+
+    def __enter__(self):
+        self._request(self.client.__enter__)
+        if self.client.init_tan_response:
+            with _tan_lock:
+                print(f"🔒 TAN required: {self.client.init_tan_response.challenge}")
+                tan = input("Please enter TAN: ")
+                self._request(self.client.send_tan, self.client.init_tan_response, tan)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.abandoned:
+            logging.warning("⚠ FinTS dialog abandoned after a timeout; not ending it on this client.")
+            return False
+        self.round_trips += 1
+        logging.info(f"ℹ FinTS dialog closed after {self.round_trips} bank round trip(s).")
+        return self.client.__exit__(exc_type, exc, tb)
+
+    def _request(self, func, *args, **kwargs):
+        if self.abandoned:
+            raise RuntimeError("FinTS dialog abandoned after a timeout")
+        self.round_trips += 1
+        return func(*args, **kwargs)
+
+    def _timed_request(self, func, timeout):
+        try:
+            return self._request(_call_with_timeout, func, timeout)
+        except TimeoutError:
+            self.abandoned = True
+            raise
+
+    def _log_round_trips(self, call, before):
+        logging.info(f"ℹ {call}: {self.round_trips - before} bank round trip(s).")
+
+    # ----------------------------------------------------------------
+    # Requests
+    # ----------------------------------------------------------------
+    @property
+    def accounts(self):
+        """SEPA accounts of this login (requested once per session)."""
+        if self._accounts is None:
+            self._accounts = self._request(self.client.get_sepa_accounts)
+        return self._accounts
+
+    def test_connection(self):
+        """Lists the available accounts."""
+        before = self.round_trips
+        accounts = self.accounts
+        if accounts:
+            print("✅ Connection successful! Found accounts:")
+            for account in accounts:
+                print(f"- IBAN: {account.iban}, BIC: {account.bic}")
+        else:
+            print("⚠ No accounts found. Please check your credentials.")
+        self._log_round_trips("test_connection", before)
+        return accounts
+
+    def get_statement(self, account, start_date=None, end_date=None,
+                      timeout=ACCOUNT_TIMEOUT, retries=ACCOUNT_RETRIES):
+        """
+        Fetch one account's statement with timeout and retries.
+        Raises the last error if all attempts failed; a timeout ends the
+        session at once (see `abandoned`), without retrying on it.
+        """
+        def request():
+            # Pass start_date/end_date to the bank call if supported by the backend
+            if start_date:
+                return self.client.get_statement(account, start_date=start_date, end_date=end_date)
+            return self.client.get_statement(account)
+
+        for attempt in range(1 + retries):
+            try:
+                return self._timed_request(request, timeout)
+            except Exception as e:
+                logging.warning(f"⚠ {account.iban}: attempt {attempt + 1}/{1 + retries} failed: {e}")
+                self.failed_attempts += 1
+                if self.abandoned:
+                    raise
+                last_error = e
+        raise last_error
+
+    def iter_statement(self, account, start_date=None, end_date=None,
+                       timeout=ACCOUNT_TIMEOUT, retries=ACCOUNT_RETRIES):
+        """
+        Yield one account's statement entries. Backends that can stream a
+        statement (an `iter_statement` method, e.g. fints_stub) are consumed
+        lazily; otherwise the statement is requested with get_statement().
+        For streams, `timeout` and `retries` apply to the request, i.e.
+        until the first entry arrives; a timeout ends the session as in
+        get_statement().
+        """
+        stream = getattr(self.client, "iter_statement", None)
+        if stream is None:
+            yield from self.get_statement(account, start_date, end_date, timeout, retries)
+            return
+
+        for attempt in range(1 + retries):
+            entries = stream(account, start_date=start_date, end_date=end_date)
+            try:
+                first = self._timed_request(lambda: next(entries, None), timeout)
+            except Exception as e:
+                logging.warning(f"⚠ {account.iban}: attempt {attempt + 1}/{1 + retries} failed: {e}")
+                self.failed_attempts += 1
+                if self.abandoned:
+                    raise
+                last_error = e
+                continue
+            if first is not None:
+                yield first
+                yield from entries
+            return
+        raise last_error
+
+    def iter_transactions(self, start_date=None, end_date=None,
+                          timeout=ACCOUNT_TIMEOUT, retries=ACCOUNT_RETRIES, errors=None,
+                          sync_state=None):
+        """
+        Yield the normalized transactions of all accounts, one statement
+        entry at a time, so callers can process any history length in
+        bounded batches. Failed accounts are logged and stored in `errors`
+        ({iban: message}); rows an account yielded before failing are kept.
+        With a `sync_state`, each account is fetched from its own high-water
+        mark (see _account_start_date) and the mark is advanced once the
+        account's statement was read completely.
+        """
+        before = self.round_trips
+        if end_date is None:
+            end_date = date.today()
+        for account in self.accounts:
+            account_start = _account_start_date(account, start_date, sync_state)
+            last_booking = None
+            ids = IdAssigner()
+            try:
+                for tx in self.iter_statement(account, account_start, end_date, timeout, retries):
+                    row = ids.assign(normalize_transaction(tx, account))
+                    if last_booking is None or row["date"] > last_booking:
+                        last_booking = row["date"]
+                    yield row
+            except Exception as e:
+                _record_error(errors, account, e)
+                continue
+            if sync_state is not None:
+                sync_state.advance(account.iban, last_booking)
+        self._log_round_trips("iter_transactions", before)
+
+    def get_transactions(self, start_date=None, end_date=None,
+                         timeout=ACCOUNT_TIMEOUT, retries=ACCOUNT_RETRIES, errors=None,
+                         sync_state=None):
+        """
+        Fetches the transactions of all accounts sequentially in this dialog
+        and returns them as one list (see iter_transactions).
+        """
+        return list(self.iter_transactions(
+            start_date, end_date, timeout, retries, errors=errors, sync_state=sync_state
+        ))
+
+    def get_balance(self):
+        """
+        Returns a dictionary where the IBAN is the key and the balance
+        (amount and currency) is the value.
+        """
+        before = self.round_trips
+        balances = {}
+        for account in self.accounts:
+            balance = self._request(self.client.get_balance, account)
+            balances[account.iban] = {
+                "amount": balance.amount,
+                "currency": balance.currency
+            }
+        self._log_round_trips("get_balance", before)
+        return balances
+
+
+def _account_start_date(account, start_date, sync_state):
+    """
+    First booking date to request for an account: its last synced booking
+    date minus the overlap window if known, else `start_date`.
+    """
+    if sync_state is None:
+        return start_date
+    account_start = sync_state.start_date_for(account.iban, default=start_date)
+    if account_start != start_date:
+        logging.info(f"ℹ {account.iban}: incremental sync from {account_start}.")
+    return account_start
+
+
+def _record_error(errors, account, error):
+    if errors is not None:
+        errors[account.iban] = str(error) or type(error).__name__
+    logging.error(f"❌ Error retrieving transactions for {account.iban}: {error}")
 
-# Set product ID (must be registered with DK)
-PRODUCT_ID = os.getenv("PRODUCT_ID", "VR-NetWorld Software 8.0")
 
 class FinTSConnector:
-    def __init__(self):
-        """Initializes the FinTS client with banking credentials and enables TAN support."""
-        if not all([BANK_IDENTIFIER, USER_ID, CUSTOMER_ID, PIN]):
-            raise ValueError("❌ Missing banking credentials! Please set them in the .env file.")
-
-        # Initialize FinTS client
-        self.client = FinTS3PinTanClient(
-            bank_identifier=BANK_IDENTIFIER,
-            user_id=USER_ID,
-            customer_id=CUSTOMER_ID,
-            pin=PIN,
-            server=SERVER,
-            product_id=PRODUCT_ID
-        )
-
-        # Enable TAN handling
-        minimal_interactive_cli_bootstrap(self.client)
-
-    def get_transactions(self, start_date: date = None, end_date: date = None):
+    def __init__(self, client_factory=None):
+        """
+        Initializes the FinTS client with banking credentials and enables TAN support.
+
+        `client_factory` creates a new client object; it defaults to
+        create_client() and can be replaced, e.g. by fints_stub.FakeFinTSClient,
+        to run without a bank. Concurrent fetching uses one client per worker.
+
+        The single-call methods below each open their own dialog; use
+        session() to run several of them in one dialog.
+        """
+        self.client_factory = client_factory or create_client
+        self.client = self.client_factory()
+        # Per-account errors of the last get_transactions() call: {iban: message}
+        self.errors = {}
+
+    def session(self):
+        """Open one dialog for several requests: `with connector.session() as s: ...`"""
+        return FinTSSession(self.client)
+
+    def _new_worker_client(self):
+        if self.client_factory is create_client and hasattr(self.client, "deconstruct"):
+            return create_client(from_data=self.client.deconstruct(including_private=True))
+        return self.client_factory()
+
+    def get_transactions(self, start_date: date = None, end_date: date = None,
+                         workers: int = None, timeout: float = ACCOUNT_TIMEOUT,
+                         retries: int = ACCOUNT_RETRIES, sync_state=None):
         """
         Fetches transactions for all SEPA accounts.
         If start_date is provided, only transactions from that date onward are fetched.
         end_date defaults to today if not given.
+
+        With a `sync_state` (sync_state.SyncState), only the delta is fetched:
+        every account starts at its last synced booking date minus the overlap
+        window (accounts never synced fall back to start_date), and the state
+        is advanced for each account that was fetched successfully. Saving the
+        state is left to the caller, after the transactions were stored.
+
+        With workers > 1, statements are fetched concurrently by a bounded
+        pool, each worker with its own client/dialog. Every statement request
+        gets `timeout` seconds and `retries` extra attempts; after a timeout,
+        the remaining attempts run on a new client and dialog. A failing account
+        no longer discards the others: its error is logged and stored in
+        self.errors, and the transactions of all other accounts are returned.
         """
         if end_date is None:
             end_date = date.today()
+        self.errors = {}
 
         try:
-            with self.client:
-                # If PSD2 requires a TAN, prompt the user
-                if self.client.init_tan_response:
-                    print(f"🔒 TAN required: {self.client.init_tan_response.challenge}")
-                    tan = input("Please enter TAN: ")
-                    self.client.send_tan(self.client.init_tan_response, tan)
-
-                accounts = self.client.get_sepa_accounts()
-                transactions = []
-
-                for account in accounts:
-                    # Pass start_date/end_date to the bank call if supported by the backend
-                    if start_date:
-                        statement = self.client.get_statement(
-                            account,
-                            start_date=start_date,
-                            end_date=end_date
-                        )
-                    else:
-                        statement = self.client.get_statement(account)
-
-                    for tx in statement:
-                        transactions.append({
-                            "date": tx.data["date"].strftime("%Y-%m-%d"),
-                            "amount": tx.data["amount"].amount,
-                            "description": tx.data["applicant_name"] or "Unknown"
-                        })
-
-                return transactions
-
+            with self.session() as session:
+                if not workers or workers <= 1:
+                    return session.get_transactions(
+                        start_date, end_date, timeout, retries, errors=self.errors,
+                        sync_state=sync_state
+                    )
+                accounts = session.accounts
         except Exception as e:
             logging.error(f"❌ Error retrieving transactions: {e}")
             return []
 
+        with ThreadPoolExecutor(max_workers=min(workers, len(accounts) or 1)) as pool:
+            results = list(pool.map(
+                lambda account: self._fetch_in_own_dialog(
+                    account, _account_start_date(account, start_date, sync_state),
+                    end_date, timeout, retries
+                ),
+                accounts
+            ))
+
+        transactions = []
+        for account, statement in zip(accounts, results):
+            if statement is None:
+                continue
+            rows = assign_ids(normalize_transaction(tx, account) for tx in statement)
+            if sync_state is not None:
+                sync_state.update(account.iban, rows)
+            transactions.extend(rows)
+
+        if self.errors:
+            logging.warning(f"⚠ {len(self.errors)} of {len(accounts)} account(s) failed: "
+                            + ", ".join(self.errors))
+        return transactions
+
+    def iter_transactions(self, start_date: date = None, end_date: date = None,
+                          timeout: float = ACCOUNT_TIMEOUT, retries: int = ACCOUNT_RETRIES,
+                          sync_state=None):
+        """
+        Streaming variant of get_transactions(): yields normalized
+        transactions one statement entry at a time from a single dialog
+        (sequential only). Per-account errors are stored in self.errors.
+        """
+        self.errors = {}
+        try:
+            with self.session() as session:
+                yield from session.iter_transactions(
+                    start_date, end_date, timeout, retries, errors=self.errors,
+                    sync_state=sync_state
+                )
+        except Exception as e:
+            logging.error(f"❌ Error retrieving transactions: {e}")
+
+    def _fetch_in_own_dialog(self, account, start_date, end_date, timeout, retries):
+        # A timed-out request may still run on its client, so the attempts
+        # left after a timeout continue on a fresh client and dialog
+        while True:
+            session = FinTSSession(self._new_worker_client())
+            try:
+                with session:
+                    return session.get_statement(account, start_date, end_date, timeout, retries)
+            except Exception as e:
+                retries -= session.failed_attempts
+                if not session.abandoned or retries < 0:
+                    _record_error(self.errors, account, e)
+                    return None
+                logging.warning(f"⚠ {account.iban}: retrying on a new FinTS dialog.")
+
     def get_balance(self):
         """
         Retrieves the current account balance for all SEPA accounts via FinTS.
@@ -91,23 +435,8 @@ class FinTSConnector:
         (amount and currency) is the value.
         """
         try:
-            with self.client:
-                if self.client.init_tan_response:
-                    print(f"🔒 TAN required: {self.client.init_tan_response.challenge}")
-                    tan = input("Please enter TAN: ")
-                    self.client.send_tan(self.client.init_tan_response, tan)
-
-                accounts = self.client.get_sepa_accounts()
-                balances = {}
-
-                for account in accounts:
-                    balance = self.client.get_balance(account)
-                    balances[account.iban] = {
-                        "amount": balance.amount,
-                        "currency": balance.currency
-                    }
-                return balances
-
+            with self.session() as session:
+                return session.get_balance()
         except Exception as e:
             logging.error(f"❌ Error retrieving account balance: {e}")
             return {}
@@ -115,18 +444,7 @@ class FinTSConnector:
     def test_connection(self):
         """Tests the connection to the bank and lists available accounts."""
         try:
-            with self.client:
-                if self.client.init_tan_response:
-                    print(f"🔒 TAN required: {self.client.init_tan_response.challenge}")
-                    tan = input("Please enter TAN: ")
-                    self.client.send_tan(self.client.init_tan_response, tan)
-
-                accounts = self.client.get_sepa_accounts()
-                if accounts:
-                    print("✅ Connection successful! Found accounts:")
-                    for account in accounts:
-                        print(f"- IBAN: {account.iban}, BIC: {account.bic}")
-                else:
-                    print("⚠ No accounts found. Please check your credentials.")
+            with self.session() as session:
+                session.test_connection()
         except Exception as e:
             logging.error(f"❌ Connection failed: {e}")
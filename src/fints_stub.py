@@ -0,0 +1,123 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+# --------------------------------------------------------------------
+# Minimal stand-ins for the python-fints objects FinTSConnector uses
+# --------------------------------------------------------------------
+class FakeAccount:
+    def __init__(self, iban, bic="GENODEF1XXX"):
+        self.iban = iban
+        self.bic = bic
+
+
+class FakeAmount:
+    def __init__(self, amount, currency="EUR"):
+        self.amount = amount
+        self.currency = currency
+
+
+class FakeTransaction:
+    """Statement entry with the same .data layout as mt940 transactions."""
+
+    def __init__(self, booking_date, amount, applicant_name, applicant_iban=None,
+                 end_to_end_reference=None):
+        self.data = {
+            "date": booking_date,
+            "amount": FakeAmount(amount),
+            "applicant_name": applicant_name,
+            "applicant_iban": applicant_iban,
+            "end_to_end_reference": end_to_end_reference,
+        }
+
+
+PAYEES = ["REWE", "EDEKA", "Aldi", "Stadtwerke", "Telekom", "Netflix", "Landlord", "Employer"]
+CARD_PAYEES = {"REWE", "EDEKA", "Aldi"}
+
+
+def payee_iban(name):
+    """Fixed counterparty IBAN per payee."""
+    return f"DE89{PAYEES.index(name):018d}"
+
+
+class FakeFinTSClient:
+    """
+    Local fake of FinTS3PinTanClient for offline development and for
+    exercising FinTSConnector without a bank:
+
+      - `latency` seconds are slept per bank request,
+      - `failures` maps an IBAN to the number of get_statement calls that
+        raise before it succeeds (use a large number for a dead account),
+      - every account gets `entries_per_day` deterministic statement
+        entries per day between `history_start` and today,
+      - `requests` counts the simulated bank round trips (dialog init and
+        end included), `dialogs` the opened dialogs.
+    """
+
+    def __init__(self, ibans=("DE00000000000000000001",), latency=0.0, failures=None,
+                 entries_per_day=1, history_start=date(2024, 1, 1), seed=0):
+        self.accounts = [FakeAccount(iban) for iban in ibans]
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.entries_per_day = entries_per_day
+        self.history_start = history_start
+        self.seed = seed
+        self.init_tan_response = None
+        self.dialogs = 0
+        self.requests = 0
+
+    # Dialog handling
+    def __enter__(self):
+        self.dialogs += 1
+        self._request()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._request()
+        return False
+
+    def _request(self):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    # Bank requests
+    def get_sepa_accounts(self):
+        self._request()
+        return list(self.accounts)
+
+    def get_statement(self, account, start_date=None, end_date=None):
+        self._statement_request(account)
+        return list(self._entries(account, start_date, end_date))
+
+    def iter_statement(self, account, start_date=None, end_date=None):
+        """Stream the statement entries lazily (same data as get_statement)."""
+        self._statement_request(account)
+        yield from self._entries(account, start_date, end_date)
+
+    def _statement_request(self, account):
+        self._request()
+        if self.failures.get(account.iban, 0) > 0:
+            self.failures[account.iban] -= 1
+            raise ConnectionError(f"simulated failure for {account.iban}")
+
+    def _entries(self, account, start_date, end_date):
+        start = start_date or self.history_start
+        end = end_date or date.today()
+        rng = random.Random(f"{self.seed}-{account.iban}")
+        day = self.history_start
+        while day <= end:
+            for i in range(self.entries_per_day):
+                amount = Decimal(rng.randint(-20000, 5000)) / 100
+                name = rng.choice(PAYEES)
+                payee = f"{name} {rng.randint(1000, 9999)}"
+                # Transfers carry an end-to-end reference, card payments not
+                reference = None if name in CARD_PAYEES else f"E2E{account.iban[-4:]}{day:%Y%m%d}{i}"
+                if day >= start:
+                    yield FakeTransaction(day, amount, payee, payee_iban(name), reference)
+            day += timedelta(days=1)
+
+    def get_balance(self, account):
+        self._request()
+        return FakeAmount(Decimal("1000.00"))
@@ -0,0 +1,138 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from atomic_io import atomic_write_json
+from transaction_table import TransactionTable
+
+# Bump when the on-disk layout changes; older caches are rebuilt.
+FRAME_CACHE_VERSION = 4
+
+# String columns kept as pandas Categoricals in the frame; other string
+# columns (account, counterparty_iban, …) are decoded to plain objects
+CATEGORICAL_COLUMNS = ("category", "description")
+
+META_FILE = "meta.json"
+_SEPARATOR = "\x00"
+
+
+def frame_cache_dir(path):
+    """Cache directory next to transactions.json: transactions.frame/."""
+    return os.path.splitext(path)[0] + ".frame"
+
+
+def build_frame(transactions):
+    """
+    The typed chart frame of a list of transaction dicts (datetime64
+    dates, int64 cents, categorical category/description columns),
+    built from a TransactionTable. Rows are sorted by date (stable), the
+    order the TransactionIndex searches in.
+    """
+    table = TransactionTable.from_transactions(transactions)
+    frame = table.to_dataframe(CATEGORICAL_COLUMNS)
+    if len(table) > 1 and not (table.dates[1:] >= table.dates[:-1]).all():
+        frame = frame.take(np.argsort(table.dates, kind="stable")).reset_index(drop=True)
+    return frame
+
+
+class FrameCache:
+    """
+    Columnar on-disk copy of the chart frame: one .npy file per column
+    (dates and numbers as they are, strings dictionary-encoded as int32
+    codes plus their distinct values), loaded memory-mapped. The cache is
+    tied to the (mtime, size) signature of transactions.json and its
+    journal (see TransactionDataset), so a cold chart start skips the JSON
+    parse, the DataFrame construction and the date parsing.
+
+    meta.json is written last and removed first, so an interrupted save
+    leaves no valid cache behind.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _file(self, name):
+        return os.path.join(self.directory, name)
+
+    def _read_meta(self):
+        try:
+            with open(self._file(META_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load(self, signature):
+        """Return the cached frame if it matches `signature`, else None."""
+        meta = self._read_meta()
+        if (
+            meta is None
+            or meta.get("version") != FRAME_CACHE_VERSION
+            or meta.get("signature") != _jsonable(signature)
+        ):
+            return None
+        try:
+            columns = {}
+            for name, kind in meta["columns"]:
+                values = np.load(self._file(f"{name}.npy"), mmap_mode="r")
+                if kind == "strings":
+                    blob = np.load(self._file(f"{name}.values.npy"), mmap_mode="r")
+                    uniques = blob.tobytes().decode("utf-8").split(_SEPARATOR) if blob.size else []
+                    if name in CATEGORICAL_COLUMNS:
+                        values = pd.Categorical.from_codes(values, categories=uniques)
+                    else:
+                        values = np.array(uniques + [None], dtype=object)[values]
+                columns[name] = values
+            return pd.DataFrame(columns, copy=False)
+        except Exception:
+            print("⚠ Could not load the frame cache. Rebuilding it.")
+            return None
+
+    def save(self, frame, signature):
+        """
+        Write `frame` (as returned by build_frame) for `signature`.
+        Frames with mixed-type columns are not cached; returns False then.
+        """
+        arrays = {}
+        kinds = []
+        for name in frame.columns:
+            series = frame[name]
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                codes = series.cat.codes.to_numpy()
+                uniques = list(series.cat.categories)
+            elif pd.api.types.is_datetime64_dtype(series.dtype) or pd.api.types.is_numeric_dtype(series.dtype):
+                arrays[f"{name}.npy"] = series.to_numpy()
+                kinds.append((name, "values"))
+                continue
+            else:
+                codes, uniques = pd.factorize(series)
+                uniques = list(uniques)
+            if not all(isinstance(u, str) and _SEPARATOR not in u for u in uniques):
+                return False
+            arrays[f"{name}.npy"] = codes.astype(np.int32)
+            blob = _SEPARATOR.join(uniques).encode("utf-8")
+            arrays[f"{name}.values.npy"] = np.frombuffer(blob, dtype=np.uint8)
+            kinds.append((name, "strings"))
+
+        self.clear()
+        os.makedirs(self.directory, exist_ok=True)
+        for file_name, array in arrays.items():
+            np.save(self._file(file_name), array, allow_pickle=False)
+        atomic_write_json(self._file(META_FILE), {
+            "version": FRAME_CACHE_VERSION,
+            "signature": _jsonable(signature),
+            "rows": len(frame),
+            "columns": kinds,
+        })
+        return True
+
+    def clear(self):
+        if os.path.isdir(self.directory):
+            shutil.rmtree(self.directory)
+
+
+def _jsonable(signature):
+    """Signature tuples as they compare after a JSON round trip."""
+    return json.loads(json.dumps(signature))
@@ -1,16 +1,16 @@
 #!/usr/bin/env python3
-import sys
-import json
+import argparse
+import re
 import os
+import time
 from datetime import date
 
-from categorizer import Categorizer
-from visualizer import Visualizer
-from category_manager import (
-    run_category_manager,
-    load_category_order,
-    discover_categories_from_transactions
-)
+# Only lightweight modules are imported here. pandas/plotly (Visualizer,
+# AggregateCache), NumPy (Categorizer, CategoryModel), tkinter (Category
+# Manager) and fints are imported by the commands that need them, so
+# `main.py --help` and offline commands start fast.
+from dataset import get_dataset, merge_transactions
+from sync_state import SyncState, SyncReport
 
 # --------------------------------------------------------------------
 # Paths / Config
@@ -19,25 +19,40 @@ BASE_DIR          = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR          = os.path.join(BASE_DIR, "data")
 TRANSACTIONS_FILE = os.path.join(DATA_DIR, "transactions.json")
 ORDER_FILE        = os.path.join(DATA_DIR, "category_order.json")
+REPORTS_DIR       = os.path.join(BASE_DIR, "reports")
+
+# Rows categorized and stored per step when importing transactions (large
+# enough for Categorizer's parallel lookups, see categorizer.PARALLEL_THRESHOLD)
+IMPORT_BATCH_SIZE = 10000
 
 # --------------------------------------------------------------------
 # Auto-launch Category Manager if no order file / lists empty / new cats
 # --------------------------------------------------------------------
-fixed, variable, unassigned = load_category_order()
-known       = set(fixed) | set(variable) | set(unassigned)
-discovered  = discover_categories_from_transactions()
-missing     = [c for c in discovered if c not in known]
-
-need_manager = (
-    not os.path.exists(ORDER_FILE) or
-    (not fixed and not variable) or
-    bool(missing)
-)
+def ensure_category_order(dataset):
+    """
+    Open the Category Manager if the order file is missing, both lists are
+    empty or the dataset contains categories that are not sorted yet.
+    """
+    from category_manager import (
+        run_category_manager,
+        load_category_order,
+        discover_categories_from_transactions
+    )
 
-if need_manager:
-    print("🛠 Opening Category Manager to define/sort your categories…")
-    run_category_manager()
     fixed, variable, unassigned = load_category_order()
+    known       = set(fixed) | set(variable) | set(unassigned)
+    discovered  = discover_categories_from_transactions(dataset)
+    missing     = [c for c in discovered if c not in known]
+
+    need_manager = (
+        not os.path.exists(ORDER_FILE) or
+        (not fixed and not variable) or
+        bool(missing)
+    )
+
+    if need_manager:
+        print("🛠 Opening Category Manager to define/sort your categories…")
+        run_category_manager(dataset)
 
 # --------------------------------------------------------------------
 # Helpers for transactions.json
@@ -45,98 +60,492 @@ if need_manager:
 def load_transactions():
     """
     Load transactions from local JSON file if it exists.
+    The file is parsed once and shared; later calls reuse the cached data
+    unless the file changed on disk.
     """
-    print(f"🔄 Loading transactions from {TRANSACTIONS_FILE}…")
-    if os.path.exists(TRANSACTIONS_FILE):
-        try:
-            with open(TRANSACTIONS_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                print(f"✅ Loaded {len(data)} transactions.")
-                return data
-        except Exception as e:
-            print(f"❌ Could not load transactions: {e}")
-    else:
-        print(f"⚠ File not found: {TRANSACTIONS_FILE}")
-    return []
+    return get_dataset(TRANSACTIONS_FILE).transactions
 
-def save_transactions(transactions):
+def save_transactions(transactions, incremental=True):
     """
-    Save transactions locally, ensuring uniqueness by date-amount-description key.
+    Save transactions locally, ensuring uniqueness by transaction ID (see transaction_ids).
+
+    By default only new or changed rows are appended to the journal next to
+    transactions.json (compacted automatically); incremental=False rewrites
+    the whole file. Both paths write atomically.
+
+    Returns the new/changed rows of an incremental save, [] for a full
+    rewrite and None if saving failed.
     """
-    old = load_transactions()
-    combined = old + transactions
-    uniq = {
-        f"{t['date']}-{t['amount']}-{t['description']}": t
-        for t in combined
-    }
+    dataset = get_dataset(TRANSACTIONS_FILE)
     try:
-        with open(TRANSACTIONS_FILE, "w", encoding="utf-8") as f:
-            json.dump(list(uniq.values()), f, indent=4)
-        print(f"✅ {len(uniq)} unique transactions saved.")
+        if incremental:
+            delta = dataset.append(transactions)
+            print(f"✅ {len(delta)} new/changed transactions saved "
+                  f"({len(dataset)} unique in total).")
+            return delta
+        dataset.save(merge_transactions(dataset.transactions, transactions))
+        print(f"✅ {len(dataset)} unique transactions saved.")
+        return []
     except Exception as e:
         print(f"❌ Error while saving transactions: {e}")
+        return None
 
-# --------------------------------------------------------------------
-# Main application logic
-# --------------------------------------------------------------------
-def main():
+def import_transactions(transactions, batch_size=IMPORT_BATCH_SIZE, review_file=None, dataset=None):
+    """
+    Categorize and store an iterable of transactions (e.g. the generator of
+    FinTSConnector.iter_transactions) in batches of `batch_size` rows, so
+    only one batch of fetched rows is held at a time. Duplicates are
+    dropped by the dataset's key index; the journal is compacted once at
+    the end instead of after every batch.
+
+    While streaming, nothing is asked: known descriptions, rules and the
+    model categorize what they can, and only a small summary per group of
+    unknown descriptions is kept (see categorizer.GroupSummary). Once the
+    iterable is exhausted (and a bank dialog feeding it is closed), the
+    open rows of those groups are read back from the dataset and asked
+    once per group (see Categorizer.categorize_batch), and the answered
+    rows are stored again; with a `review_file` the groups are merged into
+    that file instead (see review_categories()). New category mappings
+    are saved once at the end.
 
-    # === DYNAMIC PART: FinTS-Integration ===
+    `dataset` defaults to the shared dataset of transactions.json.
+    Returns a SyncReport of rows fetched vs. new/changed, or None if saving
+    failed.
     """
-    # Uncomment this block for Live-FinTS mode:
+    from categorizer import Categorizer, summarize_groups
 
+    if dataset is None:
+        dataset = get_dataset(TRANSACTIONS_FILE)
+    categorizer = Categorizer()
+    categorizer.ensure_model(dataset.transactions)
+    report = SyncReport()
+    pending = {}
+    try:
+        for batch in _batched(transactions, batch_size):
+            summarize_groups(categorizer.categorize_batch(batch, interactive=False), pending)
+            report.add(batch, dataset.append(batch, compact=False))
+        if review_file and pending:
+            categorizer.export_review(pending, review_file, merge=True)
+        elif pending:
+            open_rows = _open_rows(dataset, categorizer, pending)
+            categorizer.categorize_batch(open_rows, interactive=True)
+            # Already counted as new by the report; only store the answers
+            dataset.append([tx for tx in open_rows if tx.get("category")], compact=False)
+        dataset.compact_if_needed()
+    except Exception as e:
+        print(f"❌ Error while importing transactions: {e}")
+        return None
+    finally:
+        close = getattr(transactions, "close", None)
+        if close is not None:
+            close()
+        categorizer.close()
+        if categorizer.dirty:
+            categorizer.save_categories()
+    print(f"✅ {report.new} new/changed transactions saved "
+          f"({len(dataset)} unique in total).")
+    return report
+
+def _open_rows(dataset, categorizer, keys):
+    """
+    Copies of the uncategorized rows of the dataset whose normalized
+    description is one of `keys` (copies, so answers show up as changes).
+    """
+    key_of = {}
+    rows = []
+    for tx in dataset.transactions:
+        if tx.get("category"):
+            continue
+        description = tx["description"]
+        key = key_of.get(description)
+        if key is None:
+            key = key_of[description] = categorizer.normalize(description)
+        if key in keys:
+            rows.append(dict(tx))
+    return rows
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# --------------------------------------------------------------------
+# Commands
+# --------------------------------------------------------------------
+def fetch_transactions(debug=False, review=False):
+    """
+    `import`: connect to the bank via FinTS, fetch balances and stream new
+    transactions into the dataset in a single bank dialog (categorizing
+    them on the way), then advance the sync state. Unknown descriptions
+    are asked after the dialog is closed, or with review=True written to
+    the review file (see review_categories()).
+    """
+    import logging
     from fints_connector import FinTSConnector
 
-    # Initialize and test connection
+    logging.basicConfig(level=logging.DEBUG if debug else logging.INFO)
     fints = FinTSConnector()
-    fints.test_connection()
-
-    # Decide whether to fetch full history or only new transactions
-    existing = load_transactions()
-    if existing:
-        oldest_iso = min(tx["date"] for tx in existing)
-        oldest_date = date.fromisoformat(oldest_iso)
-        print(f"⏳ Fetching since {oldest_date}")
-        transactions = fints.get_transactions(start_date=oldest_date)
-    else:
-        print("⏳ Fetching full history")
-        transactions = fints.get_transactions()
+    sync_state = SyncState()
+    balance_dict = {}
+
+    def stream():
+        # The dialog stays open only while the rows are consumed
+        with fints.session() as bank:
+            bank.test_connection()
+
+            # Fetch live balances
+            balance_dict.update(bank.get_balance())
 
-    # Fetch live balances
-    balance_dict = fints.get_balance()
+            # Accounts with a sync state only fetch the delta since their last
+            # booking date (minus the overlap window); the others fall back to
+            # the oldest known transaction or the full history
+            existing = load_transactions()
+            sync_state.seed_from(existing)
+            oldest_date = None
+            if existing:
+                oldest_date = date.fromisoformat(min(tx["date"] for tx in existing))
+                print(f"⏳ Fetching new transactions (unsynced accounts since {oldest_date})")
+            else:
+                print("⏳ Fetching full history")
+            yield from bank.iter_transactions(
+                start_date=oldest_date, errors=fints.errors, sync_state=sync_state
+            )
+
+    report = import_transactions(stream(), review_file=_review_file(review))
+
+    for iban, error in fints.errors.items():
+        print(f"⚠ {iban} could not be fetched: {error}")
     print("🏦 Current balances:")
     for iban, info in balance_dict.items():
         print(f"  • {iban}: {info['amount']} {info['currency']}")
-    """
 
-    # === STATIC PART: Local Test Mode ===
-    #"""
-    # Use this block if you only want to read from the local JSON file:
+    # Advance the sync state only once the fetched rows are stored
+    if report is not None:
+        report.print()
+        sync_state.save()
+    return report
 
+def categorize_transactions(review=False):
+    """
+    `categorize`: categorize the locally stored transactions (asking once
+    per group of unknown descriptions, or with review=True writing them to
+    the review file) and store the result.
+    """
     transactions = load_transactions()
     if not transactions:
         print("⚠ No transactions available. Exiting.")
-        return
+        return None
 
     print(f"✅ {len(transactions)} transactions loaded (local).")
-    #"""
+    return import_transactions(transactions, review_file=_review_file(review))
 
-    # --- After choosing one of the above, proceed with categorization & visualization ---
-    categorizer = Categorizer()
-    for tx in transactions:
-        if not tx.get("category"):
-            tx["category"] = categorizer.categorize_transaction(tx)
-    save_transactions(transactions)
+def _review_file(review):
+    """Review file path for a command's --review flag, or None."""
+    if not review:
+        return None
+    from categorizer import REVIEW_FILE
+    return REVIEW_FILE
+
+def show_chart(start_date=None, end_date=None, categories=None):
+    """
+    `chart`: open the interactive chart in the browser, from `start_date`
+    to `end_date` (inclusive dates, None is open).
+    """
+    from visualizer import Visualizer
+
+    # The chart frame may come from the columnar cache (no JSON parse);
+    # a date range is then read through the dataset's index
+    dataset = get_dataset(TRANSACTIONS_FILE, load=False)
+    ensure_category_order(dataset.to_dataframe())
+    viz = Visualizer(dataset)
+    viz.generate_chart(start_date=start_date, end_date=end_date, categories=categories)
+
+
+def list_transactions(start_date=None, end_date=None, categories=None):
+    """
+    `list`: print the transactions from `start_date` to `end_date`
+    (inclusive dates, None is open) and/or in the given categories.
+    """
+    from money import format_cents
+
+    rows = get_dataset(TRANSACTIONS_FILE, load=False).query(start_date, end_date, categories)
+    for day, cents, category, description in zip(
+        rows["date"].dt.strftime("%Y-%m-%d"), rows["cents"].tolist(), rows["category"], rows["description"]
+    ):
+        print(f"{day}  {format_cents(cents):>12} €  {category or '—':<20}  {description}")
+    print(f"= {len(rows)} transactions, {format_cents(rows['cents'].sum())} €")
+
+def open_category_manager():
+    """`cm`: open the Category Manager GUI."""
+    from category_manager import run_category_manager
+
+    run_category_manager(get_dataset(TRANSACTIONS_FILE))
+
+def main():
+    """
+    Default without a command (local mode): categorize the stored
+    transactions and show the chart. Use `import` first to fetch new
+    transactions from the bank.
+    """
+    from visualizer import Visualizer
+
+    dataset = get_dataset(TRANSACTIONS_FILE)
+    ensure_category_order(dataset)
+    if not dataset.transactions:
+        print("⚠ No transactions available. Exiting.")
+        return
+    categorize_transactions()
 
-    viz = Visualizer()
+    viz = Visualizer(dataset)
     viz.generate_chart()
 
+# --------------------------------------------------------------------
+# Offline category review
+# --------------------------------------------------------------------
+def review_categories(path=None, apply=False):
+    """
+    Without apply: write all uncategorized description groups of the
+    dataset to the review file (known descriptions and rules are applied
+    first). With apply: import the categories filled into the review file
+    and categorize the dataset with them. Both save once at the end.
+    """
+    from categorizer import REVIEW_FILE, Categorizer, summarize_groups
+
+    path = path or REVIEW_FILE
+    dataset = get_dataset(TRANSACTIONS_FILE)
+    categorizer = Categorizer()
+    if apply:
+        if not os.path.exists(path):
+            print(f"⚠ Review file not found: {path}")
+            return
+        categorizer.import_review(path)
+    with categorizer:
+        open_groups = categorizer.categorize_batch(dataset.transactions, interactive=False)
+    if categorizer.dirty:
+        categorizer.save_categories()
+    save_transactions(dataset.transactions)
+    if not apply:
+        categorizer.export_review(summarize_groups(open_groups), path)
+    elif open_groups:
+        print(f"ℹ {len(open_groups)} description group(s) are still uncategorized.")
+
+def train_model():
+    """Retrain the category model from all labelled transactions and save it."""
+    from classifier import MODEL_FILE, CategoryModel
+
+    dataset = get_dataset(TRANSACTIONS_FILE)
+    start = time.perf_counter()
+    model = CategoryModel.train(dataset.transactions)
+    if not model.classes:
+        print("⚠ No categorized transactions to train on.")
+        return
+    model.save(MODEL_FILE)
+    print(f"🧠 Model trained on {len(model)} transactions, {len(model.classes)} categories "
+          f"in {time.perf_counter() - start:.1f}s → {MODEL_FILE}")
+
+# --------------------------------------------------------------------
+# Headless batch export
+# --------------------------------------------------------------------
+def export_reports(out_dir=REPORTS_DIR, fmt="html", start_date=None, end_date=None,
+                   categories=None, per_year=False, per_account=False):
+    """
+    Render charts without a browser or display and write them to `out_dir`
+    as self-contained HTML pages or JSON figure specs. Optionally one report
+    per account and/or per year; the data is loaded once and the
+    ColorManager is shared by all reports. Returns the written paths.
+    """
+    from aggregate_cache import AggregateCache
+    from color_manager import ColorManager
+    from visualizer import Visualizer
+
+    frame = get_dataset(TRANSACTIONS_FILE, load=False).to_dataframe()
+    if frame.empty:
+        print("⚠ No transactions available. Nothing to export.")
+        return []
+
+    color_manager = ColorManager()
+    start = date.fromisoformat(start_date) if start_date else None
+    end = date.fromisoformat(end_date) if end_date else None
+
+    if per_account:
+        accounts = frame["account"].fillna("unknown") if "account" in frame.columns else None
+        if accounts is None:
+            print("⚠ Transactions have no account information; exporting one combined report.")
+            groups = [(None, frame)]
+        else:
+            groups = list(frame.groupby(accounts, sort=True))
+    else:
+        groups = [(None, frame)]
+
+    written = []
+    for account, sub in groups:
+        viz = Visualizer(
+            sub,
+            # The shared on-disk aggregate cache describes the full dataset;
+            # per-account subsets get their own in-memory cache.
+            aggregate_cache=AggregateCache() if account is None else AggregateCache(path=None),
+            color_manager=color_manager,
+        )
+        if per_year:
+            years = sorted({d[:4] for d in sub["date"].astype(str)})
+            ranges = [
+                (y, max(filter(None, [start, date(int(y), 1, 1)])),
+                    min(filter(None, [end, date(int(y), 12, 31)])))
+                for y in years
+            ]
+            ranges = [r for r in ranges if r[1] <= r[2]]
+        else:
+            ranges = [(None, start, end)]
+
+        for year, range_start, range_end in ranges:
+            parts = ["report"] + [str(p) for p in (account, year) if p is not None]
+            name = re.sub(r"[^A-Za-z0-9_.-]", "_", "_".join(parts))
+            path = os.path.join(out_dir, f"{name}.{fmt}")
+            title = " – ".join(["📊 Expense Tracker"] + [str(p) for p in (account, year) if p is not None])
+
+            t0 = time.perf_counter()
+            result = viz.export(
+                path, fmt=fmt,
+                start_date=range_start, end_date=range_end,
+                categories=categories, title=title,
+            )
+            elapsed = time.perf_counter() - t0
+            if result:
+                written.append(result)
+                print(f"📄 {result} written in {elapsed:.2f}s")
+            else:
+                print(f"⚠ {name}: no data, skipped ({elapsed:.2f}s)")
+
+    print(f"✅ {len(written)} report(s) exported to {out_dir}.")
+    return written
+
+# --------------------------------------------------------------------
+# Benchmark
+# --------------------------------------------------------------------
+def benchmark(n_entries=1_000_000, days=1000):
+    """
+    `bench`: stream a fints_stub statement of `n_entries` rows over `days`
+    days through import_transactions() into a temporary dataset (review
+    mode, so nothing is asked) under tracemalloc, and print the time, the
+    peak traced memory and the open groups that were kept while streaming.
+    """
+    import json
+    import tempfile
+    import tracemalloc
+    from datetime import timedelta
+
+    import categorizer  # noqa: F401 (imported before the chdir below)
+    from dataset import TransactionDataset
+    from fints_connector import FinTSConnector
+    from fints_stub import FakeFinTSClient
+
+    per_day = max(1, -(-n_entries // days))
+    start = date.today() - timedelta(days=days - 1)
+    fints = FinTSConnector(lambda: FakeFinTSClient(entries_per_day=per_day, history_start=start))
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        review_file = os.path.join(tmp, "review.json")
+        # The Categorizer's data/ files (mappings, rules, model) start empty
+        os.chdir(tmp)
+        try:
+            dataset = TransactionDataset(os.path.join(tmp, "data", "transactions.json"))
+            tracemalloc.start()
+            t0 = time.perf_counter()
+            report = import_transactions(fints.iter_transactions(), review_file=review_file,
+                                         dataset=dataset)
+            elapsed = time.perf_counter() - t0
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        finally:
+            os.chdir(cwd)
+        with open(review_file, "r", encoding="utf-8") as f:
+            groups = json.load(f)
+
+    print(f"⏱ {report.fetched if report else 0:,} statement entries imported in {elapsed:.1f}s, "
+          f"peak traced memory {peak / 2**20:.0f} MiB.")
+    print(f"  • {len(groups)} open group(s) kept while streaming for "
+          f"{sum(g['count'] for g in groups):,} uncategorized rows")
+
+
+def _comma_list(value):
+    return [c.strip() for c in value.split(",") if c.strip()]
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Expense Tracker. Without a command, the stored transactions "
+                    "are categorized and the chart is shown."
+    )
+    commands = parser.add_subparsers(dest="command", metavar="command")
+
+    p = commands.add_parser("import", help="fetch new transactions from the bank (FinTS)")
+    p.add_argument("--debug", action="store_true", help="log the FinTS dialog in detail")
+    p.add_argument("--review", action="store_true",
+                   help="write unknown descriptions to the review file instead of asking")
+    p.set_defaults(func=fetch_transactions)
+
+    p = commands.add_parser("categorize", help="categorize the stored transactions")
+    p.add_argument("--review", action="store_true",
+                   help="write unknown descriptions to the review file instead of asking")
+    p.set_defaults(func=categorize_transactions)
+
+    p = commands.add_parser("chart", help="open the interactive chart")
+    p.add_argument("--start", dest="start_date", type=date.fromisoformat, help="first day, YYYY-MM-DD")
+    p.add_argument("--end", dest="end_date", type=date.fromisoformat, help="last day, YYYY-MM-DD")
+    p.add_argument("--categories", type=_comma_list,
+                   help="comma-separated expense categories to plot")
+    p.set_defaults(func=show_chart)
+
+    p = commands.add_parser("list", help="print the transactions of a date range / categories")
+    p.add_argument("--start", dest="start_date", type=date.fromisoformat, help="first day, YYYY-MM-DD")
+    p.add_argument("--end", dest="end_date", type=date.fromisoformat, help="last day, YYYY-MM-DD")
+    p.add_argument("--categories", type=_comma_list, help="comma-separated categories")
+    p.set_defaults(func=list_transactions)
+
+    p = commands.add_parser("cm", help="open the Category Manager")
+    p.set_defaults(func=open_category_manager)
+
+    p = commands.add_parser(
+        "review", help="export uncategorized description groups, or apply a completed review file"
+    )
+    p.add_argument("--file", dest="path",
+                   help="review file (default: data/category_review.json)")
+    p.add_argument("--apply", action="store_true",
+                   help="import the categories filled into the review file")
+    p.set_defaults(func=review_categories)
+
+    p = commands.add_parser("train", help="retrain the category model from the history")
+    p.set_defaults(func=train_model)
+
+    p = commands.add_parser("bench", help="measure time and memory of importing a stub statement")
+    p.add_argument("n_entries", nargs="?", type=int, default=1_000_000,
+                   help="statement entries (default: 1,000,000)")
+    p.set_defaults(func=benchmark)
+
+    p = commands.add_parser("export", help="render charts headlessly to HTML or JSON files")
+    p.add_argument("--format", dest="fmt", choices=["html", "json"], default="html")
+    p.add_argument("--out", dest="out_dir", default=REPORTS_DIR,
+                   help="output directory (default: reports/)")
+    p.add_argument("--start", dest="start_date", help="first day, YYYY-MM-DD")
+    p.add_argument("--end", dest="end_date", help="last day, YYYY-MM-DD")
+    p.add_argument("--categories", type=_comma_list,
+                   help="comma-separated expense categories to plot")
+    p.add_argument("--per-year", action="store_true", help="one report per calendar year")
+    p.add_argument("--per-account", action="store_true", help="one report per account (IBAN)")
+    p.set_defaults(func=export_reports)
+    return parser
+
 # --------------------------------------------------------------------
 # CLI Entry Point
 # --------------------------------------------------------------------
 if __name__ == "__main__":
-    # manual: python main.py cm  → opens Category Manager
-    if len(sys.argv) > 1 and sys.argv[1].lower() == "cm":
-        run_category_manager()
-    else:
-        main()
+    args = vars(build_parser().parse_args())
+    del args["command"]
+    func = args.pop("func", main)
+    func(**args)
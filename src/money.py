@@ -0,0 +1,73 @@
+from decimal import ROUND_HALF_EVEN, Decimal
+
+# Amounts are handled as integer cents internally; transactions.json keeps
+# them as euro numbers (e.g. -12.34) for readability and compatibility.
+# NumPy is imported by the array helpers only, so the FinTS import path
+# does not need it.
+CENT = Decimal("0.01")
+
+
+def to_cents(amount):
+    """
+    Exact integer cents of an amount given as Decimal, int, str or float
+    (floats via their shortest repr, so 0.1 is 10 cents, not 10.000…01).
+    """
+    if isinstance(amount, float):
+        amount = repr(amount)
+    value = Decimal(amount).quantize(CENT, rounding=ROUND_HALF_EVEN)
+    return int(value.scaleb(2))
+
+
+def to_decimal(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def to_amount(cents):
+    """
+    JSON-serializable euro amount for transactions.json: an int for whole
+    euros, else the float closest to the exact value (which round-trips
+    through repr/json with the same two decimals).
+    """
+    cents = int(cents)
+    if cents % 100 == 0:
+        return cents // 100
+    return float(to_decimal(cents))
+
+
+def cents_array(amounts):
+    """
+    int64 cents of a sequence/array of euro amounts. Float inputs with at
+    most two decimals convert exactly (the rounding error of x * 100 stays
+    far below half a cent for any realistic amount).
+    """
+    import numpy as np
+
+    return np.rint(np.asarray(amounts, dtype=float) * 100).astype(np.int64)
+
+
+def format_cents(cents):
+    """Render-time formatting of a cent value: -123456 → "-1234.56"."""
+    cents = int(cents)
+    sign = "-" if cents < 0 else ""
+    return f"{sign}{abs(cents) // 100}.{abs(cents) % 100:02d}"
+
+
+def format_cents_array(cents):
+    """Vectorized format_cents for a pandas Series / array of int64 cents."""
+    import numpy as np
+
+    cents = np.asarray(cents, dtype=np.int64)
+    whole = np.abs(cents) // 100
+    frac = np.abs(cents) % 100
+    sign = np.where(cents < 0, "-", "")
+    return np.char.add(np.char.add(np.char.add(sign, whole.astype(str)), "."),
+                       np.char.zfill(frac.astype(str), 2))
+
+
+def group_sums(codes, values, n_groups):
+    """Exact int64 sum of `values` per group code (0 … n_groups - 1)."""
+    import numpy as np
+
+    sums = np.zeros(n_groups, dtype=np.int64)
+    np.add.at(sums, codes, np.asarray(values, dtype=np.int64))
+    return sums
@@ -0,0 +1,72 @@
+import json
+import os
+import re
+
+# Stored next to categorizer.CATEGORIES_FILE: a JSON list of tokens
+BLACKLIST_FILE = "data/description_blacklist.json"
+
+# Used if BLACKLIST_FILE does not exist: legal forms, payment channels and
+# SEPA field tags that say nothing about the payee
+DEFAULT_BLACKLIST = [
+    "gmbh", "ag", "kg", "ug", "ohg", "ek", "co", "mbh",
+    "sepa", "lastschrift", "gutschrift", "ueberweisung", "überweisung",
+    "dauerauftrag", "kartenzahlung", "girocard", "ec", "pos", "visa",
+    "mastercard", "debit", "sagt", "danke", "filiale", "fil", "nr",
+    "svwz", "eref", "mref", "kref", "cred", "abwa", "ref",
+]
+
+# Reference-like fragments removed before tokenizing: IBANs, dates/times
+# and SEPA tags with their value (e.g. "EREF+123ABC")
+_REFERENCE_PATTERNS = re.compile(
+    r"\b[a-z]{2}\d{2}(?:\s?[a-z0-9]{4}){3,8}\b"          # IBAN
+    r"|\b\d{1,4}[./-]\d{1,2}(?:[./-]\d{2,4})?\b"          # dates
+    r"|\b\d{1,2}:\d{2}(?::\d{2})?\b"                      # times
+    r"|\b(?:eref|mref|kref|cred|svwz|abwa)\+\S*"          # SEPA tags
+)
+# Words of at least two letters without digits (tokens like "xyz12" are
+# skipped as a whole)
+_WORD = re.compile(r"\b[^\W\d]{2,}\b")
+
+
+def load_blacklist(path=BLACKLIST_FILE):
+    """Token blacklist from the config file, or DEFAULT_BLACKLIST."""
+    if not os.path.exists(path):
+        return list(DEFAULT_BLACKLIST)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        print("⚠ Could not load description blacklist. Using the default.")
+        return list(DEFAULT_BLACKLIST)
+
+
+class DescriptionNormalizer:
+    """
+    Reduces bank descriptions to the part that identifies the payee, so
+    "REWE Markt 1234 / 12.03." and "rewe markt 5678" share one key:
+    case folding, removal of references (IBANs, dates, SEPA tags), of all
+    tokens containing digits (store numbers, reference numbers) and of
+    blacklisted tokens. A description with nothing left keeps its
+    case-folded, whitespace-collapsed form.
+    """
+
+    def __init__(self, blacklist=None):
+        if blacklist is None:
+            blacklist = load_blacklist()
+        self.blacklist = {token.casefold() for token in blacklist}
+        self._cache = {}
+
+    def normalize(self, description):
+        description = str(description)
+        key = self._cache.get(description)
+        if key is None:
+            key = self._cache[description] = self._normalize(description)
+        return key
+
+    def _normalize(self, description):
+        text = description.casefold()
+        text = _REFERENCE_PATTERNS.sub(" ", text)
+        tokens = [token for token in _WORD.findall(text) if token not in self.blacklist]
+        if tokens:
+            return " ".join(tokens)
+        return " ".join(description.split()).casefold()
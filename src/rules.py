@@ -0,0 +1,403 @@
+import heapq
+import json
+import os
+import random
+import re
+import sys
+import time
+from bisect import bisect_left
+from collections import deque
+
+# Stored next to categorizer.CATEGORIES_FILE
+RULES_FILE = "data/category_rules.json"
+
+RULE_TYPES = ("prefix", "substring", "regex", "iban", "amount")
+
+
+class RuleError(ValueError):
+    """A rule in category_rules.json is malformed."""
+
+
+class RuleSet:
+    """
+    Categorization rules from category_rules.json, a list like
+
+        [
+            {"type": "prefix",    "pattern": "REWE",         "category": "Groceries"},
+            {"type": "substring", "pattern": "netflix",      "category": "Subscriptions"},
+            {"type": "regex",     "pattern": "^AMZN\\s+\\w+", "category": "Shopping"},
+            {"type": "iban",      "pattern": "DE02...",      "category": "Rent"},
+            {"type": "amount",    "min": 1000, "max": 5000,  "category": "Income"}
+        ]
+
+    prefix/substring rules match the description case-insensitively, regex
+    rules as written (use "(?i:...)" to ignore case), iban rules the counterparty IBAN, amount rules an inclusive range
+    (min or max may be omitted). The first matching rule in file order wins.
+
+    All rules of a type are compiled into one matcher (a trie for prefixes,
+    an Aho-Corasick automaton for substrings, one alternation regex (split
+    in halves to tell which rule matched), a dict
+    for IBANs and an interval table for amounts), so matching a transaction
+    costs one pass over its description instead of one check per rule.
+    """
+
+    def __init__(self, rules=()):
+        self.rules = [_validate(rule, i) for i, rule in enumerate(rules)]
+        by_type = {t: [] for t in RULE_TYPES}
+        for i, rule in enumerate(self.rules):
+            by_type[rule["type"]].append((i, rule))
+
+        self._prefixes = _PrefixTrie((i, r["pattern"].casefold()) for i, r in by_type["prefix"])
+        self._substrings = _AhoCorasick((i, r["pattern"].casefold()) for i, r in by_type["substring"])
+        self._regexes = _RegexTree(by_type["regex"])
+        self._ibans = {}
+        for i, rule in by_type["iban"]:
+            self._ibans.setdefault(_normalize_iban(rule["pattern"]), i)
+        self._amounts = _IntervalTable(
+            (i, rule.get("min"), rule.get("max")) for i, rule in by_type["amount"]
+        )
+
+    def __len__(self):
+        return len(self.rules)
+
+    @classmethod
+    def load(cls, path=RULES_FILE):
+        """Load the rules file; a missing file gives an empty rule set."""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def match(self, transaction):
+        """Return the category of the first matching rule, or None."""
+        index = self.match_index(transaction)
+        return None if index is None else self.rules[index]["category"]
+
+    def match_index(self, transaction):
+        """Return the index of the first matching rule, or None."""
+        description = str(transaction.get("description") or "")
+        text = description.casefold()
+        candidates = [
+            self._prefixes.first(text),
+            self._substrings.first(text),
+            self._ibans.get(_normalize_iban(transaction.get("counterparty_iban") or "")),
+            self._amounts.first(transaction.get("amount")),
+            self._regexes.first(description),
+        ]
+        candidates = [i for i in candidates if i is not None]
+        return min(candidates) if candidates else None
+
+
+def _validate(rule, i):
+    if not isinstance(rule, dict) or rule.get("type") not in RULE_TYPES:
+        raise RuleError(f"Rule {i}: type must be one of {', '.join(RULE_TYPES)}")
+    if not rule.get("category"):
+        raise RuleError(f"Rule {i}: missing category")
+    if rule["type"] == "amount":
+        if rule.get("min") is None and rule.get("max") is None:
+            raise RuleError(f"Rule {i}: amount rules need min and/or max")
+    elif not rule.get("pattern"):
+        raise RuleError(f"Rule {i}: missing pattern")
+    if rule["type"] == "regex":
+        try:
+            re.compile(rule["pattern"])
+        except re.error as e:
+            raise RuleError(f"Rule {i}: invalid regex: {e}") from None
+    return rule
+
+
+def _normalize_iban(iban):
+    return iban.replace(" ", "").upper()
+
+
+# --------------------------------------------------------------------
+# Compiled matchers
+# --------------------------------------------------------------------
+class _PrefixTrie:
+    """Character trie; first() walks the text once from its start."""
+
+    def __init__(self, patterns):
+        self.root = {}
+        for index, pattern in patterns:
+            node = self.root
+            for ch in pattern:
+                node = node.setdefault(ch, {})
+            node[None] = min(node.get(None, index), index)
+
+    def first(self, text):
+        best = None
+        node = self.root
+        for ch in text:
+            node = node.get(ch)
+            if node is None:
+                break
+            index = node.get(None)
+            if index is not None and (best is None or index < best):
+                best = index
+        return best
+
+
+class _AhoCorasick:
+    """
+    Aho-Corasick automaton over all substring patterns. Each state stores
+    the lowest rule index of every pattern ending there (including those
+    reached via failure links), so first() is a single scan of the text.
+    """
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.best = [None]
+        for index, pattern in patterns:
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.best.append(None)
+                state = nxt
+            self.best[state] = _lowest(self.best[state], index)
+
+        # Breadth-first: failure links and inherited matches
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.best[nxt] = _lowest(self.best[nxt], self.best[self.fail[nxt]])
+
+    def first(self, text):
+        if len(self.goto) == 1:
+            return None
+        goto, fail, best_at = self.goto, self.fail, self.best
+        best = None
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            index = best_at[state]
+            if index is not None and (best is None or index < best):
+                best = index
+        return best
+
+
+def _lowest(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a, b)
+
+
+class _RegexTree:
+    """
+    All regex rules as one non-capturing alternation (CPython's re slows
+    down sharply with one named group per alternative). To tell which rule
+    matched, the alternation is split in halves, each again one compiled
+    alternation: if the left half matches anywhere, the lowest index is in
+    it, else in the right half. Nodes are compiled on first use.
+    """
+
+    def __init__(self, rules):
+        self.indexes = [i for i, _ in rules]
+        self.patterns = [rule["pattern"] for _, rule in rules]
+        self._compiled = {}
+
+    def _search(self, lo, hi, text):
+        regex = self._compiled.get((lo, hi))
+        if regex is None:
+            regex = self._compiled[(lo, hi)] = re.compile(
+                "|".join(f"(?:{p})" for p in self.patterns[lo:hi])
+            )
+        return regex.search(text) is not None
+
+    def first(self, text):
+        lo, hi = 0, len(self.patterns)
+        if not hi or not self._search(lo, hi, text):
+            return None
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if self._search(lo, mid, text):
+                hi = mid
+            else:
+                lo = mid
+        return self.indexes[lo]
+
+
+class _IntervalTable:
+    """
+    Inclusive [min, max] amount ranges flattened into elementary segments
+    (each boundary point and each open gap between boundaries), each
+    holding the lowest covering rule index: first() is one bisect.
+    """
+
+    def __init__(self, ranges):
+        ranges = [
+            (index, float("-inf") if lo is None else float(lo),
+             float("inf") if hi is None else float(hi))
+            for index, lo, hi in ranges
+        ]
+        self.bounds = sorted({b for _, lo, hi in ranges for b in (lo, hi)})
+        position = {b: i for i, b in enumerate(self.bounds)}
+
+        # Segment 2k is bound k itself, segment 2k+1 the gap after it
+        starts = {}
+        for index, lo, hi in ranges:
+            if lo <= hi:
+                starts.setdefault(2 * position[lo], []).append((index, 2 * position[hi]))
+        self.segments = []
+        active = []
+        for segment in range(2 * len(self.bounds)):
+            for index, end in starts.get(segment, ()):
+                heapq.heappush(active, (index, end))
+            while active and active[0][1] < segment:
+                heapq.heappop(active)
+            self.segments.append(active[0][0] if active else None)
+
+    def first(self, amount):
+        if not self.bounds or amount is None:
+            return None
+        try:
+            amount = float(amount)
+        except (TypeError, ValueError):
+            return None
+        k = bisect_left(self.bounds, amount)
+        if k < len(self.bounds) and self.bounds[k] == amount:
+            return self.segments[2 * k]
+        if k == 0:
+            return None
+        return self.segments[2 * k - 1]
+
+
+# --------------------------------------------------------------------
+# Reference scan / Benchmark
+# --------------------------------------------------------------------
+def _match_linear(rules, transaction, regexes=None):
+    """
+    Index of the first matching rule found by checking every rule in
+    order (what RuleSet.match_index compiles away); for the benchmark.
+    `regexes` holds the compiled regex rules by index (see _compile_regexes).
+    """
+    if regexes is None:
+        regexes = _compile_regexes(rules)
+    description = str(transaction.get("description") or "")
+    text = description.casefold()
+    iban = _normalize_iban(transaction.get("counterparty_iban") or "")
+    try:
+        amount = float(transaction.get("amount"))
+    except (TypeError, ValueError):
+        amount = None
+    for i, rule in enumerate(rules):
+        kind = rule["type"]
+        if kind == "prefix":
+            matched = text.startswith(rule["pattern"].casefold())
+        elif kind == "substring":
+            matched = rule["pattern"].casefold() in text
+        elif kind == "regex":
+            matched = regexes[i].search(description) is not None
+        elif kind == "iban":
+            matched = iban == _normalize_iban(rule["pattern"])
+        else:
+            matched = amount is not None and (
+                (rule.get("min") is None or amount >= rule["min"])
+                and (rule.get("max") is None or amount <= rule["max"])
+            )
+        if matched:
+            return i
+    return None
+
+
+def _compile_regexes(rules):
+    return {i: re.compile(rule["pattern"]) for i, rule in enumerate(rules) if rule["type"] == "regex"}
+
+
+def _random_rules(rng, n_rules):
+    """`n_rules` rules of all types, as they might come from category_rules.json."""
+    rules = []
+    for i in range(n_rules):
+        kind = RULE_TYPES[i % len(RULE_TYPES)]
+        rule = {"type": kind, "category": f"Category {i % 50}"}
+        if kind == "prefix":
+            rule["pattern"] = f"Shop{i:05d}"
+        elif kind == "substring":
+            rule["pattern"] = f"ref{i:05d}"
+        elif kind == "regex":
+            rule["pattern"] = rf"^CARD\s+{i:05d}\b"
+        elif kind == "iban":
+            rule["pattern"] = f"DE{i:020d}"
+        else:
+            lo = rng.uniform(-5000, 5000)
+            rule["min"], rule["max"] = round(lo, 2), round(lo + rng.uniform(0, 20), 2)
+        rules.append(rule)
+    return rules
+
+
+def _random_transactions(rng, n, n_rules):
+    def ref():
+        return rng.randrange(2 * n_rules)   # about half of the references have a rule
+
+    shapes = [
+        lambda: f"SHOP{ref():05d} Filiale {rng.randrange(100)}",
+        lambda: f"Payment ref{ref():05d} thank you",
+        lambda: f"CARD {ref():05d} {rng.randrange(10_000)}",
+        lambda: f"Transfer {rng.randrange(10**6)}",
+    ]
+    return [
+        {
+            "description": rng.choice(shapes)(),
+            "amount": round(rng.uniform(-6000, 6000), 2),
+            "counterparty_iban": f"DE{ref():020d}",
+        }
+        for _ in range(n)
+    ]
+
+
+def benchmark(n_rules=10_000, n_transactions=100_000, n_checked=300, seed=0):
+    """
+    Time compiling `n_rules` random rules (all types) and matching
+    `n_transactions` random transactions with the compiled RuleSet,
+    against the rule-by-rule scan on `n_checked` of them (which also must
+    find the same first rule), and print the results.
+    """
+    rng = random.Random(seed)
+    rules = _random_rules(rng, n_rules)
+    transactions = _random_transactions(rng, n_transactions, n_rules)
+
+    t0 = time.perf_counter()
+    rule_set = RuleSet(rules)
+    rule_set.match_index(transactions[0])   # compiles the full regex alternation
+    print(f"⏱ {n_rules:,} rules compiled in {time.perf_counter() - t0:.2f}s.")
+
+    t0 = time.perf_counter()
+    found = [rule_set.match_index(tx) for tx in transactions]
+    compiled = (time.perf_counter() - t0) / n_transactions
+    print(f"  • compiled: {compiled * 1e6:.1f} µs per transaction "
+          f"({1 / compiled:,.0f} transactions/s, {sum(i is not None for i in found):,} matched)")
+
+    checked = transactions[:n_checked]
+    regexes = _compile_regexes(rules)
+    t0 = time.perf_counter()
+    expected = [_match_linear(rules, tx, regexes) for tx in checked]
+    linear = (time.perf_counter() - t0) / len(checked)
+    print(f"  • rule by rule: {linear * 1e6:.1f} µs per transaction "
+          f"({linear / compiled:.0f}x slower)")
+    if found[:n_checked] != expected:
+        raise AssertionError("compiled rules and the rule-by-rule scan disagree")
+    print(f"  ✓ same first rule for the {len(checked)} checked transactions")
+
+
+if __name__ == "__main__":
+    # python rules.py bench [rules] [transactions]
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark(*(int(a) for a in sys.argv[2:4]))
+    else:
+        print("Unknown arguments. Usage:")
+        print("  python rules.py bench [rules] [transactions]")
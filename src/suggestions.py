@@ -0,0 +1,96 @@
+import zlib
+
+import numpy as np
+
+# Suggestions at or above this similarity are assigned without asking
+AUTO_ASSIGN_THRESHOLD = 0.75
+
+NUM_PERM = 32   # MinHash values per description
+BANDS = 8       # LSH bands (NUM_PERM / BANDS rows each)
+# Buckets larger than this only hold descriptions sharing very common
+# trigrams; they are skipped when collecting candidates
+MAX_BUCKET = 200
+
+_PRIME = (1 << 61) - 1
+
+
+def trigrams(key):
+    """Character trigrams of a normalized description (padded with spaces)."""
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)} or {padded}
+
+
+class SuggestionIndex:
+    """
+    Nearest-neighbour index over known normalized descriptions.
+
+    Every description is reduced to its set of character trigrams and a
+    MinHash signature of it. The signatures are split into BANDS bands; a
+    query only compares against descriptions sharing at least one band
+    bucket (locality-sensitive hashing), scoring them by the exact trigram
+    Jaccard similarity. Adding and querying cost the same, independent of
+    the number of indexed descriptions.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, bands=BANDS, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 29, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 29, size=num_perm, dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.keys = []
+        self.categories = []
+        self._grams = []
+        self._ids = {}
+        self._buckets = [{} for _ in range(bands)]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _band_keys(self, grams):
+        hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams),
+                             dtype=np.uint64, count=len(grams))
+        signature = ((hashes[:, None] * self._a + self._b) % _PRIME).min(axis=0)
+        return signature.reshape(self.bands, self.rows)
+
+    def add(self, key, category):
+        """Index a normalized description with its category (last add wins)."""
+        i = self._ids.get(key)
+        if i is not None:
+            self.categories[i] = category
+            return
+        grams = trigrams(key)
+        i = self._ids[key] = len(self.keys)
+        self.keys.append(key)
+        self.categories.append(category)
+        self._grams.append(grams)
+        for bucket, band in zip(self._buckets, self._band_keys(grams)):
+            bucket.setdefault(band.tobytes(), []).append(i)
+
+    def suggest(self, key, limit=1):
+        """
+        Return up to `limit` (category, similarity, known description)
+        tuples for a normalized description, best first.
+        """
+        i = self._ids.get(key)
+        if i is not None:
+            return [(self.categories[i], 1.0, key)]
+        if not self.keys:
+            return []
+
+        grams = trigrams(key)
+        candidates = set()
+        for bucket, band in zip(self._buckets, self._band_keys(grams)):
+            ids = bucket.get(band.tobytes(), ())
+            if len(ids) <= MAX_BUCKET:
+                candidates.update(ids)
+
+        scored = []
+        for i in candidates:
+            known = self._grams[i]
+            score = len(grams & known) / len(grams | known)
+            scored.append((score, i))
+        scored.sort(key=lambda s: (-s[0], s[1]))
+        return [(self.categories[i], score, self.keys[i]) for score, i in scored[:limit]]
@@ -0,0 +1,114 @@
+import json
+import os
+from datetime import date, datetime, timedelta
+
+from atomic_io import atomic_write_json
+
+# --------------------------------------------------------------------
+# Paths / Files
+# --------------------------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+SYNC_STATE_FILE = os.path.join(DATA_DIR, "sync_state.json")
+
+# Days re-fetched before the last synced booking date, so late bookings
+# (value-dated back by the bank) are still picked up
+OVERLAP_DAYS = 14
+
+
+class SyncState:
+    """
+    Per-account high-water mark of FinTS imports, stored in sync_state.json:
+
+        {"accounts": {"<IBAN>": {"last_booking_date": "YYYY-MM-DD",
+                                 "last_sync": "<ISO timestamp>"}}}
+
+    The next sync of an account starts OVERLAP_DAYS before its last booking
+    date instead of at the oldest known transaction.
+    """
+
+    def __init__(self, path=SYNC_STATE_FILE, overlap_days=OVERLAP_DAYS):
+        self.path = path
+        self.overlap_days = overlap_days
+        self.accounts = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.accounts = json.load(f).get("accounts", {})
+            except Exception:
+                print("⚠ Could not load sync state. Falling back to a full sync.")
+                self.accounts = {}
+
+    def last_booking_date(self, iban):
+        entry = self.accounts.get(iban)
+        if not entry or not entry.get("last_booking_date"):
+            return None
+        return date.fromisoformat(entry["last_booking_date"])
+
+    def start_date_for(self, iban, default=None):
+        """First day to fetch for an account (or `default` if never synced)."""
+        last = self.last_booking_date(iban)
+        if last is None:
+            return default
+        return last - timedelta(days=self.overlap_days)
+
+    def update(self, iban, transactions):
+        """Advance an account's high-water mark after a successful fetch."""
+        self.advance(iban, max((t["date"] for t in transactions), default=None))
+
+    def advance(self, iban, booking_date):
+        """
+        Record a successful sync of an account whose latest fetched booking
+        date is `booking_date` ("YYYY-MM-DD" or None if nothing was fetched).
+        """
+        entry = self.accounts.setdefault(iban, {})
+        if booking_date and booking_date > entry.get("last_booking_date", ""):
+            entry["last_booking_date"] = booking_date
+        entry["last_sync"] = datetime.now().isoformat(timespec="seconds")
+
+    def seed_from(self, transactions):
+        """
+        Initialize accounts without a state from already stored transactions
+        that carry an "account" field (e.g. before the first incremental sync).
+        """
+        latest = {}
+        for t in transactions:
+            iban = t.get("account")
+            if iban and iban not in self.accounts and t["date"] > latest.get(iban, ""):
+                latest[iban] = t["date"]
+        for iban, last in latest.items():
+            self.accounts[iban] = {"last_booking_date": last}
+
+    def save(self):
+        atomic_write_json(self.path, {"accounts": self.accounts}, indent=4)
+
+
+class SyncReport:
+    """
+    Rows fetched vs. rows new per account, so bank traffic can be compared
+    with actual new activity. Filled batch by batch via add().
+    """
+
+    def __init__(self):
+        self.counts = {}  # {iban: [fetched, new]}
+
+    def add(self, fetched, new):
+        for t in fetched:
+            self.counts.setdefault(t.get("account", "unknown"), [0, 0])[0] += 1
+        for t in new:
+            self.counts.setdefault(t.get("account", "unknown"), [0, 0])[1] += 1
+
+    @property
+    def fetched(self):
+        return sum(f for f, _ in self.counts.values())
+
+    @property
+    def new(self):
+        return sum(n for _, n in self.counts.values())
+
+    def print(self):
+        print("📊 Sync report (fetched → new):")
+        for iban, (n_fetched, n_new) in sorted(self.counts.items()):
+            print(f"  • {iban}: {n_fetched} fetched, {n_new} new")
+        print(f"  = {self.fetched} fetched, {self.new} new")
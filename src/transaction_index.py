@@ -0,0 +1,195 @@
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from money import cents_array
+
+
+def _day(value):
+    """Day number (days since 1970-01-01) of a date, datetime or ISO string."""
+    return int(pd.Timestamp(value).to_datetime64().astype("datetime64[D]").astype(np.int64))
+
+
+class TransactionIndex:
+    """
+    Query index over a chart frame (see frame_cache.build_frame):
+      - the frame itself is kept sorted by date, so a date range is a
+        contiguous slice found by binary search (np.searchsorted),
+      - a secondary index on category holds, per category, the sorted row
+        positions of its transactions, so a category filter searches
+        those positions instead of scanning the frame,
+      - running totals of the cents give the sum of everything before a
+        date (the opening balance of a chart window) in O(1), and the
+        count and total per category come straight from the category index.
+
+    query() is O(log n) plus the size of its result. The category index
+    and the running totals are built on first use.
+    """
+
+    def __init__(self, frame):
+        days = pd.to_datetime(frame["date"]).to_numpy().astype("datetime64[D]").astype(np.int64)
+        if len(days) > 1 and not (days[1:] >= days[:-1]).all():
+            # Frames from build_frame are sorted already; others once here
+            order = np.argsort(days, kind="stable")
+            frame = frame.take(order)
+            days = days[order]
+        self.frame = frame.reset_index(drop=True)
+        self.days = days
+        self._cents = None
+        self._running = None
+        self._category_codes = None
+        self._category_rows = None
+        self._category_bounds = None
+
+    def __len__(self):
+        return len(self.days)
+
+    def _timestamp(self, i):
+        # Same resolution as the frame's datetime64[us] date column
+        return pd.Timestamp(self.days[i].astype("datetime64[D]").astype("datetime64[us]"))
+
+    @property
+    def first_date(self):
+        return self._timestamp(0) if len(self) else None
+
+    @property
+    def last_date(self):
+        return self._timestamp(-1) if len(self) else None
+
+    # ----------------------------------------------------------------
+    # Date index
+    # ----------------------------------------------------------------
+    def date_slice(self, start=None, end=None):
+        """Row slice of the transactions from `start` to `end` (inclusive)."""
+        lo = 0 if start is None else int(np.searchsorted(self.days, _day(start), side="left"))
+        hi = len(self) if end is None else int(np.searchsorted(self.days, _day(end), side="right"))
+        return slice(lo, max(lo, hi))
+
+    def cents(self):
+        """int64 cents of all rows, in frame order."""
+        if self._cents is None:
+            frame = self.frame
+            self._cents = frame["cents"].to_numpy(dtype=np.int64) if "cents" in frame else cents_array(frame["amount"])
+        return self._cents
+
+    def total_before(self, start):
+        """Cent total of all transactions before `start`."""
+        if self._running is None:
+            self._running = np.concatenate([[0], np.cumsum(self.cents())])
+        return int(self._running[self.date_slice(start=start).start])
+
+    # ----------------------------------------------------------------
+    # Category index
+    # ----------------------------------------------------------------
+    def _build_category_index(self):
+        categories = self.frame["category"].astype("category")
+        codes = categories.cat.codes.to_numpy()
+        # Stable: each category's positions stay in (date) order
+        self._category_rows = np.argsort(codes, kind="stable")
+        self._category_bounds = np.searchsorted(
+            codes[self._category_rows], np.arange(len(categories.cat.categories) + 1)
+        )
+        self._category_codes = {c: i for i, c in enumerate(categories.cat.categories)}
+
+    def category_positions(self, category, rows=None):
+        """Sorted row positions of `category`, optionally within a row slice."""
+        if self._category_rows is None:
+            self._build_category_index()
+        code = self._category_codes.get(category)
+        if code is None:
+            return np.zeros(0, dtype=np.int64)
+        positions = self._category_rows[self._category_bounds[code]:self._category_bounds[code + 1]]
+        if rows is not None:
+            lo, hi = np.searchsorted(positions, [rows.start, rows.stop])
+            positions = positions[lo:hi]
+        return positions
+
+    def category_stats(self):
+        """
+        {category: (transaction count, cent total)} for every category,
+        from the category index: the rows of a category are one block of
+        it, so counts are block lengths and totals differences of a
+        running sum over the blocks.
+        """
+        if self._category_rows is None:
+            self._build_category_index()
+        bounds = self._category_bounds
+        running = np.concatenate([[0], np.cumsum(self.cents()[self._category_rows])])
+        counts = np.diff(bounds).tolist()
+        totals = (running[bounds[1:]] - running[bounds[:-1]]).tolist()
+        return {c: (counts[i], totals[i]) for c, i in self._category_codes.items() if counts[i]}
+
+    # ----------------------------------------------------------------
+    # Queries
+    # ----------------------------------------------------------------
+    def positions(self, start=None, end=None, categories=None):
+        """Row positions (a slice, or an array if `categories` is given)."""
+        rows = self.date_slice(start, end)
+        if categories is None:
+            return rows
+        parts = [self.category_positions(c, rows) for c in dict.fromkeys(categories)]
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        # Each part is sorted; merging them keeps the frame's date order
+        return np.sort(np.concatenate(parts), kind="stable")
+
+    def query(self, start=None, end=None, categories=None):
+        """
+        The transactions from `start` to `end` (inclusive; None is open)
+        in the given `categories` (None for all), as a date-sorted frame.
+        """
+        return self.frame.iloc[self.positions(start, end, categories)]
+
+
+# --------------------------------------------------------------------
+# Benchmark
+# --------------------------------------------------------------------
+def benchmark(n_rows=10_000_000, n_categories=50, repeat=200, seed=0):
+    """
+    Time index construction and queries on `n_rows` synthetic
+    transactions (about 20 years of history) and print the results.
+    """
+    rng = np.random.default_rng(seed)
+    days = np.sort(rng.integers(_day("2005-01-01"), _day("2025-01-01"), n_rows))
+    names = [f"Category {i}" for i in range(n_categories)]
+    frame = pd.DataFrame({
+        "date": days.astype("datetime64[D]").astype("datetime64[us]"),
+        "cents": rng.integers(-100_000, 100_000, n_rows),
+        "category": pd.Categorical.from_codes(rng.integers(0, n_categories, n_rows), categories=names),
+    })
+
+    t0 = time.perf_counter()
+    index = TransactionIndex(frame)
+    index.category_positions(names[0])
+    index.total_before("2020-01-01")
+    print(f"⏱ Index over {n_rows:,} rows built in {time.perf_counter() - t0:.2f}s.")
+
+    queries = {
+        "last 3 months": dict(start="2024-10-01", end="2024-12-31"),
+        "one year": dict(start="2024-01-01", end="2024-12-31"),
+        "3 months, 2 categories": dict(start="2024-10-01", end="2024-12-31", categories=names[:2]),
+        "all time, 1 category": dict(categories=names[:1]),
+    }
+    for label, query in queries.items():
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            rows = index.positions(**query)
+        per_query = (time.perf_counter() - t0) / repeat
+        size = len(range(len(index))[rows]) if isinstance(rows, slice) else len(rows)
+        print(f"  • {label}: {size:,} rows, {per_query * 1e3:.3f} ms per query")
+
+    mask_start = _day("2024-10-01")
+    t0 = time.perf_counter()
+    (days >= mask_start).nonzero()
+    print(f"  (a full scan for comparison: {(time.perf_counter() - t0) * 1e3:.1f} ms)")
+
+
+if __name__ == "__main__":
+    # python transaction_index.py bench [rows]
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark(int(sys.argv[2]) if len(sys.argv) > 2 else 10_000_000)
+    else:
+        print("Unknown arguments. Usage:")
+        print("  python transaction_index.py bench [rows]")
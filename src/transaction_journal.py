@@ -0,0 +1,200 @@
+import hashlib
+import json
+import os
+
+from atomic_io import atomic_write_text
+
+# Once the journal holds this many rows, the dataset folds it back into
+# transactions.json and starts a fresh journal.
+COMPACT_THRESHOLD = 1000
+
+
+def transaction_key(t):
+    """
+    Deduplication key of a transaction: its stable ID (see
+    transaction_ids), or the legacy date-amount-description key for rows
+    that have none yet.
+    """
+    return t.get("id") or f"{t['date']}-{t['amount']}-{t['description']}"
+
+
+def transaction_digest(t):
+    """Short content hash, used to detect changed rows (e.g. a new category)."""
+    raw = json.dumps(t, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+# First line of the key index: the signature of the transactions file it
+# was built for
+_BASE_HEADER = "#base"
+
+
+def _index_line(key, digest):
+    # Keys are JSON-quoted so descriptions containing tabs/newlines stay on one line
+    return f"{digest}\t{json.dumps(key, ensure_ascii=False)}"
+
+
+def journal_paths(transactions_file):
+    """Return the (journal, key index) paths that belong to a transactions file."""
+    stem = os.path.splitext(transactions_file)[0]
+    return stem + ".journal.jsonl", stem + ".index"
+
+
+class TransactionJournal:
+    """
+    Append-only delta log next to transactions.json.
+
+    - The journal file holds one JSON transaction per line; replaying it
+      over transactions.json (last write per key wins) gives the current data.
+    - The key index file holds one "<digest>\\t<json key>" line per written row,
+      so a save can tell new/changed rows from known ones without
+      re-reading or re-hashing the whole history. Its first line records
+      the (mtime, size) of `base_file` (transactions.json) it was built
+      for; if that file was changed by anything else, the index is rebuilt.
+
+    Both files are only ever appended to; reset() replaces them
+    atomically once the merged data was compacted into transactions.json.
+    """
+
+    def __init__(self, journal_file, index_file, base_file=None):
+        self.journal_file = journal_file
+        self.index_file = index_file
+        self.base_file = base_file
+        self.row_count = 0
+        self._index = None
+
+    # ----------------------------------------------------------------
+    # Reading
+    # ----------------------------------------------------------------
+    def read(self):
+        """Return all journaled transactions in write order."""
+        rows = []
+        if os.path.exists(self.journal_file):
+            with open(self.journal_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        rows.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # A torn last line from an interrupted append: the
+                        # index was not updated for it either, so the row
+                        # will simply be written again on the next save.
+                        print(f"⚠ Skipping unreadable journal line in {self.journal_file}")
+        self.row_count = len(rows)
+        return rows
+
+    def invalidate(self):
+        """Forget the in-memory key index (the files changed on disk)."""
+        self._index = None
+
+    def load_index(self, transactions):
+        """
+        Load the persistent key index. If it does not exist yet or was built
+        for a different version of the transactions file (edited by hand or
+        replaced by another tool), it is built from `transactions` (the
+        current merged data).
+        """
+        if self._index is not None:
+            return self._index
+        if os.path.exists(self.index_file):
+            index = {}
+            base = None
+            with open(self.index_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    digest, sep, key = line.rstrip("\n").partition("\t")
+                    if not sep:
+                        continue
+                    try:
+                        if digest == _BASE_HEADER:
+                            base = json.loads(key)
+                        else:
+                            index[json.loads(key)] = digest
+                    except (json.JSONDecodeError, TypeError):
+                        continue
+            if base == self._base_signature():
+                self._index = index
+                return self._index
+            print(f"⚠ {self.index_file} does not match the transactions file. Rebuilding it.")
+        self._write_index(transactions)
+        return self._index
+
+    # ----------------------------------------------------------------
+    # Writing
+    # ----------------------------------------------------------------
+    def append(self, transactions, known_transactions):
+        """
+        Append the rows of `transactions` that are new or changed to the
+        journal. Returns that delta (in order, one row per key).
+        `known_transactions` is only used to build a missing key index.
+        """
+        index = self.load_index(known_transactions)
+
+        delta = {}
+        for t in transactions:
+            key = transaction_key(t)
+            digest = transaction_digest(t)
+            if index.get(key) != digest:
+                delta[key] = (digest, t)
+            else:
+                delta.pop(key, None)
+        if not delta:
+            return []
+
+        # Journal first, index second: if we crash in between, the rows are
+        # re-appended next time, which replays to the same result.
+        self._append_lines(
+            self.journal_file,
+            (json.dumps(t, ensure_ascii=False, default=str) for _, t in delta.values()),
+        )
+        self._append_lines(
+            self.index_file,
+            (_index_line(key, digest) for key, (digest, _) in delta.items()),
+        )
+        for key, (digest, _) in delta.items():
+            index[key] = digest
+        self.row_count += len(delta)
+        return [t for _, t in delta.values()]
+
+    def reset(self, transactions):
+        """
+        Called after `transactions` (the merged data) was written to the main
+        file: rebuild the index from it and empty the journal.
+        """
+        self._write_index(transactions)
+        atomic_write_text(self.journal_file, "")
+        self.row_count = 0
+
+    def _write_index(self, transactions):
+        index = {transaction_key(t): transaction_digest(t) for t in transactions}
+        header = f"{_BASE_HEADER}\t{json.dumps(self._base_signature())}\n"
+        atomic_write_text(
+            self.index_file,
+            header + "".join(_index_line(key, digest) + "\n" for key, digest in index.items()),
+        )
+        self._index = index
+
+    def _base_signature(self):
+        """[mtime_ns, size] of the transactions file (None if unknown/missing)."""
+        if self.base_file is None:
+            return None
+        try:
+            st = os.stat(self.base_file)
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    @staticmethod
+    def _append_lines(path, lines):
+        with open(path, "a+b") as f:
+            # Terminate a torn last line so it cannot swallow the next row
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    f.write(b"\n")
+        with open(path, "a", encoding="utf-8") as f:
+            for line in lines:
+                f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+import json
+import os
+import sqlite3
+import sys
+
+from money import to_cents
+from transaction_journal import transaction_key
+
+# --------------------------------------------------------------------
+# Paths / Files
+# --------------------------------------------------------------------
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(BASE_DIR, "data")
+
+TRANSACTIONS_FILE = os.path.join(DATA_DIR, "transactions.json")
+
+# Number of rows sent to SQLite per executemany() call
+BATCH_SIZE = 1000
+
+# `seq` keeps the order rows were first stored in (the order of
+# transactions.json); `data` is the complete row as JSON, so fields the
+# columns do not cover (account, reference, …) survive a round trip.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    seq      INTEGER PRIMARY KEY,
+    id       TEXT NOT NULL UNIQUE,
+    date     TEXT NOT NULL,
+    cents    INTEGER NOT NULL,
+    category TEXT,
+    data     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_tx_date     ON transactions (date);
+CREATE INDEX IF NOT EXISTS idx_tx_category ON transactions (category, date);
+"""
+
+# Last write per ID wins, like merge_transactions; the row keeps its seq
+UPSERT_SQL = """
+INSERT INTO transactions (id, date, cents, category, data)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    date = excluded.date,
+    cents = excluded.cents,
+    category = excluded.category,
+    data = excluded.data
+"""
+
+
+def store_path(transactions_file):
+    """Return the SQLite store path that belongs to a transactions file."""
+    return os.path.splitext(transactions_file)[0] + ".db"
+
+
+def _row(t):
+    return (
+        transaction_key(t),
+        t["date"],
+        to_cents(t["amount"]),
+        t.get("category") or None,
+        json.dumps(t, ensure_ascii=False, default=str),
+    )
+
+
+def _day(value):
+    # date, datetime, Timestamp or ISO string → "YYYY-MM-DD"
+    return str(value)[:10]
+
+
+class TransactionStore:
+    """
+    SQLite-backed transaction store.
+
+    Rows are unique by their stable ID (see transaction_ids), upserted in
+    batches within one SQLite transaction and queried through the date /
+    category indexes. Once a store exists next to transactions.json,
+    TransactionDataset keeps the rows in it instead of in the JSON file
+    and its journal.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    # ----------------------------------------------------------------
+    # Context manager
+    # ----------------------------------------------------------------
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    # ----------------------------------------------------------------
+    # Writing
+    # ----------------------------------------------------------------
+    def upsert_many(self, transactions, batch_size=BATCH_SIZE):
+        """
+        Insert or update transactions (which must have their IDs) in
+        batches of `batch_size` rows. Returns the number of rows that were
+        new to the store.
+        """
+        before = self.count()
+        with self.conn:
+            self._insert(transactions, batch_size)
+        return self.count() - before
+
+    def replace_all(self, transactions, batch_size=BATCH_SIZE):
+        """Make `transactions` the complete content of the store (one SQLite transaction)."""
+        with self.conn:
+            self.conn.execute("DELETE FROM transactions")
+            self._insert(transactions, batch_size)
+
+    def _insert(self, transactions, batch_size):
+        batch = []
+        for t in transactions:
+            batch.append(_row(t))
+            if len(batch) >= batch_size:
+                self.conn.executemany(UPSERT_SQL, batch)
+                batch = []
+        if batch:
+            self.conn.executemany(UPSERT_SQL, batch)
+
+    # ----------------------------------------------------------------
+    # Reading
+    # ----------------------------------------------------------------
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    def all(self):
+        """Return all transactions in stored order."""
+        return [json.loads(data) for data, in self.conn.execute(
+            "SELECT data FROM transactions ORDER BY seq"
+        )]
+
+    def query(self, start_date=None, end_date=None, categories=None):
+        """
+        Return transactions as a list of dicts, ordered by date.
+        start_date / end_date are inclusive dates or ISO strings;
+        categories restricts the result to the given category names.
+        """
+        sql = "SELECT data FROM transactions"
+        clauses, params = [], []
+        if start_date:
+            clauses.append("date >= ?")
+            params.append(_day(start_date))
+        if end_date:
+            clauses.append("date <= ?")
+            params.append(_day(end_date))
+        if categories is not None:
+            categories = list(categories)
+            if not categories:
+                return []
+            clauses.append(f"category IN ({', '.join('?' * len(categories))})")
+            params.extend(categories)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY date, seq"
+        return [json.loads(data) for data, in self.conn.execute(sql, params)]
+
+    def categories(self):
+        """Return the set of all non-empty categories in the store."""
+        rows = self.conn.execute(
+            "SELECT DISTINCT category FROM transactions WHERE category IS NOT NULL"
+        )
+        return {r[0] for r in rows}
+
+    # ----------------------------------------------------------------
+    # JSON import / export
+    # ----------------------------------------------------------------
+    def import_json(self, json_path=TRANSACTIONS_FILE):
+        """
+        One-time import of an existing transactions.json (with its journal
+        replayed and stable IDs assigned) into the store. Safe to repeat:
+        known IDs are only updated, never duplicated.
+        """
+        from dataset import TransactionDataset
+
+        if not os.path.exists(json_path):
+            print(f"⚠ File not found: {json_path}")
+            return 0
+        data = TransactionDataset(json_path, store=False).load()
+        new = self.upsert_many(data)
+        print(f"✅ Imported {len(data)} transactions ({new} new) into {self.path}.")
+        return new
+
+    def export_json(self, json_path=TRANSACTIONS_FILE):
+        """
+        Write the whole store back out as transactions.json (atomically,
+        with its journal and key index reset), in stored order.
+        """
+        from dataset import TransactionDataset
+
+        data = self.all()
+        TransactionDataset(json_path, store=False).save(data)
+        print(f"✅ Exported {len(data)} transactions to {json_path}.")
+        return len(data)
+
+
+# --------------------------------------------------------------------
+# CLI Entry
+# --------------------------------------------------------------------
+if __name__ == "__main__":
+    # python transaction_store.py import [file]  → JSON → SQLite
+    # python transaction_store.py export [file]  → SQLite → JSON
+    # (the store is the .db file next to the JSON file)
+    if len(sys.argv) > 1 and sys.argv[1] in ("import", "export"):
+        target = sys.argv[2] if len(sys.argv) > 2 else TRANSACTIONS_FILE
+        if sys.argv[1] == "export" and not os.path.exists(store_path(target)):
+            print(f"⚠ No transaction store found at {store_path(target)}.")
+            sys.exit(1)
+        with TransactionStore(store_path(target)) as store:
+            if sys.argv[1] == "import":
+                store.import_json(target)
+            else:
+                store.export_json(target)
+    else:
+        print("Unknown arguments. Usage:")
+        print("  python transaction_store.py import [transactions.json]")
+        print("  python transaction_store.py export [transactions.json]")
@@ -0,0 +1,206 @@
+from dataclasses import asdict, dataclass
+from datetime import date
+
+import numpy as np
+
+from money import cents_array, to_amount
+
+# date.toordinal() of 1970-01-01, the epoch of NumPy's datetime64
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Dictionary-encoded string fields of a TransactionTable
+STRING_FIELDS = ("description", "category", "account", "counterparty_iban")
+
+# String fields that are (nearly) distinct per row, stored as StringColumns
+ROW_FIELDS = ("id", "reference")
+
+
+@dataclass(slots=True)
+class Transaction:
+    """One transaction, the record type behind a row of transactions.json."""
+
+    date: str
+    amount: float
+    description: str
+    category: str = None
+    account: str = None
+    counterparty_iban: str = None
+    id: str = None
+    reference: str = None
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            date=data["date"],
+            amount=data["amount"],
+            description=data.get("description"),
+            category=data.get("category"),
+            account=data.get("account"),
+            counterparty_iban=data.get("counterparty_iban"),
+            id=data.get("id"),
+            reference=data.get("reference"),
+        )
+
+    def to_dict(self):
+        """The transactions.json form (fields that are None are left out)."""
+        return {k: v for k, v in asdict(self).items() if v is not None}
+
+
+class StringDictionary:
+    """Distinct strings of a column and their int32 ids (None is -1)."""
+
+    def __init__(self):
+        self.values = []
+        self._ids = {}
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, values):
+        ids = self._ids
+        strings = self.values
+
+        def code(value):
+            if value is None:
+                return -1
+            i = ids.get(value)
+            if i is None:
+                i = ids[value] = len(strings)
+                strings.append(value)
+            return i
+
+        return np.fromiter((code(v) for v in values), dtype=np.int32)
+
+    def decode(self, codes):
+        """Object array of the strings for `codes` (-1 → None)."""
+        return np.array(self.values + [None], dtype=object)[codes]
+
+
+class StringColumn:
+    """
+    Strings that are (nearly) all distinct, such as transaction IDs: one
+    UTF-8 buffer with the end offset of every row and a None mask, instead
+    of one Python string object per row.
+    """
+
+    def __init__(self):
+        self.data = np.zeros(0, dtype=np.uint8)
+        self.ends = np.zeros(0, dtype=np.int64)
+        self.missing = np.zeros(0, dtype=bool)
+
+    def __len__(self):
+        return len(self.ends)
+
+    def extend(self, values):
+        values = list(values)
+        encoded = [v.encode("utf-8") if v is not None else b"" for v in values]
+        lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+        offset = self.ends[-1] if len(self.ends) else 0
+        self.data = np.concatenate([self.data, np.frombuffer(b"".join(encoded), dtype=np.uint8)])
+        self.ends = np.concatenate([self.ends, offset + np.cumsum(lengths)])
+        self.missing = np.concatenate([self.missing, np.fromiter(
+            (v is None for v in values), dtype=bool, count=len(values)
+        )])
+
+    def __getitem__(self, i):
+        if self.missing[i]:
+            return None
+        start = self.ends[i - 1] if i > 0 else 0
+        return self.data[start:self.ends[i]].tobytes().decode("utf-8")
+
+    @property
+    def nbytes(self):
+        return self.data.nbytes + self.ends.nbytes + self.missing.nbytes
+
+
+class TransactionTable:
+    """
+    Column-oriented transactions: amounts as int64 cents, dates as int32
+    ordinals (date.toordinal()) and the string fields as int32 ids into a
+    StringDictionary per field, so a repeated category or description is
+    stored once instead of once per row. The per-row id and reference
+    are kept in StringColumns.
+
+    Rows can be appended in batches and read back as Transaction records
+    or dicts; to_dataframe() builds the chart frame from the arrays,
+    sharing the id arrays as the codes of its categorical columns.
+    """
+
+    def __init__(self):
+        self.dates = np.zeros(0, dtype=np.int32)
+        self.cents = np.zeros(0, dtype=np.int64)
+        self.dictionaries = {field: StringDictionary() for field in STRING_FIELDS}
+        self.codes = {field: np.zeros(0, dtype=np.int32) for field in STRING_FIELDS}
+        self.columns = {field: StringColumn() for field in ROW_FIELDS}
+
+    def __len__(self):
+        return len(self.dates)
+
+    @classmethod
+    def from_transactions(cls, transactions):
+        table = cls()
+        table.extend(transactions)
+        return table
+
+    def extend(self, transactions):
+        """Append transaction dicts (or Transaction records)."""
+        rows = [t if isinstance(t, dict) else t.to_dict() for t in transactions]
+        if not rows:
+            return
+        days = np.array([t["date"] for t in rows], dtype="datetime64[D]").astype(np.int64)
+        cents = cents_array([float(t["amount"]) for t in rows])
+        self.dates = np.concatenate([self.dates, (days + EPOCH_ORDINAL).astype(np.int32)])
+        self.cents = np.concatenate([self.cents, cents])
+        for field in STRING_FIELDS:
+            codes = self.dictionaries[field].encode(t.get(field) for t in rows)
+            self.codes[field] = np.concatenate([self.codes[field], codes])
+        for field in ROW_FIELDS:
+            self.columns[field].extend(t.get(field) for t in rows)
+
+    def __getitem__(self, i):
+        fields = {}
+        for field in STRING_FIELDS:
+            code = int(self.codes[field][i])
+            fields[field] = self.dictionaries[field].values[code] if code >= 0 else None
+        for field in ROW_FIELDS:
+            fields[field] = self.columns[field][i]
+        return Transaction(
+            date=date.fromordinal(int(self.dates[i])).isoformat(),
+            amount=to_amount(self.cents[i]),
+            **fields,
+        )
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def to_dicts(self):
+        return [t.to_dict() for t in self]
+
+    @property
+    def nbytes(self):
+        """Bytes held by the arrays and the distinct strings."""
+        arrays = self.dates.nbytes + self.cents.nbytes + sum(c.nbytes for c in self.codes.values())
+        arrays += sum(c.nbytes for c in self.columns.values())
+        strings = sum(len(s.encode("utf-8")) for d in self.dictionaries.values() for s in d.values)
+        return arrays + strings
+
+    def to_dataframe(self, categorical=("category", "description")):
+        """
+        The chart frame: datetime64 dates, int64 "cents", `categorical`
+        string fields as pandas Categoricals over the table's id arrays
+        (not copied) and the other string fields as objects. Those other
+        fields are left out if they are None in every row.
+        """
+        import pandas as pd
+
+        columns = {
+            "date": (self.dates.astype(np.int64) - EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[us]"),
+            "cents": self.cents,
+        }
+        for field in STRING_FIELDS:
+            dictionary, codes = self.dictionaries[field], self.codes[field]
+            if field in categorical:
+                columns[field] = pd.Categorical.from_codes(codes, categories=dictionary.values)
+            elif len(dictionary):
+                columns[field] = dictionary.decode(codes)
+        return pd.DataFrame(columns, copy=False)
@@ -1,9 +1,16 @@
 import os
+import sys
+import time
 import json
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
+from aggregate_cache import AggregateCache
 from color_manager import ColorManager
-from fints_connector import FinTSConnector
+from dataset import TransactionDataset, get_dataset
+from money import cents_array, format_cents_array, to_cents
+from transaction_index import TransactionIndex
+from transaction_table import TransactionTable
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_DIR = os.path.join(BASE_DIR, "data")
@@ -19,168 +26,201 @@ def load_area_categories():
         return []
 
 
+def expand_monthly_to_daily(monthly):
+    """
+    Broadcast a frame indexed by monthly periods to one row per calendar day
+    of each of those months, using a single reindex.
+    """
+    if monthly.empty:
+        return monthly.set_axis(pd.DatetimeIndex([]), axis=0)
+    start = monthly.index.min().start_time
+    end = monthly.index.max().end_time.normalize()
+    days = pd.date_range(start=start, end=end, freq="D")
+    day_months = days.to_period("M")
+    keep = day_months.isin(monthly.index)
+    daily = monthly.reindex(day_months[keep])
+    daily.index = days[keep]
+    daily.index.freq = None
+    return daily
+
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 TRANSACTIONS_FILE = os.path.join(BASE_DIR, "data", "transactions.json")
 
+# Level of detail: days drawn at full daily resolution (counted back from the
+# latest transaction), the resolution used before that, and the point count
+# above which a line trace switches to WebGL (go.Scattergl).
+DAILY_WINDOW_DAYS = 365
+LOD_FREQ = "W"
+WEBGL_THRESHOLD = 5000
+
 
 class Visualizer:
-    def __init__(self):
-        self.color_manager = ColorManager()
-
-        print(f"🔎 Checking for local file: {TRANSACTIONS_FILE}")
-        if os.path.exists(TRANSACTIONS_FILE):
-            try:
-                with open(TRANSACTIONS_FILE, "r", encoding="utf-8") as file:
-                    self.transactions = json.load(file)
-                    print(f"✅ Loaded {len(self.transactions)} transactions into Visualizer.")
-                return
-            except json.JSONDecodeError:
-                print("❌ Error: JSON file is corrupted or empty!")
+    def __init__(self, transactions=None, aggregate_cache=None, color_manager=None,
+                 daily_window_days=DAILY_WINDOW_DAYS, lod_freq=LOD_FREQ,
+                 webgl_threshold=WEBGL_THRESHOLD):
+        """
+        `transactions` may be an already-loaded TransactionDataset, a pandas
+        DataFrame, a TransactionTable or a list of transaction dicts.
+        Without it, the shared dataset for transactions.json is used.
+
+        Level of detail: only the last `daily_window_days` days are drawn
+        with one point per day; older history is reduced to `lod_freq`
+        ("W" weekly or "M" monthly) points (None disables this). Line traces
+        with more than `webgl_threshold` points are rendered with WebGL.
+        """
+        self.color_manager = color_manager or ColorManager()
+        self.aggregate_cache = aggregate_cache or AggregateCache()
+        self._prepared = {}
+        self._index = None
+        self.daily_window_days = daily_window_days
+        self.lod_freq = lod_freq
+        self.webgl_threshold = webgl_threshold
+
+        if transactions is None:
+            print(f"🔎 Checking for local file: {TRANSACTIONS_FILE}")
+            if not os.path.exists(TRANSACTIONS_FILE):
+                print(f"⚠ No transaction file found at {TRANSACTIONS_FILE}.")
+                transactions = []
+            else:
+                # The frame may come from the columnar cache without a JSON parse
+                transactions = get_dataset(TRANSACTIONS_FILE, load=False)
+
+        if isinstance(transactions, pd.DataFrame):
+            self.transactions = transactions
+        elif isinstance(transactions, TransactionDataset):
+            self.transactions = transactions.to_dataframe()
+            # Shared with other charts of the same dataset
+            self._index = transactions.index()
+        elif isinstance(transactions, TransactionTable):
+            self.transactions = transactions.to_dataframe()
         else:
-            print(f"⚠ No transaction file found at {TRANSACTIONS_FILE}.")
+            self.transactions = TransactionTable.from_transactions(transactions).to_dataframe()
+        print(f"✅ Loaded {len(self.transactions)} transactions into Visualizer.")
 
-        self.transactions = []
+    def generate_chart(self, **filters):
+        """
+        Builds the chart (see build_figure, which gets `filters`) and opens
+        it in the browser.
+        """
+        fig = self.build_figure(**filters)
+        if fig is None:
+            return
+        fig.show()
+        print("✅ Chart generated successfully!")
 
-    def generate_chart(self):
+    def export(self, path, fmt="html", **filters):
+        """
+        Headless alternative to generate_chart(): write the figure to `path`
+        as a self-contained HTML page (plotly.js embedded, no network needed)
+        or as a compact JSON figure spec (fmt="json"). `filters` are passed
+        to build_figure(). Returns the path, or None if there was no data.
         """
-        Generates:
+        fig = self.build_figure(**filters)
+        if fig is None:
+            return None
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        if fmt == "json":
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(fig.to_json())
+        else:
+            fig.write_html(path, include_plotlyjs=True, full_html=True)
+        print(f"ℹ Wrote {os.path.getsize(path) / 1024:.0f} KB to {path}.")
+        return path
+
+    def build_figure(self, start_date=None, end_date=None, categories=None,
+                     title="📊 Expense Tracker"):
+        """
+        Builds and returns (without showing) a figure with:
          - A stacked area chart of all expenses (fixed at bottom, variable on top),
          - A separate income line (monthly total constant per day),
          - A balance line (static for testing),
          - One marker per day/category showing all transactions in the tooltip
            (the "Transactions:..." section appears only on days with actual entries).
-        """
-        if not self.transactions:
-            print("⚠ No transaction data available. Chart will not be created.")
-            return
-
-        # --- 1) Prepare base DataFrame ---
-        df = pd.DataFrame(self.transactions)
-        df["date"] = pd.to_datetime(df["date"])  # Convert the date column to pandas datetime objects
-        df = df.sort_values("date")
-        print(f"ℹ DataFrame has {len(df)} rows.")
 
-        # Convert negative amounts to positive for expense calculations
-        df["amount_abs"] = df["amount"].abs()
-
-        # Consolidate income categories into a single "Income" label
-        income_cats = {"Salary", "Bonus", "Revenue"}
-        df["category"] = df["category"].apply(lambda c: "Income" if c in income_cats else c)
+        start_date / end_date (inclusive) limit the plotted range: only the
+        transactions of its months are read (through the TransactionIndex),
+        and the balance starts from the total of all earlier transactions.
+        `categories` limits the
+        stacked areas and cumsum lines to those expense categories.
+        Returns None if there is no data to plot.
+        """
+        prepared = self._prepare(self._window(start_date, end_date))
+        if prepared is None:
+            return None
+        month_sum_df, day_df, daily_net, full_date_range, opening_balance = prepared
 
         # Define expense categories in stacking order (bottom → top)
         area_categories = load_area_categories()
+        if categories is not None:
+            area_categories = [c for c in area_categories if c in set(categories)]
         if not area_categories:
             print("ℹ No area categories defined. Skipping stacked area plot.")
 
-        # Compute the monthly total per category
-        df["year_month"] = df["date"].dt.to_period("M")
-        month_sum_df = df.groupby(["year_month", "category"], as_index=False).agg(
-            month_sum=("amount_abs", "sum")
-        )
-        # with as_index=False, "year_month" and "category" remain columns instead of becoming the index
-
-        # Create a full date range from the earliest to the latest transaction date
-        full_date_range = pd.date_range(start=df["date"].min(), end=df["date"].max(), freq="D")
-
         # --- 2) stacked area-chart of the output ---
-        area_list = []
-        for period in month_sum_df["year_month"].unique():
-            start = pd.Timestamp(period.start_time)
-            end   = pd.Timestamp(period.end_time)
-            days  = pd.date_range(start=start, end=end, freq="D")
-
-            data = month_sum_df[
-                (month_sum_df["year_month"] == period) &
-                (~month_sum_df["category"].isin(["Income"]))
-            ]
-
-            for cat in area_categories:
-                val = data.loc[data["category"] == cat, "month_sum"]
-                total = int(val.iloc[0]) if not val.empty else 0
-
-                area_list.append(pd.DataFrame({
-                    "date": days,
-                    "category": cat,
-                    "month_value": total
-                }))
-
-        df_area = (
-            pd.concat(area_list, ignore_index=True)
-            if area_list
-            else pd.DataFrame(columns=["date", "category", "month_value"])
-        )
-
-        df_area = df_area.pivot(index="date", columns="category", values="month_value").fillna(0)
-        # Nur die in area_categories vorkommenden Spalten in der richtigen Reihenfolge belassen
-        df_area = df_area[[c for c in area_categories if c in df_area.columns]]
+        df_area = self._build_area_frame(month_sum_df, area_categories)
 
         # --- 3) Income-Line (monthvalue constant for days) ---
-        income_list = []
-        inc_data = month_sum_df[month_sum_df["category"] == "Income"]
-        for period in inc_data["year_month"].unique():
-            start = pd.Timestamp(period.start_time)
-            end   = pd.Timestamp(period.end_time)
-            days  = pd.date_range(start=start, end=end, freq="D")
-
-            val = inc_data.loc[inc_data["year_month"] == period, "month_sum"]
-            total = int(val.iloc[0]) if not val.empty else 0
-
-            income_list.append(pd.DataFrame({
-                "date": days,
-                "category": "Income",
-                "month_value": total
-            }))
-
-        df_income = (
-            pd.concat(income_list, ignore_index=True)
-            if income_list
-            else pd.DataFrame(columns=["date", "category", "month_value"])
-        )
-        # set index and remove duplicates, before reindex:
-        df_income = df_income.set_index("date")
-        df_income = df_income[~df_income.index.duplicated(keep="last")]
-        df_income = df_income.reindex(full_date_range).fillna(0)
+        df_income = self._build_income_frame(month_sum_df, full_date_range)
 
         # --- 4) Balance line ---
         # --- STATIC PART: Use a fixed initial balance for testing ---
         #"""
-        initial_balance = 1000.0
-        df["cumulative_sum"] = df["amount"].cumsum()
-        df_balance = (
-            df.set_index("date")[ ["cumulative_sum"] ]
-              .rename(columns={"cumulative_sum": "account_balance"})
-        )
-        df_balance = df_balance[~df_balance.index.duplicated(keep="last")]
-        df_balance["account_balance"] += initial_balance
-        df_balance = df_balance.reindex(full_date_range).ffill().fillna(initial_balance)
+        initial_balance = to_cents(1000)
+        df_balance = self._build_balance_frame(daily_net, initial_balance + opening_balance, full_date_range)
         #"""
 
         # --- DYNAMIC PART: Fetch live balances via FinTS Connector ---
         """
+        from fints_connector import FinTSConnector
         fin = FinTSConnector()
         bal_dict = fin.get_balance()  # {iban: {"amount": X, "currency": Y}, …}
-        initial_balance = sum(item["amount"] for item in bal_dict.values())
-        df["cumulative_sum"] = df["amount"].cumsum()
-
-        df_balance = (
-            df
-            .set_index("date")[ ["cumulative_sum"] ]
-            .rename(columns={"cumulative_sum": "account_balance"})
-        )
-
-        df_balance = df_balance[~df_balance.index.duplicated(keep="last")]
-        df_balance["account_balance"] += initial_balance
-        df_balance = df_balance.reindex(full_date_range).ffill().fillna(initial_balance)
+        initial_balance = sum(to_cents(item["amount"]) for item in bal_dict.values())
+        df_balance = self._build_balance_frame(daily_net, initial_balance + opening_balance, full_date_range)
         """
 
+        # Daily cumsum lines (plotted in step 6)
+        df_lines = self._build_daily_lines(day_df, area_categories, df_area)
+
+        # --- 4b) Restrict everything to the requested date range ---
+        if start_date is not None or end_date is not None:
+            start = pd.Timestamp(start_date) if start_date is not None else full_date_range[0]
+            end = pd.Timestamp(end_date) if end_date is not None else full_date_range[-1]
+            full_date_range = full_date_range[(full_date_range >= start) & (full_date_range <= end)]
+            if len(full_date_range) == 0:
+                print(f"⚠ No transaction data between {start.date()} and {end.date()}.")
+                return None
+            df_area = df_area[(df_area.index >= start) & (df_area.index <= end)]
+            df_income = df_income.loc[full_date_range]
+            df_balance = df_balance.loc[full_date_range]
+            if df_lines is not None:
+                df_lines = df_lines[(df_lines["date"] >= start) & (df_lines["date"] <= end)]
+                if df_lines.empty:
+                    df_lines = None
+
+        # --- 4c) Level of detail: coarser resolution before the daily window ---
+        cutoff = self._lod_cutoff(full_date_range)
+        if cutoff is not None:
+            df_area = self._thin_monthly_constant(df_area, cutoff)
+            df_income = self._thin_monthly_constant(df_income, cutoff)
+            df_balance = self._downsample_last(df_balance, cutoff, self.lod_freq)
+            if df_lines is not None:
+                df_lines = self._downsample_lines(df_lines, cutoff, self.lod_freq)
+
         # --- 5) build Plot  ---
+        # (all values above are integer cents; they become euros only here)
+        # Colors of all traces in one batch (new ones are saved once, at exit)
+        self.color_manager.assign_colors(
+            list(df_area.columns) + ["Income", "Account Balance"] + area_categories
+        )
         fig = go.Figure()
         # a) output as stacked area (not show hoverinfo for areas)
+        #    (stackgroup is not supported by WebGL traces, so these stay SVG)
         for cat in df_area.columns:
             fig.add_trace(go.Scatter(
                 name=cat,
                 x=df_area.index,
-                y=df_area[cat],
+                y=df_area[cat] / 100,
                 mode="lines",
                 stackgroup="same",
                 line=dict(width=0, color=self.color_manager.get_color_for_category(cat)),
@@ -189,111 +229,42 @@ class Visualizer:
             ))
 
         # b) Income-Line
-        fig.add_trace(go.Scatter(
+        fig.add_trace(self._scatter_type(len(df_income))(
             name="Income",
             x=df_income.index,
-            y=df_income["month_value"],
+            y=df_income["month_value"] / 100,
             mode="lines",
             line=dict(width=2, color=self.color_manager.get_color_for_category("Income")),
             hoverinfo="x+y+name"
         ))
 
         # c) Balance-Line
-        fig.add_trace(go.Scatter(
+        fig.add_trace(self._scatter_type(len(df_balance))(
             name="Account Balance",
             x=df_balance.index,
-            y=df_balance["account_balance"],
+            y=df_balance["account_balance"] / 100,
             mode="lines",
             line=dict(width=1, color=self.color_manager.get_color_for_category("Account Balance")),
             hoverinfo="x+y+name"
         ))
 
         # --- 6) Daily cumsum-Lines with markers & all transactions in the tooltip ---
-        df_multi = df[df["category"].isin(area_categories)].copy()
-        if not df_multi.empty:
-            df_multi["year_month"] = df_multi["date"].dt.to_period("M")
-            df_multi = df_multi.sort_values(["category", "year_month", "date"])
-            order_map = {cat: i for i, cat in enumerate(area_categories)}
-
-            all_lines = []
-            for (cat, period), grp in df_multi.groupby(["category", "year_month"]):
-            # (cat, period), grp are key and value in df_multi
-                start = pd.Timestamp(period.start_time)
-                end   = pd.Timestamp(period.end_time)
-                days  = pd.date_range(start=start, end=end, freq="D")
-
-                grp = grp.copy()
-                grp["expense_val"] = grp["amount_abs"]
-
-                # 6.1) sum daily values
-                daily = grp.groupby("date", as_index=False)["expense_val"].sum()
-                daily = (
-                    daily
-                    .set_index("date")
-                    .reindex(days)
-                    .fillna(0)
-                    .reset_index()
-                    .rename(columns={"index": "date"})
-                )
-                daily["cum_val"] = daily["expense_val"].cumsum()
-
-                # 6.2) collect all TX-Details per day (incl. Präfix "Transactions:<br>")
-                tx_det = (
-                    grp.groupby("date")
-                       .apply(
-                           lambda g: "Transactions:<br>" +
-                                     "<br>".join(f"{int(a)} € – {d}"
-                                                 for a, d in zip(g["expense_val"], g["description"]))
-                       )
-                       .reset_index(name="tx_details")
-                )
-                tx_det["tx_details"] = tx_det["tx_details"].fillna("")  # missing days -> empty string
-
-                daily = daily.merge(tx_det, on="date", how="left")
-                daily["tx_details"] = daily["tx_details"].fillna("")  # NaN → empty string
-                daily["marker_size"] = daily["tx_details"].apply(lambda txt: 6 if txt else 0)
-
-                # 6.3) calculate stack-offset (so lines are displayed above area chart)
-                def offset(r):
-                    # 'r' is a pandas.Series representing one row of the 'daily' DataFrame.
-                    # It contains fields such as the date (r["date"]) and the cumulative expense value (r["cum_val"]).
-
-                    # 1) Build the list of categories that lie **below** the current category 'cat' in the stack.
-                    #    'order_map' maps each category to its stacking order index
-                    #    (e.g. 0 = bottom, 1 = next, etc.).
-                    #    Example: if cat="Food" and order_map["Food"]=3, then
-                    #    below = area_categories[:3] == ["Rent","Electricity","Landline"].
-                    below = area_categories[: order_map[cat]]
-
-                    # 2) If there are any 'below' categories, look up in the pivot table 'df_area'
-                    #    at the row for r["date"] the values for all these 'below' categories,
-                    #    then sum them. This yields the total stacked height **below** 'cat' on that date.
-                    #    If 'below' is empty (i.e. 'cat' is the bottommost category), return 0.
-                    return df_area.loc[r["date"], below].sum() if below else 0
-
-                    # 3) Apply the 'offset' function to each row of 'daily' (axis=1 means row-wise).
-                    #    The result is a sequence of offset values, which we store in the new column "offset".
-                daily["offset"] = daily.apply(offset, axis=1)
-                daily["line_y"] = daily["offset"] + daily["cum_val"]
-                daily["category"] = cat
-
-                all_lines.append(daily)
-
-            df_lines = pd.concat(all_lines, ignore_index=True)
+        if df_lines is not None:
+            lines_by_cat = dict(tuple(df_lines.groupby("category", sort=False)))
 
             for cat in area_categories:
-                sub = df_lines[df_lines["category"] == cat]
-                if sub.empty:
+                sub = lines_by_cat.get(cat)
+                if sub is None:
                     continue
 
-                fig.add_trace(go.Scatter(
+                fig.add_trace(self._scatter_type(len(sub))(
                     name=f"{cat} daily cumsum",
                     x=sub["date"],
-                    y=sub["line_y"],
+                    y=sub["line_y"] / 100,
                     mode="lines+markers",
                     line=dict(width=1, color=self.color_manager.get_color_for_category(cat)),
                     marker=dict(size=sub["marker_size"], color="yellow", symbol="diamond"),
-                    customdata=sub[["cum_val", "tx_details"]],
+                    customdata=np.column_stack([format_cents_array(sub["cum_val"]), sub["tx_details"]]),
                     hovertemplate=(
                         "Date: %{x}<br>"
                         + f"{cat} cumulative: %{{customdata[0]}} €"
@@ -305,13 +276,387 @@ class Visualizer:
 
         # Layout final
         fig.update_layout(
-            title="📊 Expense Tracker",
+            title=title,
             xaxis_title="📅 Date",
             yaxis_title="💰 Amount (€)",
             legend_title="Categories",
             hovermode="x unified"
         )
-        fig.show()
-        print("✅ Chart generated successfully!")
+        if cutoff is not None:
+            # Open on the daily-resolution window; older history stays reachable
+            fig.update_xaxes(
+                range=[cutoff, full_date_range[-1]],
+                rangeselector=dict(buttons=[
+                    dict(count=1, label="1m", step="month", stepmode="backward"),
+                    dict(count=6, label="6m", step="month", stepmode="backward"),
+                    dict(count=1, label="1y", step="year", stepmode="backward"),
+                    dict(step="all", label="all"),
+                ]),
+            )
+
+        # The payload size is reported by export(), which serializes anyway
+        n_points = sum(len(trace.x) for trace in fig.data if trace.x is not None)
+        print(f"ℹ Figure has {len(fig.data)} traces, {n_points} points.")
+        return fig
+
+    @staticmethod
+    def _window(start_date, end_date):
+        """
+        The whole months around a requested date range, or None for all
+        data: monthly sums and the in-month cumsum lines need every
+        transaction of a month, the days outside the range are cut off
+        after aggregating.
+        """
+        if start_date is None and end_date is None:
+            return None
+        start = pd.Timestamp(start_date).to_period("M").start_time if start_date is not None else None
+        end = pd.Timestamp(end_date).to_period("M").end_time.normalize() if end_date is not None else None
+        return start, end
+
+    def _transaction_index(self):
+        if self._index is None:
+            self._index = TransactionIndex(self.transactions)
+        return self._index
+
+    def _prepare(self, window=None):
+        """
+        Steps shared by all figures of this Visualizer over the same
+        `window` (see _window), computed once: the normalized transaction
+        frame and its (cached) aggregates. Returns (month_sum_df, day_df,
+        daily_net, full_date_range, opening_balance) or None; the opening
+        balance is the cent total of all transactions before the window.
+        """
+        if window in self._prepared:
+            return self._prepared[window]
+        if self.transactions.empty:
+            print("⚠ No transaction data available. Chart will not be created.")
+            return None
+
+        # --- 1) Prepare base DataFrame ---
+        if window is None:
+            df = self.transactions.copy()
+            opening_balance = 0
+        else:
+            # Only the window's rows: a binary search on the sorted dates
+            index = self._transaction_index()
+            start, end = window
+            df = index.query(start, end).copy()
+            opening_balance = index.total_before(start) if start is not None else 0
+            if df.empty:
+                print("⚠ No transaction data in the requested date range.")
+                return None
+        df["date"] = pd.to_datetime(df["date"])  # Convert the date column to pandas datetime objects
+        if not df["date"].is_monotonic_increasing:
+            df = df.sort_values("date", kind="stable")
+        print(f"ℹ DataFrame has {len(df)} rows.")
+
+        # Integer cents (frames built from a TransactionTable have them
+        # already); negative amounts made positive for expense calculations
+        if "cents" not in df.columns:
+            df["cents"] = cents_array(df["amount"])
+        df["cents_abs"] = np.abs(df["cents"])
+
+        # Consolidate income categories into a single "Income" label, mapped
+        # once per distinct category (code -1, i.e. missing, picks the None)
+        income_cats = {"Salary", "Bonus", "Revenue"}
+        categories = df["category"].astype("category")
+        labels = ["Income" if c in income_cats else c for c in categories.cat.categories]
+        df["category"] = np.array(labels + [None], dtype=object)[categories.cat.codes.to_numpy()]
+
+        # Monthly totals per category, per-day expense totals / tooltip lines
+        # and per-day net amounts; unchanged months come from the cache
+        df["year_month"] = df["date"].dt.to_period("M")
+        month_sum_df, day_df, daily_net = self.aggregate_cache.get_aggregates(
+            df, complete=window is None
+        )
+
+        # Create a full date range from the earliest to the latest transaction
+        # date (of all data, clipped to the window)
+        first, last = df["date"].iloc[0], df["date"].iloc[-1]
+        if window is not None:
+            index = self._transaction_index()
+            first = index.first_date if start is None else max(start, index.first_date)
+            last = index.last_date if end is None else min(end, index.last_date)
+        full_date_range = pd.date_range(start=first, end=last, freq="D")
+
+        self._prepared[window] = (month_sum_df, day_df, daily_net, full_date_range, opening_balance)
+        return self._prepared[window]
+
+    @staticmethod
+    def _build_area_frame(month_sum_df, area_categories):
+        """
+        Pivot the monthly sums into one column per area category (in stacking
+        order) and broadcast each month's value to all of its days.
+        Months without any transaction are left out, as before.
+        """
+        periods = month_sum_df["year_month"].unique()
+        if not area_categories or len(periods) == 0:
+            return pd.DataFrame(columns=["date", "category", "month_value"]).pivot(
+                index="date", columns="category", values="month_value"
+            )
+
+        expenses = month_sum_df[month_sum_df["category"] != "Income"]
+        monthly = (
+            expenses.pivot(index="year_month", columns="category", values="month_sum")
+                    .reindex(index=periods, columns=area_categories)
+                    .fillna(0)
+                    .astype(np.int64)
+        )
+        df_area = expand_monthly_to_daily(monthly)
+        df_area.index.name = "date"
+        df_area.columns.name = "category"
+        return df_area
+
+    @staticmethod
+    def _build_income_frame(month_sum_df, full_date_range):
+        """
+        Monthly income total, constant over every day of its month and
+        reindexed to the full date range (days without income → 0).
+        """
+        inc = month_sum_df[month_sum_df["category"] == "Income"].set_index("year_month")
+        if inc.empty:
+            empty = pd.DataFrame(columns=["date", "category", "month_value"]).set_index("date")
+            return empty.reindex(full_date_range).fillna(0)
+        monthly = pd.DataFrame({
+            "category": "Income",
+            "month_value": inc["month_sum"].astype(np.int64),
+        })
+        df_income = expand_monthly_to_daily(monthly)
+        df_income.index.name = "date"
+        return df_income.reindex(full_date_range).fillna(0)
+
+    @staticmethod
+    def _build_balance_frame(daily_net, initial_balance, full_date_range):
+        """End-of-day account balance in cents, forward-filled over the full date range."""
+        df_balance = (daily_net.sort_index().cumsum() + initial_balance).to_frame("account_balance")
+        return df_balance.reindex(full_date_range).ffill().fillna(initial_balance)
+
+    @staticmethod
+    def _build_daily_lines(day_df, area_categories, df_area):
+        """
+        One row per day of every (category, month) with expenses:
+        daily sum, month-to-date cumsum, tooltip text, marker size and the
+        stack offset that lifts the line onto the top of the categories
+        below it. Returns None if no area category has transactions.
+
+        `day_df` holds the per-(category, day) expense totals and tooltip
+        lines from the AggregateCache.
+        """
+        days = day_df[day_df["category"].isin(area_categories)]
+        if days.empty:
+            return None
+        days = days.assign(year_month=days["date"].dt.to_period("M"))
+        days = days.sort_values(["category", "year_month", "date"])
+
+        # 6.1) every day of every (category, month) that has transactions
+        groups = days[["category", "year_month"]].drop_duplicates()
+        starts = groups["year_month"].dt.start_time.to_numpy()
+        lengths = groups["year_month"].dt.days_in_month.to_numpy()
+        group_idx = np.repeat(np.arange(len(groups)), lengths)
+        first_row = np.repeat(np.cumsum(lengths) - lengths, lengths)
+        day_offset = np.arange(len(group_idx)) - first_row
+        daily = pd.DataFrame({
+            "category": groups["category"].to_numpy()[group_idx],
+            "date": starts[group_idx] + day_offset.astype("timedelta64[D]"),
+        })
+        daily["date"] = daily["date"].astype(days["date"].dtype)
+
+        # accumulate the daily values per (category, month)
+        daily = daily.join(
+            days.set_index(["category", "date"])[["expense_val", "tx_lines"]],
+            on=["category", "date"],
+        )
+        # (integer cumsum per group: running total minus the total before
+        # the group's first day)
+        values = daily["expense_val"].fillna(0).to_numpy(dtype=np.int64)
+        running = np.cumsum(values)
+        group_start = np.cumsum(lengths) - lengths
+        daily["expense_val"] = values
+        daily["cum_val"] = running - np.repeat(running[group_start] - values[group_start], lengths)
+
+        # 6.2) all TX-Details per day (incl. prefix "Transactions:<br>")
+        has_tx = daily["tx_lines"].notna()
+        daily["tx_details"] = ("Transactions:<br>" + daily["tx_lines"]).where(has_tx, "")
+        daily["marker_size"] = np.where(has_tx, 6, 0)
+
+        # 6.3) stack offset: sum of all area categories below this one on that
+        #      day = cumulative sum across the ordered columns, shifted by one
+        below = df_area.cumsum(axis=1).shift(1, axis=1).fillna(0).astype(df_area.dtypes.iloc[0])
+        offsets = below.stack().rename("offset")
+        offsets.index.names = ["date", "category"]
+        daily = daily.join(offsets, on=["date", "category"])
+        daily["line_y"] = daily["offset"] + daily["cum_val"]
+
+        return daily[[
+            "date", "expense_val", "cum_val", "tx_details",
+            "marker_size", "offset", "line_y", "category"
+        ]]
+
+    # ----------------------------------------------------------------
+    # Level of detail
+    # ----------------------------------------------------------------
+    def _lod_cutoff(self, full_date_range):
+        """First day drawn at daily resolution, or None if all of them are."""
+        if self.daily_window_days is None or len(full_date_range) <= self.daily_window_days:
+            return None
+        return full_date_range[-1] - pd.Timedelta(days=self.daily_window_days - 1)
+
+    def _scatter_type(self, n_points):
+        return go.Scattergl if n_points > self.webgl_threshold else go.Scatter
+
+    @staticmethod
+    def _thin_monthly_constant(frame, cutoff):
+        """
+        Area and income values are constant within a month, so before the
+        cutoff only the first and last day of each month are needed to draw
+        exactly the same shape.
+        """
+        idx = frame.index
+        if len(idx) == 0:
+            return frame
+        keep = (idx >= cutoff) | idx.is_month_start | idx.is_month_end
+        keep[0] = keep[-1] = True
+        return frame[keep]
+
+    @staticmethod
+    def _downsample_last(frame, cutoff, freq):
+        """Keep the last row of every `freq` period before the cutoff."""
+        old = frame[frame.index < cutoff]
+        old = old.groupby(old.index.to_period(freq)).tail(1)
+        return pd.concat([old, frame[frame.index >= cutoff]])
+
+    @staticmethod
+    def _downsample_lines(df_lines, cutoff, freq):
+        """
+        Reduce the daily cumsum lines before the cutoff to one point per
+        `freq` period (within each category-month, so the monthly reset of
+        the cumsum stays visible). The tooltip of such a point summarizes
+        the period instead of listing every transaction.
+        """
+        recent = df_lines[df_lines["date"] >= cutoff]
+        old = df_lines[df_lines["date"] < cutoff]
+        if old.empty:
+            return df_lines
+
+        keys = [
+            old["category"],
+            old["date"].dt.to_period("M"),
+            old["date"].dt.to_period(freq),
+        ]
+        grouped = old.assign(tx_count=old["tx_details"].str.count("<br>")).groupby(keys, sort=False)
+        binned = grouped.tail(1).copy()
+        binned["expense_val"] = grouped["expense_val"].transform("sum")[binned.index]
+        tx_count = grouped["tx_count"].transform("sum")[binned.index]
+        binned["tx_details"] = np.where(
+            tx_count > 0,
+            "Transactions:<br>" + tx_count.astype(str) + " transactions, "
+            + format_cents_array(binned["expense_val"]) + " € total",
+            "",
+        )
+        binned["marker_size"] = np.where(tx_count > 0, 6, 0)
+        binned = binned.drop(columns="tx_count")
+        return pd.concat([binned, recent]).sort_values(["category", "date"], kind="stable")
+
+
+# --------------------------------------------------------------------
+# Benchmark
+# --------------------------------------------------------------------
+def _daily_lines_loop(df, area_categories, df_area):
+    """
+    The per-(category, month) loop that _build_daily_lines replaced, kept
+    unchanged (apart from reading cents) as the baseline of benchmark().
+    """
+    df_multi = df[df["category"].isin(area_categories)].copy()
+    if df_multi.empty:
+        return None
+    df_multi = df_multi.sort_values(["category", "year_month", "date"])
+    order_map = {cat: i for i, cat in enumerate(area_categories)}
+
+    all_lines = []
+    for (cat, period), grp in df_multi.groupby(["category", "year_month"]):
+        days = pd.date_range(start=period.start_time, end=period.end_time, freq="D")
+
+        grp = grp.copy()
+        grp["expense_val"] = grp["cents_abs"]
+
+        daily = grp.groupby("date", as_index=False)["expense_val"].sum()
+        daily = (
+            daily.set_index("date")
+                 .reindex(days)
+                 .fillna(0)
+                 .reset_index()
+                 .rename(columns={"index": "date"})
+        )
+        daily["cum_val"] = daily["expense_val"].cumsum()
+
+        tx_det = (
+            grp.groupby("date")
+               .apply(lambda g: "Transactions:<br>" +
+                                "<br>".join(f"{int(a)} € – {d}"
+                                            for a, d in zip(g["expense_val"], g["description"])))
+               .reset_index(name="tx_details")
+        )
+        daily = daily.merge(tx_det, on="date", how="left")
+        daily["tx_details"] = daily["tx_details"].fillna("")
+        daily["marker_size"] = daily["tx_details"].apply(lambda txt: 6 if txt else 0)
+
+        def offset(r):
+            below = area_categories[: order_map[cat]]
+            return df_area.loc[r["date"], below].sum() if below else 0
+
+        daily["offset"] = daily.apply(offset, axis=1)
+        daily["line_y"] = daily["offset"] + daily["cum_val"]
+        daily["category"] = cat
+        all_lines.append(daily)
+    return pd.concat(all_lines, ignore_index=True)
+
+
+def benchmark(sizes=(1_000, 100_000, 1_000_000), n_categories=50, years=10, seed=0):
+    """
+    Time the daily cumsum lines (step 6 of the chart) with the old loop
+    against the vectorized path (AggregateCache + _build_daily_lines) on
+    `sizes` synthetic transactions over `n_categories` categories and
+    `years` years, check that both give the same values and print the results.
+    """
+    rng = np.random.default_rng(seed)
+    names = [f"Category {i}" for i in range(n_categories)]
+    first_day = pd.Timestamp("2015-01-01")
+    for n_rows in sizes:
+        days = first_day + pd.to_timedelta(np.sort(rng.integers(0, 365 * years, n_rows)), unit="D")
+        cents = -rng.integers(100, 20_000, n_rows)
+        df = pd.DataFrame({
+            "date": days,
+            "cents": cents,
+            "cents_abs": np.abs(cents),
+            "category": np.array(names, dtype=object)[rng.integers(0, n_categories, n_rows)],
+            "description": [f"Shop {k}" for k in rng.integers(0, 500, n_rows)],
+        })
+        df["year_month"] = df["date"].dt.to_period("M")
+
+        t0 = time.perf_counter()
+        month_sum_df, day_df, _ = AggregateCache(path=None).get_aggregates(df)
+        df_area = Visualizer._build_area_frame(month_sum_df, names)
+        t_area = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        new = Visualizer._build_daily_lines(day_df, names, df_area)
+        t_new = time.perf_counter() - t0 + t_area
+        t0 = time.perf_counter()
+        old = _daily_lines_loop(df, names, df_area)
+        t_old = time.perf_counter() - t0 + t_area
+
+        # Tooltips are formatted differently (whole euros vs. cents)
+        columns = ["date", "expense_val", "cum_val", "marker_size", "offset", "line_y", "category"]
+        pd.testing.assert_frame_equal(
+            new[columns].reset_index(drop=True), old[columns], check_dtype=False
+        )
+        print(f"⏱ {n_rows:>9,} transactions: old loop {t_old:8.2f}s, "
+              f"vectorized {t_new:6.2f}s ({t_old / t_new:,.0f}x)")
 
 
+if __name__ == "__main__":
+    # python visualizer.py bench [rows ...]
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        benchmark([int(n) for n in sys.argv[2:]] or (1_000, 100_000, 1_000_000))
+    else:
+        print("Unknown arguments. Usage:")
+        print("  python visualizer.py bench [rows ...]")
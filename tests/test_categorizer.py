@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+import categorizer
+from categorizer import Categorizer
+from rules import RuleSet, _random_rules, _random_transactions
+
+
+@pytest.fixture
+def data(tmp_path, monkeypatch):
+    # Mappings, rules and model start empty
+    monkeypatch.chdir(tmp_path)
+    rng = random.Random(0)
+    rules = RuleSet(_random_rules(rng, 200))
+    transactions = _random_transactions(rng, 600, 200)
+    return rules, transactions
+
+
+def test_pooled_lookups_equal_serial_lookups_in_order(data, monkeypatch):
+    rules, transactions = data
+    monkeypatch.setattr(categorizer, "PARALLEL_THRESHOLD", 100)
+    monkeypatch.setattr(categorizer, "CHUNK_SIZE", 37)
+
+    with Categorizer(rules=rules, workers=2) as pooled:
+        pooled.assign([tx["description"] for tx in transactions[::7]], "Known")
+        assert pooled.lookup_many(transactions) == [pooled.lookup(tx) for tx in transactions]
+        assert pooled._pool is not None
+
+        # A new mapping restarts the pool with the updated matcher
+        pooled.assign([transactions[1]["description"]], "Later")
+        results = pooled.lookup_many(transactions)
+        assert results[1] == "Later"
+        assert results == [pooled.lookup(tx) for tx in transactions]
+
+
+def test_small_batches_skip_the_pool(data, monkeypatch):
+    rules, transactions = data
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("pool started for a small batch")
+
+    monkeypatch.setattr(categorizer, "ProcessPoolExecutor", no_pool)
+    with Categorizer(rules=rules, workers=4) as small:
+        batch = transactions[:categorizer.PARALLEL_THRESHOLD - 1]
+        assert small.lookup_many(batch) == [small.lookup(tx) for tx in batch]
+        assert small._pool is None
@@ -0,0 +1,229 @@
+import importlib
+import sys
+import time
+import types
+
+import numpy as np
+import pandas as pd
+import pytest
+
+
+# --------------------------------------------------------------------
+# Headless Tk stand-in: widgets do nothing, Listbox keeps its rows and
+# selection, StringVar runs its write traces
+# --------------------------------------------------------------------
+class _Widget:
+    def __init__(self, master=None, **kw):
+        self.kw = kw
+
+    def pack(self, **kw):
+        pass
+
+    def config(self, **kw):
+        self.kw.update(kw)
+
+    def set(self, *args):
+        pass
+
+    def yview(self, *args):
+        pass
+
+
+class _Tk(_Widget):
+    def __init__(self):
+        super().__init__()
+        self.destroyed = False
+
+    def title(self, text):
+        pass
+
+    def geometry(self, size):
+        pass
+
+    def destroy(self):
+        self.destroyed = True
+
+    def mainloop(self):
+        pass
+
+
+class _StringVar:
+    def __init__(self, master=None, value=""):
+        self.value = value
+        self.traces = []
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+        for callback in self.traces:
+            callback("", "", "write")
+
+    def trace_add(self, mode, callback):
+        self.traces.append(callback)
+
+
+class _Listbox(_Widget):
+    inserts = 0
+
+    def __init__(self, master=None, **kw):
+        super().__init__(master, **kw)
+        self.items = []
+        self.selection = set()
+
+    def _index(self, i):
+        return len(self.items) if i == "end" else i
+
+    def insert(self, i, *items):
+        _Listbox.inserts += 1
+        i = self._index(i)
+        self.items[i:i] = items
+
+    def delete(self, first, last=None):
+        first = self._index(first)
+        last = first + 1 if last is None else self._index(last) + 1
+        del self.items[first:last]
+        self.selection = set()
+
+    def curselection(self):
+        return tuple(sorted(self.selection))
+
+    def select_clear(self, first, last=None):
+        self.selection = set()
+
+    def select_set(self, first, last=None):
+        self.selection |= set(range(first, (first if last is None else last) + 1))
+
+    def see(self, i):
+        pass
+
+
+def _tk_stub():
+    tk = types.ModuleType("tkinter")
+    tk.EXTENDED = "extended"
+    tk.Tk, tk.StringVar, tk.Listbox = _Tk, _StringVar, _Listbox
+    tk.Frame = tk.LabelFrame = tk.Label = tk.Entry = tk.Button = tk.Scrollbar = _Widget
+    return tk
+
+
+@pytest.fixture
+def cm(tmp_path, monkeypatch):
+    """category_manager imported against the Tk stub, with its order file in tmp_path."""
+    monkeypatch.setitem(sys.modules, "tkinter", _tk_stub())
+    sys.modules.pop("category_manager", None)
+    module = importlib.import_module("category_manager")
+    monkeypatch.setattr(module, "ORDER_FILE", str(tmp_path / "category_order.json"))
+    monkeypatch.setattr(module, "DATA_DIR", str(tmp_path))
+    yield module
+    # Later imports get the real tkinter again
+    sys.modules.pop("category_manager", None)
+
+
+def _frame(n_rows, categories, seed=0):
+    rng = np.random.default_rng(seed)
+    days = np.sort(rng.integers(0, 20 * 365, n_rows)) + np.datetime64("2005-01-01", "D").astype(np.int64)
+    return pd.DataFrame({
+        "date": days.astype("datetime64[D]").astype("datetime64[us]"),
+        "cents": rng.integers(-100_000, 100_000, n_rows),
+        "category": pd.Categorical.from_codes(rng.integers(0, len(categories), n_rows), categories=categories),
+    })
+
+
+def _manager(cm, fixed=(), variable=(), unassigned=()):
+    cm.save_category_order(list(fixed), list(variable), list(unassigned))
+    return cm.CategoryManager(_frame(10, ["Income"]))  # not a managed category
+
+
+def _names(manager, name):
+    return [label.split("  (")[0] for label in manager.listboxes[name].items]
+
+
+# --------------------------------------------------------------------
+# Tests
+# --------------------------------------------------------------------
+def test_opens_quickly_with_5k_categories_and_1m_transactions(cm):
+    categories = [f"Category {i:04d}" for i in range(5000)]
+    frame = _frame(1_000_000, categories)
+    _Listbox.inserts = 0
+
+    t0 = time.perf_counter()
+    manager = cm.CategoryManager(frame)
+    elapsed = time.perf_counter() - t0
+
+    # Generous bound for slow CI machines; it takes about 0.1 s here
+    assert elapsed < 2.0
+    # One bulk insert for the one non-empty list
+    assert _Listbox.inserts == 1
+    assert len(manager.listboxes["unassigned"].items) == 5000
+    count, cents = manager.stats["Category 0000"]
+    rows = frame[frame["category"] == "Category 0000"]
+    assert (count, cents) == (len(rows), rows["cents"].sum())
+
+
+def test_shift_moves_non_contiguous_selections_as_blocks(cm):
+    manager = _manager(cm, fixed="abcdefgh")
+    lb = manager.listboxes["fixed"]
+
+    lb.selection = {1, 2, 5, 7}
+    manager._move_up("fixed")
+    assert manager.lists["fixed"] == list("bcadfehg")
+    assert lb.curselection() == (0, 1, 4, 6)
+
+    # "b" is at the top: it stops "c" behind it, the others move on
+    manager._move_up("fixed")
+    assert manager.lists["fixed"] == list("bcafdheg")
+    assert _names(manager, "fixed") == manager.lists["fixed"]
+
+    manager = _manager(cm, fixed="abcdefgh")
+    lb = manager.listboxes["fixed"]
+    lb.selection = {1, 2, 5, 7}
+    manager._move_down("fixed")
+    assert manager.lists["fixed"] == list("adbcegfh")
+    assert lb.curselection() == (2, 3, 6, 7)
+
+
+def test_shift_with_a_filter_moves_past_the_shown_rows(cm):
+    manager = _manager(cm, variable=["Fuel", "Rent", "Food", "Gym", "Fun"])
+    manager.filter_var.set("f")
+    assert _names(manager, "variable") == ["Fuel", "Food", "Fun"]
+
+    manager.listboxes["variable"].selection = {2}
+    manager._move_up("variable")
+    # "Fun" took the slot of "Food"; the hidden rows kept theirs
+    assert manager.lists["variable"] == ["Fuel", "Rent", "Fun", "Gym", "Food"]
+
+
+def test_move_between_with_an_active_filter(cm):
+    manager = _manager(cm, fixed=["Rent"], unassigned=["Food", "Fuel", "Gym", "Fun", "Rent Fund"])
+    manager.filter_var.set("fu")
+    assert _names(manager, "unassigned") == ["Fuel", "Fun", "Rent Fund"]
+    assert _names(manager, "fixed") == []
+
+    manager.listboxes["unassigned"].selection = {0, 2}
+    manager._move_between("unassigned", "fixed")
+
+    assert manager.lists["unassigned"] == ["Food", "Gym", "Fun"]
+    assert manager.lists["fixed"] == ["Rent", "Fuel", "Rent Fund"]
+    assert _names(manager, "unassigned") == ["Fun"]
+    assert _names(manager, "fixed") == ["Fuel", "Rent Fund"]
+    assert manager.listboxes["fixed"].curselection() == (0, 1)
+
+    manager.filter_var.set("")
+    assert _names(manager, "fixed") == ["Rent", "Fuel", "Rent Fund"]
+    manager._on_save()
+    assert cm.load_category_order() == (["Rent", "Fuel", "Rent Fund"], [], ["Food", "Gym", "Fun"])
+
+
+def test_filter_widens_again_when_text_is_deleted(cm):
+    manager = _manager(cm, unassigned=["Food", "Fuel", "Fun", "Gym"])
+    for text, shown in [
+        ("f", ["Food", "Fuel", "Fun"]),
+        ("fu", ["Fuel", "Fun"]),
+        ("fue", ["Fuel"]),
+        ("fu", ["Fuel", "Fun"]),     # backspace
+        ("gy", ["Gym"]),             # replaced
+        ("", ["Food", "Fuel", "Fun", "Gym"]),
+    ]:
+        manager.filter_var.set(text)
+        assert _names(manager, "unassigned") == shown, text
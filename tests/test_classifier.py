@@ -0,0 +1,111 @@
+import math
+import random
+from collections import Counter, defaultdict
+from datetime import date
+
+import numpy as np
+import pytest
+
+from classifier import ALPHA, MAGNITUDES, N_FEATURES, CategoryModel, _hash, description_features
+
+PAYEES = {
+    "rewe": "Groceries", "aldi": "Groceries", "shell": "Fuel", "aral": "Fuel",
+    "netflix": "Subscriptions", "telekom": "Utilities", "employer": "Income",
+}
+
+
+def _transactions(n, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        payee = rng.choice(list(PAYEES))
+        income = PAYEES[payee] == "Income"
+        rows.append({
+            "date": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "amount": round(rng.uniform(1000, 4000), 2) if income else -round(rng.uniform(1, 300), 2),
+            "description": f"{payee} {rng.choice(['markt', 'gmbh', 'online'])} {rng.randint(1, 50)}",
+            "category": PAYEES[payee],
+        })
+    return rows
+
+
+# --------------------------------------------------------------------
+# Reference: naive Bayes from scratch, with dictionaries
+# --------------------------------------------------------------------
+def _row_features(model, t):
+    amount = float(t["amount"])
+    sign = "+" if amount >= 0 else "-"
+    magnitude = min(max(int(math.floor(math.log10(abs(amount) + 1))), 0), MAGNITUDES - 1)
+    weekday = (date.fromisoformat(t["date"]) - date(1970, 1, 1)).days
+    return description_features(model.normalizer.normalize(t["description"])) + [
+        _hash(f"sign:{sign}"), _hash(f"amt:{sign}{magnitude}"), _hash(f"wd:{(weekday + 3) % 7}"),
+    ]
+
+
+def _reference_predict(model, train, rows):
+    counts = defaultdict(Counter)
+    priors = Counter(t["category"] for t in train)
+    for t in train:
+        counts[t["category"]].update(_row_features(model, t))
+    results = []
+    for t in rows:
+        scores = {}
+        for category, category_counts in counts.items():
+            denominator = sum(category_counts.values()) + ALPHA * N_FEATURES
+            scores[category] = math.log(priors[category] / len(train)) + sum(
+                math.log((category_counts[f] + ALPHA) / denominator) for f in _row_features(model, t)
+            )
+        best = max(scores, key=scores.get)
+        results.append((best, 1.0 / sum(math.exp(s - scores[best]) for s in scores.values())))
+    return results
+
+
+# --------------------------------------------------------------------
+# Tests
+# --------------------------------------------------------------------
+@pytest.mark.parametrize("seed", range(3))
+def test_predictions_match_a_dense_reference(seed):
+    train, test = _transactions(400, seed), _transactions(50, seed + 100)
+    # Trained in several updates, so buffered counts get merged
+    model = CategoryModel()
+    for lo in range(0, len(train), 150):
+        batch = train[lo:lo + 150]
+        model.update(batch, [t["category"] for t in batch])
+
+    categories, probabilities = model.predict(test)
+    expected = _reference_predict(model, train, test)
+    assert categories == [c for c, _ in expected]
+    np.testing.assert_allclose(probabilities, [p for _, p in expected], rtol=1e-9)
+
+
+def test_prediction_chunks_do_not_change_the_result(monkeypatch):
+    import classifier
+
+    train, test = _transactions(300), _transactions(200, 1)
+    model = CategoryModel.train(train)
+    categories, probabilities = model.predict(test)
+    monkeypatch.setattr(classifier, "PREDICT_CELLS", 1)
+    chunked = model.predict(test)
+    assert chunked[0] == categories
+    np.testing.assert_allclose(chunked[1], probabilities, rtol=1e-12)
+
+
+def test_word_evidence_and_save_load(tmp_path):
+    model = CategoryModel.train(_transactions(200))
+    rewe = {"date": "2024-05-02", "amount": -12.5, "description": "REWE Filiale 7"}
+    assert model.has_word_evidence(rewe, "Groceries")
+    assert not model.has_word_evidence(rewe, "Fuel")
+    assert not model.has_word_evidence(rewe, "No such category")
+
+    path = str(tmp_path / "model.npz")
+    model.save(path)
+    loaded = CategoryModel.load(path)
+    assert loaded.predict([rewe])[0] == model.predict([rewe])[0]
+    assert len(loaded) == len(model)
+
+
+def test_old_dense_model_files_are_not_loaded(tmp_path):
+    path = str(tmp_path / "model.npz")
+    np.savez_compressed(path, classes=np.array(["A"]), counts=np.zeros((1, N_FEATURES)),
+                        class_counts=np.ones(1))
+    assert CategoryModel.load(path) is None
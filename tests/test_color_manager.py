@@ -0,0 +1,55 @@
+import atexit
+import json
+
+import pytest
+
+import color_manager
+from color_manager import ColorManager, flush_colors
+
+
+@pytest.fixture
+def colors_file(tmp_path, monkeypatch):
+    path = tmp_path / "category_colors.json"
+    path.write_text(json.dumps({"Rent": "#9b59b6"}), encoding="utf-8")
+    monkeypatch.setattr(color_manager, "COLORS_FILE", str(path))
+    monkeypatch.setattr(color_manager, "_unsaved", {})
+    monkeypatch.setattr(color_manager, "_unsaved_used", {})
+    return path
+
+
+def _read(path):
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def test_managers_of_one_file_share_unsaved_colors(colors_file, monkeypatch):
+    registered = []
+    monkeypatch.setattr(atexit, "register", registered.append)
+    first, second = ColorManager(), ColorManager()
+    assert registered == []
+
+    food = first.get_color_for_category("Food")
+    assert ColorManager().get_color_for_category("Food") == food
+    assert second.get_color_for_category("Fuel") != food
+    assert _read(colors_file) == {"Rent": "#9b59b6"}
+
+    flush_colors()
+    assert _read(colors_file) == {
+        "Rent": "#9b59b6", "Food": food, "Fuel": second.color_map["Fuel"],
+    }
+
+
+def test_flush_merges_with_colors_saved_meanwhile(colors_file):
+    manager = ColorManager()
+    food = manager.get_color_for_category("Food")
+    manager.get_color_for_category("Fuel")
+
+    # Another process saved colors after this manager loaded the file
+    colors_file.write_text(json.dumps({"Rent": "#9b59b6", "Fuel": "#123456", "Gym": "#654321"}),
+                           encoding="utf-8")
+    manager.flush()
+    assert _read(colors_file) == {"Rent": "#9b59b6", "Fuel": "#123456", "Gym": "#654321", "Food": food}
+
+    # Nothing new: the file is not written again
+    colors_file.write_text("{}", encoding="utf-8")
+    manager.flush()
+    assert _read(colors_file) == {}
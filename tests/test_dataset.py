@@ -0,0 +1,109 @@
+import json
+
+from dataset import TransactionDataset
+from transaction_ids import assign_ids, content_id
+
+
+def _write(path, rows):
+    path.write_text(json.dumps(rows), encoding="utf-8")
+
+
+def _coffee(reference=None, account=None):
+    row = {"date": "2024-03-01", "amount": -2.5, "description": "Coffee"}
+    if reference:
+        row["reference"] = reference
+    if account:
+        row["account"] = account
+    return row
+
+
+def test_identical_purchases_get_distinct_ids(tmp_path):
+    path = tmp_path / "transactions.json"
+    _write(path, [_coffee(), _coffee()])
+    dataset = TransactionDataset(str(path))
+
+    ids = [t["id"] for t in dataset.load()]
+    assert ids == [content_id(_coffee(), 0), content_id(_coffee(), 1)]
+
+
+def test_refetch_with_references_adopts_each_migrated_occurrence(tmp_path):
+    path = tmp_path / "transactions.json"
+    _write(path, [_coffee(), _coffee()])
+    dataset = TransactionDataset(str(path))
+    dataset.load()
+
+    fetched = assign_ids([_coffee("E2E-A"), _coffee("E2E-B")])
+    dataset.append(fetched)
+    assert len(dataset) == 2
+    assert [t["id"] for t in dataset] == [content_id(_coffee(), 0), content_id(_coffee(), 1)]
+    assert [t["reference"] for t in dataset] == ["E2E-A", "E2E-B"]
+
+    # Fetching the same statement again (references in either order) adds nothing
+    assert dataset.append(assign_ids([_coffee("E2E-B"), _coffee("E2E-A")])) == []
+    assert len(TransactionDataset(str(path)).load()) == 2
+
+
+def test_new_referenced_purchase_is_added(tmp_path):
+    path = tmp_path / "transactions.json"
+    _write(path, [_coffee()])
+    dataset = TransactionDataset(str(path))
+    dataset.load()
+
+    dataset.append(assign_ids([_coffee("E2E-A"), _coffee("E2E-B")]))
+    assert len(dataset) == 2
+    assert dataset.transactions[0]["id"] == content_id(_coffee(), 0)
+    assert dataset.transactions[1]["id"] == "ref:2024-03-01:E2E-B"
+
+
+def test_legacy_file_is_migrated_by_the_first_save_not_on_load(tmp_path):
+    path = tmp_path / "transactions.json"
+    _write(path, [_coffee(), _coffee()])
+    before = path.read_bytes()
+    dataset = TransactionDataset(str(path))
+
+    assert all(t["id"] for t in dataset.load())
+    assert path.read_bytes() == before
+
+    dataset.append([{"date": "2024-03-02", "amount": -4.0, "description": "Lunch"}])
+    stored = json.loads(path.read_text(encoding="utf-8")) + dataset.journal.read()
+    assert [t["id"] for t in stored] == [t["id"] for t in dataset]
+
+
+def test_both_legs_of_a_transfer_are_kept(tmp_path):
+    path = tmp_path / "transactions.json"
+    _write(path, [])
+    dataset = TransactionDataset(str(path))
+    dataset.load()
+
+    legs = [
+        {"date": "2024-05-01", "amount": -500, "description": "Savings", "account": "DE_A",
+         "reference": "E2E-SAVE-05"},
+        {"date": "2024-05-01", "amount": 500, "description": "Savings", "account": "DE_B",
+         "reference": "E2E-SAVE-05"},
+    ]
+    dataset.append(assign_ids([dict(t) for t in legs]))
+    assert [(t["account"], t["amount"]) for t in dataset] == [("DE_A", -500), ("DE_B", 500)]
+
+    # Fetching both accounts again adds nothing
+    assert dataset.append(assign_ids([dict(t) for t in legs])) == []
+    assert len(TransactionDataset(str(path)).load()) == 2
+
+
+def test_identical_purchases_on_two_accounts_are_kept(tmp_path):
+    path = tmp_path / "transactions.json"
+    _write(path, [_coffee(account="DE_A"), _coffee(account="DE_B")])
+    dataset = TransactionDataset(str(path))
+    assert len(dataset.load()) == 2
+
+    # New rows, one statement per account
+    dataset.append(assign_ids([{**_coffee(account="DE_A"), "date": "2024-03-02"}]))
+    dataset.append(assign_ids([{**_coffee(account="DE_B"), "date": "2024-03-02"}]))
+    assert len(dataset) == 4
+
+    # Re-fetched with references, each account adopts its own migrated row
+    assert dataset.append(assign_ids([_coffee("E2E-A", "DE_A")])) == [
+        {**_coffee("E2E-A", "DE_A"), "id": content_id(_coffee(account="DE_A"))}
+    ]
+    dataset.append(assign_ids([_coffee("E2E-B", "DE_B")]))
+    assert [t.get("reference") for t in dataset][:2] == ["E2E-A", "E2E-B"]
+    assert len(TransactionDataset(str(path)).load()) == 4
@@ -0,0 +1,72 @@
+import json
+from datetime import date
+
+import pytest
+
+from categorizer import GROUP_SAMPLE, summarize_groups
+from dataset import TransactionDataset
+from main import build_parser, import_transactions
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    # The Categorizer's data/ files (mappings, rules, model) start empty
+    monkeypatch.chdir(tmp_path)
+    return TransactionDataset(str(tmp_path / "data" / "transactions.json"))
+
+
+def _rows(description, n, day="2024-03-01"):
+    return [{"date": day, "amount": -1.5 - i, "description": f"{description} {i:04d}"} for i in range(n)]
+
+
+def test_group_summaries_keep_a_bounded_sample():
+    groups = {"bakery": _rows("Bakery", 50), "kiosk": _rows("Kiosk", 2)}
+    summaries = summarize_groups(groups)
+    summarize_groups({"bakery": _rows("Bakery", 10, "2024-03-02")}, summaries)
+
+    assert summaries["bakery"].count == 60
+    assert summaries["bakery"].cents == -sum(150 + 100 * i for n in (50, 10) for i in range(n))
+    assert len(summaries["bakery"].descriptions) == GROUP_SAMPLE
+    assert summaries["kiosk"].descriptions == {"Kiosk 0000", "Kiosk 0001"}
+
+
+def test_review_file_is_merged_across_imports(tmp_path, dataset):
+    review_file = tmp_path / "review.json"
+    import_transactions(iter(_rows("Bakery", 30)), batch_size=7, review_file=str(review_file),
+                        dataset=dataset)
+    (entry,) = json.loads(review_file.read_text(encoding="utf-8"))
+    assert entry["count"] == 30
+    assert len(entry["descriptions"]) == GROUP_SAMPLE
+
+    # Filled in offline, then the next import writes its own open groups
+    entry["category"] = "Food"
+    review_file.write_text(json.dumps([entry]), encoding="utf-8")
+    import_transactions(iter(_rows("Kiosk", 3, "2024-03-02")), review_file=str(review_file),
+                        dataset=dataset)
+
+    review = {e["key"]: e for e in json.loads(review_file.read_text(encoding="utf-8"))}
+    assert review[entry["key"]]["category"] == "Food"
+    assert [e["count"] for e in review.values()] == [30, 3]
+
+
+def test_answers_are_stored_for_rows_read_back_from_the_dataset(dataset, monkeypatch):
+    answers = iter(["Food", ""])
+    monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+
+    report = import_transactions(iter(_rows("Bakery", 20) + _rows("Kiosk", 5)), batch_size=4,
+                                 dataset=dataset)
+    assert report.new == 25
+
+    stored = TransactionDataset(dataset.path).load()
+    assert len(stored) == 25
+    assert [t.get("category") for t in stored] == ["Food"] * 20 + [None] * 5
+
+
+@pytest.mark.parametrize("command", ["list", "chart"])
+def test_dates_are_parsed_by_the_cli(command, capsys):
+    args = build_parser().parse_args([command, "--start", "2024-01-01", "--end", "2024-01-31"])
+    assert (args.start_date, args.end_date) == (date(2024, 1, 1), date(2024, 1, 31))
+
+    with pytest.raises(SystemExit):
+        build_parser().parse_args([command, "--start", "2024-13-01"])
+    assert "invalid fromisoformat value" in capsys.readouterr().err
@@ -0,0 +1,33 @@
+import json
+
+from dataset import TransactionDataset
+
+
+def _rows():
+    return [
+        {"date": "2024-01-02", "amount": -3.5, "description": "Bakery", "id": "a"},
+        {"date": "2024-01-03", "amount": -20, "description": "Rent", "id": "b"},
+    ]
+
+
+def test_append_journals_only_new_rows(tmp_path):
+    path = tmp_path / "transactions.json"
+    dataset = TransactionDataset(str(path))
+    dataset.save(_rows())
+
+    assert dataset.append(_rows()) == []
+    changed = dict(_rows()[0], category="Food")
+    assert dataset.append([changed]) == [changed]
+    assert TransactionDataset(str(path)).load()[0]["category"] == "Food"
+
+
+def test_index_is_rebuilt_after_the_file_was_edited(tmp_path):
+    path = tmp_path / "transactions.json"
+    TransactionDataset(str(path)).save(_rows())
+
+    # Remove a row by hand: the persisted key index still lists it
+    path.write_text(json.dumps(_rows()[:1]), encoding="utf-8")
+
+    dataset = TransactionDataset(str(path))
+    assert dataset.append(_rows()[1:]) == _rows()[1:]
+    assert [t["id"] for t in TransactionDataset(str(path)).load()] == ["a", "b"]
@@ -0,0 +1,172 @@
+import json
+import os
+import random
+from collections import defaultdict
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregate_cache import AggregateCache, _sum_by
+from money import (
+    cents_array,
+    format_cents,
+    format_cents_array,
+    group_sums,
+    to_amount,
+    to_cents,
+)
+
+# Property tests over seeded random samples, checked against sums of exact
+# Decimal amounts. Each seed is one parametrized case, so a failure names
+# the seed that reproduces it.
+SEEDS = range(20)
+
+
+def _amounts(rng, n, max_euros=10**9):
+    """Random euro amounts with at most two decimals, as JSON would give them."""
+    return [
+        to_amount(rng.randint(-max_euros * 100, max_euros * 100) if rng.random() < 0.9
+                  else rng.randint(-1000, 1000))
+        for _ in range(n)
+    ]
+
+
+def _decimal(amount):
+    return Decimal(repr(amount)) if isinstance(amount, float) else Decimal(amount)
+
+
+def _cents(value):
+    return int(value.scaleb(2))
+
+
+# --------------------------------------------------------------------
+# money.py
+# --------------------------------------------------------------------
+@pytest.mark.parametrize("seed", SEEDS)
+def test_conversions_are_exact(seed):
+    rng = random.Random(seed)
+    for amount in _amounts(rng, 500):
+        cents = to_cents(amount)
+        assert cents == _cents(_decimal(amount))
+        # JSON round trip of the stored euro amount keeps the cents
+        assert to_cents(json.loads(json.dumps(to_amount(cents)))) == cents
+        assert format_cents(cents) == f"{_decimal(amount):.2f}"
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_array_helpers_match_the_scalar_ones(seed):
+    rng = random.Random(seed)
+    amounts = _amounts(rng, 1000)
+    cents = cents_array(amounts)
+    assert cents.dtype == np.int64
+    assert cents.tolist() == [to_cents(a) for a in amounts]
+    assert format_cents_array(cents).tolist() == [format_cents(c) for c in cents.tolist()]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_group_sums_match_decimal_sums(seed):
+    rng = random.Random(seed)
+    n_groups = rng.randint(1, 30)
+    amounts = _amounts(rng, 2000, max_euros=10**7)
+    codes = [rng.randrange(n_groups) for _ in amounts]
+
+    expected = [Decimal(0)] * n_groups
+    for code, amount in zip(codes, amounts):
+        expected[code] += _decimal(amount)
+    sums = group_sums(np.array(codes), cents_array(amounts), n_groups)
+    assert sums.tolist() == [_cents(total) for total in expected]
+
+
+# --------------------------------------------------------------------
+# Aggregate sums
+# --------------------------------------------------------------------
+def _frame(rng, n):
+    """Prepared chart frame (see Visualizer._prepare) of `n` random transactions."""
+    categories = ["Rent", "Groceries", "Income", "Fun", None]
+    amounts = _amounts(rng, n, max_euros=10**6)
+    dates = pd.to_datetime([f"20{rng.randint(20, 23)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+                            for _ in range(n)])
+    df = pd.DataFrame({
+        "date": dates,
+        "amount": amounts,
+        "category": [rng.choice(categories) for _ in range(n)],
+        "description": [f"Shop {rng.randrange(5)}" for _ in range(n)],
+    }).sort_values("date", kind="stable", ignore_index=True)
+    df["cents"] = cents_array(df["amount"])
+    df["cents_abs"] = np.abs(df["cents"])
+    df["year_month"] = df["date"].dt.to_period("M")
+    return df
+
+
+def _decimal_sums(df, keys, absolute=False):
+    sums = defaultdict(Decimal)
+    for row in df.itertuples(index=False):
+        key = tuple(getattr(row, k) for k in keys)
+        if any(pd.isna(k) for k in key):
+            continue
+        value = _decimal(row.amount)
+        sums[key] += abs(value) if absolute else value
+    return {key: _cents(total) for key, total in sums.items()}
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_sum_by_matches_decimal_sums(seed):
+    df = _frame(random.Random(seed), 1500)
+    df["month"] = df["year_month"].astype(str)
+
+    keys, sums = _sum_by(df, ["month", "category"], "cents")
+    assert keys == sorted(keys)
+    assert dict(zip(keys, sums.tolist())) == _decimal_sums(df, ["month", "category"])
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_aggregates_match_decimal_sums(tmp_path, seed):
+    rng = random.Random(seed)
+    df = _frame(rng, 1500)
+    cache = AggregateCache(str(tmp_path / "aggregates"))
+    cache.get_aggregates(df)
+
+    # Change one month; the other months are served from the (JSON) cache
+    month = rng.choice(df["year_month"].unique())
+    changed = df["year_month"] == month
+    df.loc[changed, "amount"] = _amounts(rng, int(changed.sum()), max_euros=10**6)
+    df["cents"] = cents_array(df["amount"])
+    df["cents_abs"] = np.abs(df["cents"])
+    month_sum_df, day_df, daily_net = AggregateCache(cache.path).get_aggregates(df)
+
+    month_sums = {
+        (str(m), c): s
+        for m, c, s in month_sum_df[["year_month", "category", "month_sum"]].itertuples(index=False)
+    }
+    df["month"] = df["year_month"].astype(str)
+    assert month_sums == _decimal_sums(df, ["month", "category"], absolute=True)
+
+    net = {d.strftime("%Y-%m-%d"): s for d, s in daily_net.items() if s}
+    expected_net = {d.strftime("%Y-%m-%d"): s for (d,), s in _decimal_sums(df, ["date"]).items() if s}
+    assert net == expected_net
+
+    expenses = df[df["category"] != "Income"]
+    day_sums = {(c, d): s for c, d, s in day_df[["category", "date", "expense_val"]].itertuples(index=False)}
+    assert day_sums == _decimal_sums(expenses, ["category", "date"], absolute=True)
+
+
+def test_only_the_files_of_changed_months_are_rewritten(tmp_path):
+    directory = tmp_path / "aggregates"
+    df = _frame(random.Random(0), 500)
+    AggregateCache(str(directory)).get_aggregates(df)
+    months = sorted(df["year_month"].astype(str).unique())
+    assert sorted(p.name.split(".")[0] for p in directory.iterdir()) == months
+    for p in directory.iterdir():
+        os.utime(p, ns=(0, 0))
+
+    # One amount changes, the last month is gone
+    first = df["year_month"] == df["year_month"].iloc[0]
+    df.loc[first.idxmax(), "cents"] += 1
+    df = df[df["year_month"] != df["year_month"].iloc[-1]]
+    AggregateCache(str(directory)).get_aggregates(df)
+
+    files = {p.name.split(".")[0]: p.stat().st_mtime_ns for p in directory.iterdir()}
+    assert sorted(files) == months[:-1]
+    assert [m for m, mtime in files.items() if mtime] == months[:1]
@@ -0,0 +1,113 @@
+import random
+import re
+
+import pytest
+
+from rules import RuleSet
+
+# Short patterns over a small alphabet, so rules overlap, nest and share
+# prefixes / suffixes, and most texts match several rules
+ALPHABET = "abcAB "
+SEEDS = range(10)
+
+
+# --------------------------------------------------------------------
+# Reference: check every rule in order
+# --------------------------------------------------------------------
+def _naive_first(rules, tx):
+    description = str(tx.get("description") or "")
+    for i, rule in enumerate(rules):
+        kind = rule["type"]
+        if kind == "prefix":
+            matched = description.casefold().startswith(rule["pattern"].casefold())
+        elif kind == "substring":
+            matched = rule["pattern"].casefold() in description.casefold()
+        elif kind == "regex":
+            matched = re.search(rule["pattern"], description) is not None
+        elif kind == "iban":
+            matched = (tx.get("counterparty_iban") or "").replace(" ", "").upper() == \
+                rule["pattern"].replace(" ", "").upper()
+        else:
+            amount = tx.get("amount")
+            matched = amount is not None and (
+                (rule.get("min") is None or float(amount) >= rule["min"])
+                and (rule.get("max") is None or float(amount) <= rule["max"])
+            )
+        if matched:
+            return i
+    return None
+
+
+def _word(rng, lo=1, hi=4):
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(lo, hi)))
+
+
+def _rule(rng, kind):
+    rule = {"type": kind, "category": f"C{rng.randrange(5)}"}
+    if kind in ("prefix", "substring"):
+        rule["pattern"] = _word(rng)
+    elif kind == "regex":
+        rule["pattern"] = rng.choice([
+            re.escape(_word(rng)),
+            "^" + re.escape(_word(rng)),
+            re.escape(_word(rng)) + "$",
+            f"{re.escape(_word(rng, 1, 2))}.{{{rng.randint(0, 2)}}}{re.escape(_word(rng, 1, 2))}",
+            f"(?i:{re.escape(_word(rng))})",
+        ])
+    elif kind == "iban":
+        rule["pattern"] = rng.choice(["DE01 0000", "de010000", "DE02", "DE03"])
+    else:
+        lo, hi = sorted(rng.choice([-10, -5, 0, 2.5, 5, 10]) for _ in range(2))
+        rule["min"], rule["max"] = rng.choice([(lo, hi), (lo, None), (None, hi)])
+    return rule
+
+
+def _transaction(rng):
+    return {
+        "description": _word(rng, 0, 10),
+        "amount": rng.choice([-10, -7.5, -5, 0, 2.5, 4.99, 5, 10, 11, None]),
+        "counterparty_iban": rng.choice([None, "DE010000", "de02", "DE04"]),
+    }
+
+
+def _assert_same_first_match(rules, rng, n=300):
+    rule_set = RuleSet(rules)
+    for _ in range(n):
+        tx = _transaction(rng)
+        assert rule_set.match_index(tx) == _naive_first(rules, tx), tx
+
+
+# --------------------------------------------------------------------
+# Tests
+# --------------------------------------------------------------------
+@pytest.mark.parametrize("kind", ["prefix", "substring", "regex", "amount", "iban"])
+@pytest.mark.parametrize("seed", SEEDS)
+def test_each_matcher_finds_the_first_rule_of_a_linear_scan(kind, seed):
+    rng = random.Random(seed)
+    _assert_same_first_match([_rule(rng, kind) for _ in range(rng.randint(1, 40))], rng)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_mixed_rules_find_the_first_rule_of_a_linear_scan(seed):
+    rng = random.Random(seed)
+    kinds = ["prefix", "substring", "regex", "amount", "iban"]
+    _assert_same_first_match([_rule(rng, rng.choice(kinds)) for _ in range(60)], rng)
+
+
+def test_overlapping_substrings_report_the_lowest_rule():
+    # "bc" ends inside "abcd" and is only reached via a failure link
+    rules = [{"type": "substring", "pattern": p, "category": p} for p in ["abcd", "xbcy", "bc", "c"]]
+    rule_set = RuleSet(rules)
+    for text, expected in [("ABCD", 0), ("abc", 2), ("xbcy", 1), ("zc", 3), ("ab", None)]:
+        assert rule_set.match_index({"description": text}) == expected == _naive_first(rules, {"description": text})
+
+
+def test_amount_boundaries_are_inclusive():
+    rules = [
+        {"type": "amount", "min": 0, "max": 10, "category": "A"},
+        {"type": "amount", "min": 10, "category": "B"},
+        {"type": "amount", "max": 0, "category": "C"},
+    ]
+    rule_set = RuleSet(rules)
+    for amount, expected in [(-1, 2), (0, 0), (5, 0), (10, 0), (10.01, 1), ("x", None)]:
+        assert rule_set.match_index({"amount": amount}) == expected
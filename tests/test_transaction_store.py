@@ -0,0 +1,103 @@
+import json
+from datetime import date
+
+from dataset import TransactionDataset
+from transaction_ids import content_id
+from transaction_journal import journal_paths
+from transaction_store import TransactionStore, store_path
+
+
+def _write(path, rows):
+    path.write_text(json.dumps(rows), encoding="utf-8")
+
+
+def _row(day, amount, description, category=None, **extra):
+    row = {"date": day, "amount": amount, "description": description, **extra}
+    if category:
+        row["category"] = category
+    return row
+
+
+ROWS = [
+    _row("2024-03-01", -2.5, "Coffee", "Food"),
+    _row("2024-03-01", -2.5, "Coffee", "Food"),
+    _row("2024-01-15", -40, "Fuel", "Car", account="DE01", reference="E2E-1"),
+    _row("2024-02-10", 2500, "Salary", "Income"),
+]
+
+
+def _imported(tmp_path):
+    path = tmp_path / "transactions.json"
+    _write(path, ROWS)
+    with TransactionStore(store_path(str(path))) as store:
+        assert store.import_json(str(path)) == len(ROWS)
+        # Importing again adds nothing
+        assert store.import_json(str(path)) == 0
+    return path
+
+
+def test_import_keeps_every_row_and_field(tmp_path):
+    path = _imported(tmp_path)
+    dataset = TransactionDataset(str(path))
+    assert dataset.store is not None
+
+    rows = dataset.load()
+    assert [t["id"] for t in rows[:2]] == [content_id(ROWS[0], 0), content_id(ROWS[0], 1)]
+    assert rows[2]["id"] == "ref:DE01:2024-01-15:E2E-1"
+    assert [{k: v for k, v in t.items() if k != "id"} for t in rows] == ROWS
+
+
+def test_indexed_queries(tmp_path):
+    path = _imported(tmp_path)
+    with TransactionStore(store_path(str(path))) as store:
+        assert [t["description"] for t in store.query()] == ["Fuel", "Salary", "Coffee", "Coffee"]
+        assert [t["description"] for t in store.query(date(2024, 2, 1), "2024-02-29")] == ["Salary"]
+        assert [t["description"] for t in store.query(categories=["Car", "Income"])] == ["Fuel", "Salary"]
+        assert store.query(categories=[]) == []
+        assert store.categories() == {"Food", "Car", "Income"}
+        plan = " ".join(str(r) for r in store.conn.execute(
+            "EXPLAIN QUERY PLAN SELECT data FROM transactions WHERE category IN ('Car') AND date >= '2024'"
+        ))
+        assert "idx_tx_category" in plan
+
+    frame = TransactionDataset(str(path)).query(categories=["Food"])
+    assert frame["cents"].tolist() == [-250, -250]
+
+
+def test_appends_upsert_only_changed_rows(tmp_path):
+    path = _imported(tmp_path)
+    json_before = path.read_text(encoding="utf-8")
+    dataset = TransactionDataset(str(path))
+    rows = [dict(t) for t in dataset.load()]
+
+    assert dataset.append([dict(t) for t in rows]) == []
+    rows[3]["category"] = "Salary"
+    new = _row("2024-03-02", -9.99, "Streaming")
+    delta = dataset.append([rows[3], new])
+    assert [t["description"] for t in delta] == ["Salary", "Streaming"]
+
+    # Written to the store, not to transactions.json or its journal
+    assert path.read_text(encoding="utf-8") == json_before
+    assert not (tmp_path / "transactions.journal.jsonl").exists()
+    reloaded = TransactionDataset(str(path)).load()
+    assert len(reloaded) == 5
+    assert reloaded[3]["category"] == "Salary"
+    assert reloaded[4]["id"] == new["id"]
+
+
+def test_export_writes_json_and_resets_the_journal(tmp_path):
+    path = tmp_path / "transactions.json"
+    _write(path, ROWS[:1])
+    TransactionDataset(str(path)).append([ROWS[3]])
+    journal_file, _ = journal_paths(str(path))
+    assert (tmp_path / "transactions.journal.jsonl").read_text(encoding="utf-8")
+
+    with TransactionStore(store_path(str(path))) as store:
+        store.import_json(str(path))
+        TransactionDataset(str(path)).append([ROWS[2]])
+        assert store.export_json(str(path)) == 3
+
+    assert open(journal_file, encoding="utf-8").read() == ""
+    exported = json.loads(path.read_text(encoding="utf-8"))
+    assert [t["description"] for t in exported] == ["Coffee", "Salary", "Fuel"]
+    assert TransactionDataset(str(path), store=False).load() == exported
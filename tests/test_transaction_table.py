@@ -0,0 +1,24 @@
+from transaction_table import Transaction, TransactionTable
+
+ROWS = [
+    {"date": "2024-01-02", "amount": -1.5, "description": "Café", "category": "Food",
+     "account": "DE01", "id": "ref:DE01:2024-01-02:E2E-Ä1", "reference": "E2E-Ä1"},
+    {"date": "2024-01-03", "amount": 2000, "description": "Salary", "category": "Salary",
+     "account": "DE01", "counterparty_iban": "DE02", "id": "0123456789abcdef-0"},
+    {"date": "2024-01-03", "amount": -0.1, "description": "Fee"},
+]
+
+
+def test_rows_round_trip_with_id_and_reference():
+    table = TransactionTable.from_transactions(ROWS[:2])
+    table.extend(Transaction.from_dict(t) for t in ROWS[2:])
+
+    assert table.to_dicts() == ROWS
+    assert table[0].reference == "E2E-Ä1"
+    assert table[2].id is None
+
+
+def test_chart_frame_leaves_out_the_row_fields():
+    frame = TransactionTable.from_transactions(ROWS).to_dataframe()
+    assert "id" not in frame.columns and "reference" not in frame.columns
+    assert frame["cents"].tolist() == [-150, 200000, -10]
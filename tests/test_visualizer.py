@@ -0,0 +1,162 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.testing import assert_frame_equal
+
+from aggregate_cache import AggregateCache
+from visualizer import TRANSACTIONS_FILE, Visualizer, load_area_categories
+
+
+# --------------------------------------------------------------------
+# Frozen copy of the per-month / per-category loops that
+# _build_area_frame and _build_income_frame replaced
+# --------------------------------------------------------------------
+def _old_area_frame(month_sum_df, area_categories):
+    area_list = []
+    for period in month_sum_df["year_month"].unique():
+        start = pd.Timestamp(period.start_time)
+        end   = pd.Timestamp(period.end_time)
+        days  = pd.date_range(start=start, end=end, freq="D")
+
+        data = month_sum_df[
+            (month_sum_df["year_month"] == period) &
+            (~month_sum_df["category"].isin(["Income"]))
+        ]
+
+        for cat in area_categories:
+            val = data.loc[data["category"] == cat, "month_sum"]
+            total = int(val.iloc[0]) if not val.empty else 0
+
+            area_list.append(pd.DataFrame({
+                "date": days,
+                "category": cat,
+                "month_value": total
+            }))
+
+    df_area = (
+        pd.concat(area_list, ignore_index=True)
+        if area_list
+        else pd.DataFrame(columns=["date", "category", "month_value"])
+    )
+
+    df_area = df_area.pivot(index="date", columns="category", values="month_value").fillna(0)
+    return df_area[[c for c in area_categories if c in df_area.columns]]
+
+
+def _old_income_frame(month_sum_df, full_date_range):
+    income_list = []
+    inc_data = month_sum_df[month_sum_df["category"] == "Income"]
+    for period in inc_data["year_month"].unique():
+        start = pd.Timestamp(period.start_time)
+        end   = pd.Timestamp(period.end_time)
+        days  = pd.date_range(start=start, end=end, freq="D")
+
+        val = inc_data.loc[inc_data["year_month"] == period, "month_sum"]
+        total = int(val.iloc[0]) if not val.empty else 0
+
+        income_list.append(pd.DataFrame({
+            "date": days,
+            "category": "Income",
+            "month_value": total
+        }))
+
+    df_income = (
+        pd.concat(income_list, ignore_index=True)
+        if income_list
+        else pd.DataFrame(columns=["date", "category", "month_value"])
+    )
+    df_income = df_income.set_index("date")
+    df_income = df_income[~df_income.index.duplicated(keep="last")]
+    return df_income.reindex(full_date_range).fillna(0)
+
+
+def _assert_same_frames(month_sum_df, area_categories, full_date_range):
+    assert_frame_equal(
+        Visualizer._build_area_frame(month_sum_df, area_categories),
+        _old_area_frame(month_sum_df, area_categories),
+        check_freq=False,
+    )
+    assert_frame_equal(
+        Visualizer._build_income_frame(month_sum_df, full_date_range),
+        _old_income_frame(month_sum_df, full_date_range),
+        check_freq=False,
+    )
+
+
+# --------------------------------------------------------------------
+# Data
+# --------------------------------------------------------------------
+def _sample_aggregates(tmp_path):
+    with open(TRANSACTIONS_FILE, "r", encoding="utf-8") as f:
+        transactions = json.load(f)
+    viz = Visualizer(transactions, aggregate_cache=AggregateCache(str(tmp_path / "aggregates")))
+    month_sum_df, _, _, full_date_range, _ = viz._prepare()
+    return month_sum_df, full_date_range
+
+
+def _synthetic_aggregates(years=10, n_categories=50, seed=0):
+    """
+    Monthly sums of `n_categories` expense categories plus income, with
+    some sums left out, some income-only months and some empty months.
+    """
+    rng = np.random.default_rng(seed)
+    periods = pd.period_range("2015-01", periods=12 * years, freq="M")
+    categories = [f"Category {i}" for i in range(n_categories)] + ["Income"]
+    kind = rng.choice(["full", "income only", "empty"], size=len(periods), p=[0.8, 0.1, 0.1])
+    rows = [
+        (period, category, int(rng.integers(1, 500_000)))
+        for period, k in zip(periods, kind)
+        for category in (categories if k == "full" else categories[-1:] if k == "income only" else [])
+        if rng.random() < 0.8
+    ]
+    month_sum_df = pd.DataFrame(rows, columns=["year_month", "category", "month_sum"])
+    month_sum_df["year_month"] = month_sum_df["year_month"].astype("period[M]")
+    full_date_range = pd.date_range(periods[0].start_time, periods[-1].end_time.normalize(), freq="D")
+    return month_sum_df, categories[:-1], full_date_range
+
+
+# --------------------------------------------------------------------
+# Tests
+# --------------------------------------------------------------------
+@pytest.mark.skipif(not os.path.exists(TRANSACTIONS_FILE), reason="no sample data")
+@pytest.mark.parametrize("area_categories", [None, [], ["No such category"]])
+def test_frames_match_the_old_loops_on_the_sample_data(tmp_path, area_categories):
+    month_sum_df, full_date_range = _sample_aggregates(tmp_path)
+    if area_categories is None:
+        area_categories = load_area_categories() or sorted(
+            set(month_sum_df["category"].dropna()) - {"Income"}
+        )
+    _assert_same_frames(month_sum_df, area_categories, full_date_range)
+
+
+def test_frames_match_the_old_loops_on_ten_years_of_fifty_categories():
+    month_sum_df, area_categories, full_date_range = _synthetic_aggregates()
+    _assert_same_frames(month_sum_df, area_categories + ["No such category"], full_date_range)
+
+
+def test_income_frame_without_income_matches_the_old_loop():
+    month_sum_df, area_categories, full_date_range = _synthetic_aggregates(years=2, n_categories=5)
+    month_sum_df = month_sum_df[month_sum_df["category"] != "Income"]
+    _assert_same_frames(month_sum_df, area_categories, full_date_range)
+
+
+@pytest.mark.skipif(not os.path.exists(TRANSACTIONS_FILE), reason="no sample data")
+def test_only_export_serializes_the_figure(tmp_path, monkeypatch):
+    import plotly.graph_objects as go
+
+    with open(TRANSACTIONS_FILE, "r", encoding="utf-8") as f:
+        transactions = json.load(f)
+    viz = Visualizer(transactions, aggregate_cache=AggregateCache(str(tmp_path / "aggregates")))
+    calls = []
+    to_json = go.Figure.to_json
+    monkeypatch.setattr(go.Figure, "to_json", lambda fig, *a, **kw: calls.append(1) or to_json(fig, *a, **kw))
+
+    assert viz.build_figure() is not None
+    assert calls == []
+    path = viz.export(str(tmp_path / "report.json"), fmt="json")
+    assert len(calls) == 1
+    with open(path, "r", encoding="utf-8") as f:
+        assert json.load(f)["data"]